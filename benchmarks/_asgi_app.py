@@ -0,0 +1,80 @@
+"""bench_asgi_api.py 用 uvicorn 启动的 ASGI 应用
+
+BENCH_API_VIEWS=sync 时两个 JSON API 换回改为异步视图之前的同步实现作为对照，
+其余路由与中间件不变。数据库与缓存由 DATABASE_URL、CACHE_LOCATION 指向基准脚本创建的临时文件。
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_system.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.http import JsonResponse  # noqa: E402
+from django.urls import include, path  # noqa: E402
+from django.views.decorators.http import require_POST  # noqa: E402
+
+from inventory.autocomplete import autocomplete  # noqa: E402
+from inventory.models import Product  # noqa: E402
+from inventory.search import MIN_TERM_LENGTH, search_products  # noqa: E402
+from inventory.services import STOCK_BATCH_MAX_ITEMS, apply_stock_deltas  # noqa: E402
+
+
+def api_product_search(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    if not query:
+        return JsonResponse({'query': query, 'results': []})
+
+    results = autocomplete(query, limit)
+    if len(results) < limit and len(query) >= MIN_TERM_LENGTH:
+        found = {result['id'] for result in results}
+        more = search_products(Product.objects.exclude(pk__in=found), query).values(
+            'id', 'sku', 'name', 'quantity'
+        )[:limit - len(results)]
+        results.extend(more)
+    return JsonResponse({'query': query, 'results': results})
+
+
+@require_POST
+def api_quick_stock_update(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': '请求体不是有效的JSON'}, status=400)
+    items = payload.get('items') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items or len(items) > STOCK_BATCH_MAX_ITEMS:
+        return JsonResponse({'error': '请提供库存变动条目列表'}, status=400)
+
+    results = apply_stock_deltas(items, user=request.user)
+    applied = sum(1 for result in results if result['ok'])
+    return JsonResponse({'applied': applied, 'failed': len(results) - applied, 'results': results})
+
+
+urlpatterns = [
+    path('api/products/search/', api_product_search),
+    path('api/stock/quick-update/', api_quick_stock_update),
+    path('', include('inventory.urls')),
+]
+
+if os.environ.get('BENCH_API_VIEWS') == 'sync':
+    settings.ROOT_URLCONF = __name__
+
+application = get_asgi_application()
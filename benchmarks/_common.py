@@ -0,0 +1,121 @@
+"""基准测试公共工具
+
+所有基准脚本都在一个临时数据库上运行（迁移后的独立测试库），不会触碰项目的数据库：
+SQLite 时为临时目录中的数据库文件，其他数据库（DATABASE_URL）时为 test_ 前缀的临时库。
+"""
+import contextlib
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_system.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from inventory.models import Category, Product  # noqa: E402
+
+# 商品名称用到的中文词汇，使数据分布更接近真实目录
+NAME_WORDS = ['螺丝', '螺母', '垫片', '轴承', '齿轮', '电机', '开关', '电缆',
+              '插头', '面板', '支架', '管件', '阀门', '滤芯', '胶带', '手套']
+
+
+@contextlib.contextmanager
+def throwaway_database(path=None, keep=False):
+    """创建并迁移一个临时数据库（SQLite 时为数据库文件），退出时删除"""
+    if connection.vendor == 'sqlite':
+        if path is None:
+            path = os.path.join(tempfile.gettempdir(), 'inventory_bench.sqlite3')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = str(path)
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=keep
+    )
+    try:
+        yield path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+
+
+def current_rss_mb():
+    """当前进程常驻内存（MB）"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_rss_mb():
+    """进程生命周期内的峰值常驻内存（MB）"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed_categories(count=20):
+    """创建商品分类，返回分类主键列表"""
+    Category.objects.bulk_create(
+        [Category(name=f'分类{i:03d}') for i in range(count)],
+        ignore_conflicts=True,
+    )
+    return list(Category.objects.values_list('pk', flat=True))
+
+
+def seed_products(count, categories=20, batch_size=20000, seed=42):
+    """用 executemany 批量写入商品
+
+    行数据由生成器产出，写入一百万行时内存也保持平稳。
+    """
+    rng = random.Random(seed)
+    category_ids = seed_categories(categories)
+    table = Product._meta.db_table
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = (
+        f'INSERT INTO {table} (name, sku, quantity, price, updated_at, category_id, '
+        'description, cost_price, low_stock_threshold, is_active, created_by_id, created_at) '
+        'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'
+    )
+
+    def rows(start, stop):
+        for i in range(start, stop):
+            price = rng.randint(100, 100000) / 100
+            yield (
+                f'{rng.choice(NAME_WORDS)}{rng.choice(NAME_WORDS)}-{i}',
+                f'SKU-{i:08d}',
+                rng.choice((0, rng.randint(1, 10), rng.randint(11, 500))),
+                f'{price:.2f}',
+                now,
+                rng.choice(category_ids),
+                '',
+                f'{price * 0.6:.2f}',
+                10,
+                True,
+                None,
+                now,
+            )
+
+    for start in range(0, count, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows(start, min(start + batch_size, count)))
+    connection.queries_log.clear()
+
+
+@contextlib.contextmanager
+def timer():
+    """计时上下文，产出一个在退出后包含 elapsed 的字典"""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['elapsed'] = time.perf_counter() - start
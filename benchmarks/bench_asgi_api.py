@@ -0,0 +1,153 @@
+"""ASGI 并发压测：JSON API 的异步视图与同步视图对比
+
+用法::
+
+    python benchmarks/bench_asgi_api.py --products 20000 --concurrency 50 --requests 2000
+
+在临时 SQLite 数据库与临时缓存文件上用 uvicorn 启动应用（单个 worker），
+先以改为异步之前的同步视图（BENCH_API_VIEWS=sync，见 _asgi_app.py）、再以当前的异步视图
+各跑一轮：--concurrency 个协程用 httpx 同时发起请求，统计每秒请求数与 p50/p99 延迟。
+场景为输入联想（随机前缀）与单条扫码的快速库存更新。压测客户端与服务器在同一台机器上，
+CPU 核数少时两者互相争抢，结果应在部署环境中复测。
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 基准进程与 uvicorn 子进程共用同一个缓存文件（会话、版本号都在缓存中）
+WORK_DIR = tempfile.mkdtemp(prefix='inventory_asgi_bench_')
+os.environ['CACHE_BACKEND'] = 'sqlite'
+os.environ['CACHE_LOCATION'] = os.path.join(WORK_DIR, 'cache.sqlite3')
+
+from _common import seed_products, throwaway_database  # noqa: E402
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import Client  # noqa: E402
+
+try:
+    import httpx
+except ImportError:  # 未安装 httpx 时无法压测
+    httpx = None
+
+BENCH_DIR = Path(__file__).resolve().parent
+PREFIXES = ['sku-0', 'sku-00', 'sku-001', 'sku-0002', '螺丝', '轴承', '电机', '阀门', '螺丝螺母']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, database, port):
+    env = dict(os.environ, BENCH_API_VIEWS=mode, DATABASE_URL=f'sqlite:///{database}')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', '_asgi_app:application', '--app-dir', str(BENCH_DIR),
+         '--host', '127.0.0.1', '--port', str(port), '--workers', '1',
+         '--log-level', 'warning', '--no-access-log'],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('uvicorn 未能在 30 秒内启动')
+
+
+def search_request(rng, products):
+    return 'GET', '/api/products/search/', {'params': {'q': rng.choice(PREFIXES), 'limit': 10}}
+
+
+def update_request(rng, products):
+    delta = rng.choice((-1, 1, 2))
+    item = {'sku': f'SKU-{rng.randrange(products):08d}', 'delta': delta,
+            'movement_type': 'in' if delta > 0 else 'out'}
+    return 'POST', '/api/stock/quick-update/', {'json': [item]}
+
+
+async def load(base_url, cookies, headers, make_request, products, concurrency, total):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def worker(client, seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        for _ in remaining:
+            method, url, kwargs = make_request(rng, products)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, headers=headers,
+                                 limits=limits, timeout=60) as client:
+        # 预热：构建输入联想索引、建立连接
+        await asyncio.gather(*(client.get('/api/products/search/', params={'q': 'sku'})
+                               for _ in range(concurrency)))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, seed) for seed in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def report(label, latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{label}: {len(latencies) / elapsed:7.0f} 请求/秒  p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+          f'p99 {p99 * 1000:7.1f} ms  非200响应 {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    if httpx is None:
+        sys.exit('需要安装 uvicorn 与 httpx：pip install uvicorn httpx')
+
+    database = os.path.join(WORK_DIR, 'db.sqlite3')
+    with throwaway_database(database):
+        seed_products(args.products)
+        client = Client()
+        client.force_login(User.objects.create_user('scanner', password='scanner'))
+        # POST 需要 CSRF 令牌：Cookie 与请求头使用同一个值
+        csrf_token = secrets.token_hex(16)
+        cookies = {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value,
+                   settings.CSRF_COOKIE_NAME: csrf_token}
+        headers = {'X-CSRFToken': csrf_token}
+
+        print(f'{args.products} 个商品，并发 {args.concurrency}，每个场景 {args.requests} 个请求')
+        for mode in ('sync', 'async'):
+            port = free_port()
+            server = start_server(mode, database, port)
+            try:
+                for name, make_request in (('输入联想', search_request), ('库存更新', update_request)):
+                    result = asyncio.run(load(f'http://127.0.0.1:{port}', cookies, headers, make_request,
+                                              args.products, args.concurrency, args.requests))
+                    report(f'{mode:>5} {name}', *result)
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""输入联想基准：索引加载耗时、内存与单次查询延迟
+
+用法::
+
+    python benchmarks/bench_autocomplete.py --rows 200000 --queries 2000
+
+分别测量 autocomplete() 函数本身与经过完整请求路径的 api_product_search，
+以及另一个进程修改了 --changed 个商品后本进程增量同步索引的耗时。
+安装 pypinyin 后会同时索引拼音首字母。
+"""
+import argparse
+import random
+import statistics
+from datetime import timedelta
+
+from _common import NAME_WORDS, current_rss_mb, seed_products, throwaway_database, timer
+
+from django.contrib.auth.models import User
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from inventory import autocomplete
+from inventory.models import Product
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(label, timings):
+    ms = [t * 1000 for t in timings]
+    print(f'{label}: p50 {statistics.median(ms):.2f} ms，p99 {percentile(ms, 99):.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--changed', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    prefixes = [rng.choice([
+        lambda: rng.choice(NAME_WORDS)[:rng.randint(1, 2)],
+        lambda: f'sku-{rng.randrange(args.rows):08d}'[:rng.randint(5, 10)],
+        lambda: rng.choice(NAME_WORDS) + rng.choice(NAME_WORDS)[:1],
+    ])() for _ in range(args.queries)]
+
+    setup_test_environment()
+    with throwaway_database():
+        seed_products(args.rows)
+        # 种子数据的更新时间提前一天，免得全部落在增量同步向前多取的时间窗口内
+        Product.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        before = current_rss_mb()
+        with timer() as t:
+            autocomplete.get_index()
+        print(f'索引加载: {t["elapsed"]:.2f}s，{len(autocomplete._index.keys)} 个键，'
+              f'内存增加 {current_rss_mb() - before:.1f} MB')
+
+        timings = []
+        for prefix in prefixes:
+            with timer() as t:
+                autocomplete.autocomplete(prefix, 10)
+            timings.append(t['elapsed'])
+        report('autocomplete()', timings)
+
+        client = Client()
+        client.force_login(User.objects.create_user('bench', password='bench'))
+        timings = []
+        for prefix in prefixes:
+            with timer() as t:
+                client.get('/api/products/search/', {'q': prefix, 'limit': 10})
+            timings.append(t['elapsed'])
+        report('api_product_search', timings)
+
+        # 模拟其他进程批量改名：不经过 save()，本进程只能靠版本号变化后的增量同步发现
+        ids = rng.sample(range(1, args.rows + 1), min(args.changed + 1, args.rows))
+        index = autocomplete._index
+        # 先同步一次最早的修改，水位推进到当前时间，后面计时的同步才不会重读一天前的全部种子数据
+        Product.objects.filter(pk=ids.pop()).update(updated_at=timezone.now())
+        index.sync(index.version)
+        Product.objects.filter(pk__in=ids).update(sku=Concat(Value('new-'), F('sku')), updated_at=timezone.now())
+        with timer() as t:
+            index.sync(index.version)
+        print(f'增量同步 {len(ids)} 个商品: {t["elapsed"]:.2f}s，{len(index.keys)} 个键，失效条目 {index.garbage}')
+
+
+if __name__ == '__main__':
+    main()
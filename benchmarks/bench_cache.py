@@ -0,0 +1,98 @@
+"""缓存后端基准：LocMemCache、FileBasedCache 与共享的 SQLiteCache 对比
+
+用法::
+
+    python benchmarks/bench_cache.py --keys 5000 --workers 4
+
+单进程测每秒 set / get / get_many(50) / incr 次数；多进程时 --workers 个进程同时对
+同一个计数器 incr，检查结果是否等于总次数（LocMemCache 各进程各有一份，无法共享计数）。
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from _common import timer
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from inventory.cache import SQLiteCache
+
+VALUE = {'sku': 'SKU-00000001', 'name': '螺丝螺母-1', 'quantity': 42, 'price': '12.50', 'tags': list(range(20))}
+
+
+def make_caches(directory, keys):
+    options = {'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': keys * 2}}
+    return {
+        'LocMemCache': lambda: LocMemCache('bench', options),
+        'FileBasedCache': lambda: FileBasedCache(os.path.join(directory, 'files'), options),
+        'SQLiteCache': lambda: SQLiteCache(os.path.join(directory, 'cache.sqlite3'), options),
+    }
+
+
+def rate(count, elapsed):
+    return f'{count / elapsed:9.0f}/s'
+
+
+def single_process(name, cache, keys):
+    cache.clear()
+    with timer() as t_set:
+        for i in range(keys):
+            cache.set(f'product:{i}', VALUE)
+    with timer() as t_get:
+        for i in range(keys):
+            cache.get(f'product:{i}')
+    batches = [[f'product:{j}' for j in range(i, min(i + 50, keys))] for i in range(0, keys, 50)]
+    with timer() as t_many:
+        for batch in batches:
+            cache.get_many(batch)
+    cache.set('version', 1)
+    with timer() as t_incr:
+        for _ in range(keys):
+            cache.incr('version')
+    print(f'{name:>15}: set {rate(keys, t_set["elapsed"])}  get {rate(keys, t_get["elapsed"])}  '
+          f'get_many(50) {rate(len(batches), t_many["elapsed"])}  incr {rate(keys, t_incr["elapsed"])}')
+
+
+def incr_worker(factory, times):
+    cache = factory()
+    for _ in range(times):
+        cache.incr('shared')
+
+
+def multi_process(name, factory, workers, times):
+    cache = factory()
+    cache.set('shared', 0)
+    ctx = multiprocessing.get_context('fork')
+    processes = [ctx.Process(target=incr_worker, args=(factory, times)) for _ in range(workers)]
+    with timer() as t:
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    print(f'{name:>15}: {workers} 个进程各 incr {times} 次，结果 {cache.get("shared")}'
+          f'（期望 {workers * times}），{t["elapsed"]:.2f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keys', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='inventory_cache_bench_')
+    try:
+        caches = make_caches(directory, args.keys)
+        for name, factory in caches.items():
+            single_process(name, factory(), args.keys)
+        print()
+        for name, factory in caches.items():
+            multi_process(name, factory, args.workers, args.keys // args.workers)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""数据库连接复用基准：每个请求重新连接、持久连接与连接池的每秒请求数对比
+
+用法::
+
+    DATABASE_URL=postgres://postgres@localhost/inventory \\
+        python benchmarks/bench_connection_churn.py --requests 2000 --threads 8
+
+需要 PostgreSQL（会创建并删除一个 test_ 前缀的临时库）。每个“请求”按 Django 的请求生命周期
+发送 request_started / request_finished 信号，中间做一次按主键查询商品，
+因此连接的建立、复用、归还与真实请求一致。
+"""
+import argparse
+import logging
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import seed_products, throwaway_database, timer
+
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+
+from inventory.models import Product
+
+MODES = ('reconnect', 'persistent', 'pool')
+
+
+def use_mode(mode, pool_size):
+    """修改 default 数据库的配置，之后各线程新建的连接按该模式工作"""
+    settings_dict = connection.settings_dict
+    connection.close_pool()
+    settings_dict['OPTIONS'].pop('pool', None)
+    settings_dict['CONN_MAX_AGE'] = 0
+    if mode == 'persistent':
+        settings_dict['CONN_MAX_AGE'] = 600
+    elif mode == 'pool':
+        settings_dict['OPTIONS']['pool'] = {'min_size': pool_size, 'max_size': pool_size, 'timeout': 10}
+
+
+def handle_request(product_id):
+    request_started.send(sender=None)
+    try:
+        Product.objects.filter(pk=product_id).values_list('quantity', flat=True).first()
+    finally:
+        request_finished.send(sender=None)
+
+
+def run(mode, args):
+    rng = random.Random(1)
+    ids = [rng.randrange(args.products) + 1 for _ in range(args.requests)]
+
+    def worker(chunk):
+        try:
+            for product_id in chunk:
+                handle_request(product_id)
+        finally:
+            connections.close_all()
+
+    chunks = [ids[i::args.threads] for i in range(args.threads)]
+    with timer() as t, ThreadPoolExecutor(args.threads) as executor:
+        list(executor.map(worker, chunks))
+    print(f'{mode:>10}: {args.requests / t["elapsed"]:8.0f} 请求/秒')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        sys.exit('需要 PostgreSQL：请设置 DATABASE_URL=postgres://...')
+    logging.disable(logging.INFO)
+
+    with throwaway_database():
+        seed_products(args.products)
+        connections.close_all()
+        for mode in MODES:
+            use_mode(mode, args.threads)
+            run(mode, args)
+        use_mode('reconnect', args.threads)
+
+
+if __name__ == '__main__':
+    main()
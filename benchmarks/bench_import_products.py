@@ -0,0 +1,53 @@
+"""商品批量导入基准：每秒导入行数
+
+用法::
+
+    python benchmarks/bench_import_products.py --rows 50000 --batch-size 500
+
+生成一个供应商表格样式的CSV（含少量错误行），先全新导入一次，
+再以相同文件导入一次以测量按SKU更新的速度。
+"""
+import argparse
+import csv
+import io
+import random
+
+from _common import throwaway_database
+
+from inventory.importers import ProductImporter, read_rows
+
+
+def build_csv(rows, seed=7):
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['商品编码', '商品名称', '分类', '库存数量', '单价', '成本价', '库存预警值'])
+    for i in range(rows):
+        price = rng.randint(200, 50000) / 100
+        sku = f'SUP-{i:07d}' if i % 1000 else f'bad sku {i}'
+        writer.writerow([sku, f'供应商商品{i}', f'分类{i % 30:02d}', rng.randint(0, 500),
+                         f'{price:.2f}', f'{price * 0.7:.2f}', 10])
+    return buffer.getvalue().encode('utf-8')
+
+
+def run(data, batch_size):
+    importer = ProductImporter(batch_size=batch_size)
+    return importer.run(read_rows(io.BytesIO(data), 'csv'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    data = build_csv(args.rows)
+    with throwaway_database():
+        for label in ('首次导入', '重复导入（更新）'):
+            result = run(data, args.batch_size)
+            print(f'{label}: {result.total} 行，新增 {result.created}，更新 {result.updated}，'
+                  f'失败 {result.failed}，{result.elapsed:.2f}s，{result.rows_per_second:,.0f} 行/秒')
+
+
+if __name__ == '__main__':
+    main()
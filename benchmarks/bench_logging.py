@@ -0,0 +1,109 @@
+"""日志写入基准：磁盘变慢时，请求线程同步写文件与经队列后台写出的请求延迟对比
+
+用法::
+
+    python benchmarks/bench_logging.py --requests 2000 --delay-ms 2 --stall-ms 200 --stall-every 500
+
+每个请求是未登录访问 /api/products/search/，django.request 记录一条 WARNING（401）。
+磁盘变慢用 SlowFileHandler 模拟：每次写入等待 --delay-ms，每 --stall-every 次再卡顿 --stall-ms。
+分别统计直接使用 SlowFileHandler（原来的同步 FileHandler）与经 QueueHandler 后台写出时的
+p50/p99/最大延迟，以及关闭处理器时等待队列写完的耗时。
+"""
+import argparse
+import logging
+import logging.config
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from _common import timer
+
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+
+class SlowFileHandler(logging.FileHandler):
+    """模拟慢磁盘的文件处理器"""
+
+    write_delay = 0.0
+    stall = 0.0
+    stall_every = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = 0
+
+    def emit(self, record):
+        self.writes += 1
+        time.sleep(self.write_delay)
+        if self.stall_every and self.writes % self.stall_every == 0:
+            time.sleep(self.stall)
+        super().emit(record)
+
+
+def logging_config(queued, filename):
+    target = {'class': f'{__name__}.SlowFileHandler', 'filename': filename}
+    if queued:
+        handler = {'()': 'inventory_system.logging_config.QueueHandler', 'target': target}
+    else:
+        handler = dict(target)
+    handler.update(level='INFO', formatter='verbose')
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'verbose': {'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}', 'style': '{'},
+        },
+        'handlers': {'file': handler},
+        'loggers': {'django': {'handlers': ['file'], 'level': 'INFO', 'propagate': False}},
+    }
+
+
+def measure(label, queued, directory, requests):
+    filename = os.path.join(directory, f'{label}.log')
+    logging.config.dictConfig(logging_config(queued, filename))
+    client = Client()
+    latencies = []
+    for _ in range(requests):
+        with timer() as t:
+            client.get('/api/products/search/', {'q': 'sku'})
+        latencies.append(t['elapsed'])
+    with timer() as t_close:
+        for handler in logging.getLogger('django').handlers:
+            handler.close()
+    with open(filename, encoding='utf-8') as f:
+        lines = sum(1 for _ in f)
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{label:>6}: p50 {statistics.median(latencies) * 1000:6.2f} ms  p99 {p99 * 1000:7.2f} ms  '
+          f'最大 {latencies[-1] * 1000:7.1f} ms  关闭时等待写出 {t_close["elapsed"] * 1000:7.1f} ms  '
+          f'日志 {lines} 行')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--delay-ms', type=float, default=2)
+    parser.add_argument('--stall-ms', type=float, default=200)
+    parser.add_argument('--stall-every', type=int, default=500)
+    args = parser.parse_args()
+
+    SlowFileHandler.write_delay = args.delay_ms / 1000
+    SlowFileHandler.stall = args.stall_ms / 1000
+    SlowFileHandler.stall_every = args.stall_every
+
+    setup_test_environment()
+    directory = tempfile.mkdtemp(prefix='inventory_logging_bench_')
+    try:
+        print(f'{args.requests} 个请求，每次写入 {args.delay_ms} ms，每 {args.stall_every} 次卡顿 {args.stall_ms} ms')
+        measure('同步写入', False, directory, args.requests)
+        measure('队列写入', True, directory, args.requests)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""商品列表分页基准：页码分页（COUNT + OFFSET）与游标分页的逐页延迟
+
+用法::
+
+    python benchmarks/bench_product_list.py --rows 200000 --depths 1 100 1000 5000
+
+对每个深度分别测量两种模式渲染商品列表页的耗时（经过完整请求路径）。
+游标模式下先沿“下一页”链接走到该深度，记录到达时的那一次请求耗时。
+"""
+import argparse
+import re
+import statistics
+
+from _common import seed_products, throwaway_database, timer
+
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+
+from inventory.summary import reconcile
+
+NEXT_LINK = re.compile(r'href="\?([^"]*cursor=[^"]+)">\s*下一页')
+
+
+def measure(client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        with timer() as t:
+            response = client.get(url)
+        timings.append(t['elapsed'])
+    assert response.status_code == 200
+    return statistics.median(timings) * 1000, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    with throwaway_database():
+        seed_products(args.rows)
+        reconcile()
+        User.objects.create_user('bench', password='bench')
+        client = Client()
+        client.login(username='bench', password='bench')
+
+        print(f'{args.rows} 个商品，每页 20 个')
+        with override_settings(INVENTORY_SETTINGS={'PRODUCT_LIST_PAGINATION': 'pages'}):
+            for depth in args.depths:
+                ms, _ = measure(client, f'/products/?page={depth}', args.repeat)
+                print(f'页码分页 第 {depth} 页: {ms:.1f} ms')
+
+        with override_settings(INVENTORY_SETTINGS={'PRODUCT_LIST_PAGINATION': 'cursor'}):
+            url = '/products/'
+            page = 1
+            for depth in sorted(args.depths):
+                while page < depth:
+                    response = client.get(url)
+                    query = NEXT_LINK.search(response.content.decode()).group(1)
+                    url = '/products/?' + query.replace('&amp;', '&')
+                    page += 1
+                ms, _ = measure(client, url, args.repeat)
+                print(f'游标分页 第 {depth} 页: {ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
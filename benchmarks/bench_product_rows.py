@@ -0,0 +1,115 @@
+"""商品列表行片段缓存基准：逐行渲染与按 (pk, updated_at) 缓存的行片段对比
+
+用法::
+
+    python benchmarks/bench_product_rows.py --rows 10000 --pages 50 --cache sqlite
+
+分两层测量：
+1. 只渲染表格行：每页 20 行逐行渲染模板，与缓存预热后一次 get_many 取回的耗时；
+2. 完整请求：该页行片段未缓存与已缓存时商品列表页的耗时。
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+
+from _common import seed_products, throwaway_database, timer
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+
+from inventory.fragments import (PRODUCT_ROW_TEMPLATE, product_row_cache, product_row_version,
+                                 render_product_rows)
+from inventory.models import Product
+from inventory.summary import reconcile
+
+PAGE_SIZE = 20
+
+
+def cache_settings(backend, directory):
+    if backend == 'sqlite':
+        return {'default': {'BACKEND': 'inventory.cache.SQLiteCache',
+                            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+                            'OPTIONS': {'MAX_ENTRIES': 1000000}}}
+    return {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'OPTIONS': {'MAX_ENTRIES': 1000000}}}
+
+
+def median_ms(timings):
+    return statistics.median(timings) * 1000
+
+
+def bench_rows(pages):
+    template = get_template(PRODUCT_ROW_TEMPLATE)
+    uncached, cold, warm = [], [], []
+    for page in pages:
+        with timer() as t:
+            [template.render({'product': product}) for product in page]
+        uncached.append(t['elapsed'])
+    cache.clear()
+    for page in pages:
+        with timer() as t:
+            render_product_rows(page)
+        cold.append(t['elapsed'])
+    for page in pages:
+        with timer() as t:
+            render_product_rows(page)
+        warm.append(t['elapsed'])
+    print(f'表格行（每页 {PAGE_SIZE} 行）: 逐行渲染 {median_ms(uncached):.2f} ms，'
+          f'冷缓存 {median_ms(cold):.2f} ms，热缓存 {median_ms(warm):.2f} ms')
+
+
+def bench_requests(client, pages, repeat):
+    """冷缓存只删除该页的行片段，会话、汇总等其他缓存保持预热"""
+    cold, warm = [], []
+    for number, page in enumerate(pages, start=1):
+        url = f'/products/?page={number}'
+        row_keys = [product_row_cache.key(product.pk, product_row_version(product)) for product in page]
+        client.get(url)
+        for _ in range(repeat):
+            cache.delete_many(row_keys)
+            with timer() as t:
+                client.get(url)
+            cold.append(t['elapsed'])
+            with timer() as t:
+                client.get(url)
+            warm.append(t['elapsed'])
+    print(f'商品列表页完整请求: 行片段冷缓存 {median_ms(cold):.1f} ms，热缓存 {median_ms(warm):.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache', choices=('sqlite', 'locmem'), default='sqlite')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    directory = tempfile.mkdtemp(prefix='inventory_rows_bench_')
+    try:
+        with throwaway_database(), override_settings(
+                CACHES=cache_settings(args.cache, directory),
+                SESSION_ENGINE='django.contrib.sessions.backends.db',
+                INVENTORY_SETTINGS={'PRODUCT_LIST_PAGINATION': 'pages'}):
+            seed_products(args.rows)
+            reconcile()
+            products = list(Product.objects.order_by('-updated_at', '-id')[:args.pages * PAGE_SIZE])
+            pages = [products[i:i + PAGE_SIZE] for i in range(0, len(products), PAGE_SIZE)]
+            print(f'{args.rows} 个商品，缓存后端 {args.cache}')
+            bench_rows(pages)
+
+            User.objects.create_user('bench', password='bench')
+            client = Client()
+            client.login(username='bench', password='bench')
+            bench_requests(client, pages[:10], args.repeat)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""批量库存更新API基准：单次请求提交 N 条扫描记录的耗时
+
+用法::
+
+    python benchmarks/bench_quick_stock_update.py --items 1000 --products 10000
+
+通过测试客户端走完整的请求路径（中间件、会话、JSON解析）。
+"""
+import argparse
+import json
+import random
+
+from _common import seed_products, throwaway_database, timer
+
+from django.contrib.auth.models import User
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from inventory.models import StockMovement
+
+
+def build_items(count, products, seed=3):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        delta = rng.choice((-1, -2, 1, 5, 10))
+        items.append({
+            'sku': f'SKU-{rng.randrange(products):08d}',
+            'delta': delta,
+            'movement_type': 'in' if delta > 0 else 'out',
+            'reference_no': f'SCAN-{i:06d}',
+        })
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    with throwaway_database():
+        seed_products(args.products)
+        client = Client()
+        client.force_login(User.objects.create_user('scanner', password='scanner'))
+
+        timings = []
+        for run in range(args.repeat):
+            body = json.dumps(build_items(args.items, args.products, seed=run))
+            with timer() as t:
+                response = client.post('/api/stock/quick-update/', body,
+                                       content_type='application/json')
+            data = response.json()
+            timings.append(t['elapsed'])
+            print(f'第 {run + 1} 次: {t["elapsed"] * 1000:.1f} ms，'
+                  f'成功 {data["applied"]}，失败 {data["failed"]}')
+
+        print(f'{args.items} 条/请求，最快 {min(timings) * 1000:.1f} ms，'
+              f'变动记录共 {StockMovement.objects.count()} 条')
+
+
+if __name__ == '__main__':
+    main()
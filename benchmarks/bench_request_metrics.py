@@ -0,0 +1,63 @@
+"""请求性能统计的开销：不同抽样率下商品列表页与输入联想API的请求耗时
+
+用法::
+
+    python benchmarks/bench_request_metrics.py --rows 10000 --requests 300
+
+抽样率为 0 时只多一次随机数判断；为 1 时每个请求都统计 SQL/模板/缓存并写入按视图的汇总。
+"""
+import argparse
+import logging
+import statistics
+
+from _common import seed_products, throwaway_database, timer
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+
+from inventory.performance import view_stats
+from inventory.summary import reconcile
+
+URLS = {'商品列表': '/products/', '输入联想': '/api/products/search/?q=sku-00'}
+
+
+def measure(client, url, requests):
+    timings = []
+    client.get(url)
+    for _ in range(requests):
+        with timer() as t:
+            client.get(url)
+        timings.append(t['elapsed'])
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--rates', type=float, nargs='+', default=[0, 0.1, 1])
+    args = parser.parse_args()
+
+    setup_test_environment()
+    # 只比较统计本身的开销，每个请求的日志不写入文件
+    logging.getLogger('inventory.performance').setLevel(logging.WARNING)
+    with throwaway_database():
+        seed_products(args.rows)
+        reconcile()
+        client = Client()
+        client.force_login(User.objects.create_user('bench', password='bench', is_staff=True))
+        for rate in args.rates:
+            with override_settings(INVENTORY_SETTINGS={**settings.INVENTORY_SETTINGS,
+                                                       'PERFORMANCE_SAMPLE_RATE': rate}):
+                results = [f'{name} {measure(client, url, args.requests):6.2f} ms' for name, url in URLS.items()]
+            print(f'抽样率 {rate:>4}: ' + '  '.join(results))
+
+        for row in view_stats(3):
+            print(f'{row["view"]}: {row["samples"]} 个样本，p95 {row["p95_ms"]} ms，'
+                  f'平均 {row["avg_sql_count"]} 条SQL')
+
+
+if __name__ == '__main__':
+    main()
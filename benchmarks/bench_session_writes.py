@@ -0,0 +1,59 @@
+"""会话写入基准：每个只读请求产生的数据库写入次数
+
+用法::
+
+    python benchmarks/bench_session_writes.py --requests 200
+
+已登录用户反复打开商品详情页，统计每个请求的写语句（INSERT/UPDATE/DELETE）数量，
+对比原来的配置（db 会话 + SESSION_SAVE_EVERY_REQUEST）与当前配置
+（SESSION_STORE 指定的存储 + SessionRefreshMiddleware 按间隔续期）。
+"""
+import argparse
+
+from _common import seed_products, throwaway_database, timer
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def legacy_settings():
+    return override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+        SESSION_SAVE_EVERY_REQUEST=True,
+        MIDDLEWARE=[m for m in settings.MIDDLEWARE if m != 'inventory.middleware.SessionRefreshMiddleware'],
+    )
+
+
+def measure(label, requests, user):
+    client = Client()
+    client.force_login(user)
+    with CaptureQueriesContext(connection) as queries, timer() as t:
+        for i in range(requests):
+            client.get(f'/products/{i % 100 + 1}/')
+    writes = [q['sql'] for q in queries if q['sql'].lstrip().upper().startswith(WRITE_PREFIXES)]
+    session_writes = [sql for sql in writes if 'django_session' in sql]
+    print(f'{label}: 每请求写入 {len(writes) / requests:.2f} 次（会话 {len(session_writes) / requests:.2f} 次），'
+          f'共 {len(queries)} 条查询，{requests / t["elapsed"]:.0f} 请求/秒')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    with throwaway_database():
+        seed_products(1000)
+        user = User.objects.create_user('viewer', password='viewer')
+        with legacy_settings():
+            measure('原配置（db + SESSION_SAVE_EVERY_REQUEST）', args.requests, user)
+        measure(f'当前配置（{settings.SESSION_STORE} + 按间隔续期）', args.requests, user)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""SQLite 多进程并发基准：默认设置与 inventory.sqlite 的 PRAGMA 配置对比
+
+用法::
+
+    python benchmarks/bench_sqlite_concurrency.py --products 100000 --writers 4 --readers 4 --seconds 10
+
+模拟多个 gunicorn worker：写进程不断调用 adjust_stock（更新商品库存并写入库存变动记录），
+读进程不断查询商品列表首页与库存不足商品。分别在 SQLite 默认设置
+（回滚日志、DEFERRED 事务）和本项目的配置（WAL、busy_timeout、BEGIN IMMEDIATE 等）下运行，
+输出每秒读写次数与 “database is locked” 失败次数。
+"""
+import argparse
+import logging
+import multiprocessing
+import random
+import sqlite3
+import time
+
+from _common import seed_products, throwaway_database
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections
+
+from inventory.filters import filter_products
+from inventory.models import Product
+from inventory.services import InsufficientStockError, adjust_stock
+from inventory.sqlite import current_pragmas
+
+PROFILES = ('stock', 'tuned')
+
+
+def use_profile(profile):
+    """在当前进程中切换连接配置，之后新建的连接生效"""
+    if profile == 'stock':
+        settings.INVENTORY_SETTINGS['SQLITE_PRAGMAS'] = None
+        connection.settings_dict['OPTIONS'].pop('transaction_mode', None)
+    else:
+        settings.INVENTORY_SETTINGS['SQLITE_PRAGMAS'] = {}
+        connection.settings_dict['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+    connection.close()
+    connection.transaction_mode = connection.settings_dict['OPTIONS'].get('transaction_mode')
+
+
+def write_loop(rng, products, deadline):
+    done = locked = 0
+    while time.monotonic() < deadline:
+        try:
+            adjust_stock(rng.randrange(products) + 1, rng.choice((-1, 1, 2, 5)), movement_type='adjustment')
+            done += 1
+        except InsufficientStockError:
+            done += 1
+        except OperationalError:
+            locked += 1
+    return done, locked
+
+
+def read_loop(rng, products, deadline):
+    done = locked = 0
+    base = Product.objects.order_by('-updated_at')
+    while time.monotonic() < deadline:
+        try:
+            list(base[:20])
+            list(filter_products(base, '', 'low_stock')[:20])
+            Product.objects.filter(pk=rng.randrange(products) + 1).values('quantity').first()
+            done += 1
+        except OperationalError:
+            locked += 1
+    return done, locked
+
+
+def worker(role, index, profile, products, seconds, start, results):
+    logging.disable(logging.CRITICAL)
+    use_profile(profile)
+    rng = random.Random(index)
+    start.wait()
+    loop = write_loop if role == 'write' else read_loop
+    results.put((role, *loop(rng, products, time.monotonic() + seconds)))
+    connection.close()
+
+
+def run(profile, args):
+    ctx = multiprocessing.get_context('fork')
+    start = ctx.Barrier(args.writers + args.readers)
+    results = ctx.Queue()
+    roles = ['write'] * args.writers + ['read'] * args.readers
+    processes = [ctx.Process(target=worker, args=(role, i, profile, args.products, args.seconds,
+                                                   start, results))
+                 for i, role in enumerate(roles)]
+    for process in processes:
+        process.start()
+    totals = {'write': [0, 0], 'read': [0, 0]}
+    for _ in processes:
+        role, done, locked = results.get()
+        totals[role][0] += done
+        totals[role][1] += locked
+    for process in processes:
+        process.join()
+
+    for role, label in (('write', '写'), ('read', '读')):
+        done, locked = totals[role]
+        print(f'  {label}: {done / args.seconds:8.0f} 次/秒，database is locked {locked} 次')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    with throwaway_database() as path:
+        seed_products(args.products)
+        for profile in PROFILES:
+            use_profile(profile)
+            if profile == 'stock':
+                # journal_mode 会保存在数据库文件中，先切回默认的回滚日志
+                raw = sqlite3.connect(path)
+                raw.execute('PRAGMA journal_mode = DELETE')
+                raw.close()
+            connection.ensure_connection()
+            print(f'{profile}: {current_pragmas(connection)}')
+            connections.close_all()
+            run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""按时间点查询库存基准：从快照重放与全量倒推的耗时对比
+
+用法::
+
+    python benchmarks/bench_stock_as_of.py --rows 1000000 --movements 500000
+
+先写入商品和快照，再写入快照之后的变动记录，然后查询快照之后 15 天时全部商品的库存，
+两种方式的库存合计应当相同。
+"""
+import argparse
+import datetime
+import random
+
+from _common import seed_products, throwaway_database, timer
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory.models import Product, StockMovement, StockSnapshot
+from inventory.snapshots import StockAsOf, take_snapshot
+
+
+def seed_movements(count, products, start, seed=7, batch_size=20000):
+    """在 start 之后均匀写入 count 条入库记录，并把数量累加到商品库存上"""
+    rng = random.Random(seed)
+    span = (timezone.now() - start).total_seconds()
+    for offset in range(0, count, batch_size):
+        batch = []
+        for _ in range(min(batch_size, count - offset)):
+            batch.append(StockMovement(
+                product_id=rng.randrange(products) + 1, movement_type='in',
+                quantity=rng.choice((1, 2, 5)), old_quantity=0, new_quantity=0,
+            ))
+        with transaction.atomic():
+            StockMovement.objects.bulk_create(batch)
+        # created_at 为 auto_now_add，写入后再按主键区间分散到 start 之后
+        for movement in batch:
+            movement.created_at = start + datetime.timedelta(seconds=rng.random() * span)
+        with transaction.atomic():
+            StockMovement.objects.bulk_update(batch, ['created_at'], batch_size=2000)
+
+    added = StockMovement.objects.filter(product=OuterRef('pk')).order_by().values(
+        'product').annotate(total=Sum('quantity')).values('total')
+    Product.objects.update(quantity=F('quantity') + Coalesce(Subquery(added), Value(0)))
+
+
+def total(result):
+    return sum(quantity for _, _, quantity in result.rows())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--movements', type=int, default=500000)
+    args = parser.parse_args()
+
+    with throwaway_database():
+        seed_products(args.rows)
+        start = timezone.now() - datetime.timedelta(days=30)
+        Product.objects.update(created_at=start - datetime.timedelta(days=1))
+        with timer() as t:
+            snapshot = take_snapshot()
+        print(f'{args.rows} 个商品，写入快照: {t["elapsed"] * 1000:.0f} ms')
+
+        StockSnapshot.objects.filter(pk=snapshot.pk).update(taken_at=start)
+        seed_movements(args.movements, args.rows, start)
+        at = start + datetime.timedelta(days=15)
+
+        with timer() as t:
+            quantity = total(StockAsOf(at))
+        print(f'从快照重放: {t["elapsed"]:.2f} s（库存合计 {quantity}）')
+
+        StockSnapshot.objects.all().delete()
+        with timer() as t:
+            quantity = total(StockAsOf(at))
+        print(f'无快照，从当前库存倒推: {t["elapsed"]:.2f} s（库存合计 {quantity}）')
+
+
+if __name__ == '__main__':
+    main()
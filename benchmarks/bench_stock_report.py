@@ -0,0 +1,51 @@
+"""库存报告基准：分组聚合的计算耗时与快照缓存命中耗时
+
+用法::
+
+    python benchmarks/bench_stock_report.py --rows 1000000
+
+依次测量：首次计算报表、命中快照、一次库存变动后重新计算、分类明细。
+"""
+import argparse
+
+from _common import seed_products, throwaway_database, timer
+
+from inventory import reports
+from inventory.models import Product
+from inventory.services import adjust_stock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    with throwaway_database():
+        seed_products(args.rows)
+        Product.objects.filter(pk__lte=args.rows // 10).update(cost_price=None)
+
+        with timer() as t:
+            report = reports.get_stock_report()
+        print(f'{args.rows} 个商品，{len(report.rows)} 个分类')
+        print(f'首次计算: {t["elapsed"] * 1000:.0f} ms')
+
+        with timer() as t:
+            reports.get_stock_report()
+        print(f'命中快照: {t["elapsed"] * 1000:.2f} ms')
+
+        adjust_stock(1, 5)
+        with timer() as t:
+            report = reports.get_stock_report()
+        print(f'库存变动后重新计算: {t["elapsed"] * 1000:.0f} ms')
+
+        category_id = report.rows[0].category_id
+        with timer() as t:
+            reports.get_category_report(category_id)
+        print(f'分类明细（首次）: {t["elapsed"] * 1000:.0f} ms')
+        with timer() as t:
+            reports.get_category_report(category_id)
+        print(f'分类明细（命中快照）: {t["elapsed"] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import logging
+import smtplib
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import LowStockAlert
+
+logger = logging.getLogger(__name__)
+
+# 默认每 5 分钟发送一次汇总邮件
+DEFAULT_ALERT_INTERVAL = 300
+
+# 单封汇总邮件最多列出的商品数，其余留到下一封
+DIGEST_MAX_ITEMS = 1000
+
+
+def _inventory_settings():
+    return getattr(settings, 'INVENTORY_SETTINGS', {})
+
+
+def alerts_enabled():
+    return bool(_inventory_settings().get('LOW_STOCK_ALERT_ENABLED', False))
+
+
+def get_alert_interval():
+    return _inventory_settings().get('LOW_STOCK_ALERT_INTERVAL') or DEFAULT_ALERT_INTERVAL
+
+
+def get_recipients(setting='LOW_STOCK_ALERT_RECIPIENTS'):
+    """INVENTORY_SETTINGS 中配置的收件人，未配置时发给填写了邮箱的管理员"""
+    recipients = _inventory_settings().get(setting)
+    if recipients:
+        return list(recipients)
+    return list(User.objects.filter(is_staff=True, is_active=True).exclude(
+        email='').values_list('email', flat=True))
+
+
+def is_low(quantity, low_stock_threshold):
+    """与 Product.is_low_stock 一致：库存不超过预警值（含缺货）"""
+    return quantity <= low_stock_threshold
+
+
+class AlertDelta:
+    """累积一批商品状态变化中的预警阈值穿越，最后一次性写入预警队列
+
+    只有从正常降到预警值以下（标记）或从预警值以下恢复（清除）的商品才会写库，
+    普通的库存变动不产生任何额外查询。状态为 (category_id, quantity, low_stock_threshold, price)。
+    """
+
+    def __init__(self):
+        self.flagged = {}
+        self.cleared = set()
+
+    def observe(self, product_id, old_quantity, old_threshold, new_quantity, new_threshold):
+        """old_quantity 为 None 表示新建的商品"""
+        was_low = old_quantity is not None and is_low(old_quantity, old_threshold)
+        now_low = is_low(new_quantity, new_threshold)
+        if now_low and not was_low:
+            self.cleared.discard(product_id)
+            self.flagged[product_id] = (new_quantity, new_threshold)
+        elif was_low and not now_low:
+            self.flagged.pop(product_id, None)
+            self.cleared.add(product_id)
+
+    def replace(self, product_id, old_state, new_state):
+        old_quantity, old_threshold = (None, None) if old_state is None else old_state[1:3]
+        self.observe(product_id, old_quantity, old_threshold, *new_state[1:3])
+
+    def apply(self):
+        flagged, cleared = self.flagged, self.cleared
+        self.flagged, self.cleared = {}, set()
+        if not alerts_enabled():
+            return
+        if cleared:
+            LowStockAlert.objects.filter(product_id__in=cleared).delete()
+        if flagged:
+            # 已有预警行（已标记的商品）时忽略冲突，不重复预警
+            LowStockAlert.objects.bulk_create([
+                LowStockAlert(product_id=product_id, quantity=quantity, low_stock_threshold=threshold)
+                for product_id, (quantity, threshold) in flagged.items()
+            ], ignore_conflicts=True)
+
+
+def build_digest(alerts, pending_total, recipients):
+    """把一批预警组成一封汇总邮件"""
+    lines = [f'以下 {len(alerts)} 个商品库存不足（库存 / 预警值）：', '']
+    for alert in alerts:
+        product = alert.product
+        status = '缺货' if product.quantity == 0 else '库存不足'
+        lines.append(f'[{status}] {product.sku} {product.name}: '
+                     f'{product.quantity} / {product.low_stock_threshold}')
+    if pending_total > len(alerts):
+        lines.extend(['', f'另有 {pending_total - len(alerts)} 个商品将在下一封邮件中列出。'])
+    return EmailMessage(
+        subject=f'[库存预警] {pending_total} 个商品库存不足',
+        body='\n'.join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipients,
+    )
+
+
+class AlertWorker:
+    """后台发送预警汇总邮件
+
+    每个间隔把队列中未发送的预警合成一封邮件，整个进程复用同一个邮件连接，
+    连接断开时下一次发送前重新建立。
+    """
+
+    def __init__(self, interval=None, connection=None):
+        self.interval = interval or get_alert_interval()
+        self.connection = connection
+        self.stopped = threading.Event()
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def send_digest(self):
+        """发送一封汇总邮件，返回其中的预警数"""
+        pending = LowStockAlert.objects.filter(sent_at__isnull=True)
+        alerts = list(pending.select_related('product').order_by('flagged_at')[:DIGEST_MAX_ITEMS])
+        if not alerts:
+            return 0
+
+        recipients = get_recipients()
+        if not recipients:
+            logger.warning(f"Low stock alerts pending ({len(alerts)}) but no recipients configured")
+            return 0
+
+        message = build_digest(alerts, pending.count(), recipients)
+        try:
+            try:
+                self.get_connection().send_messages([message])
+            except smtplib.SMTPServerDisconnected:
+                # 空闲期间被服务器断开的连接：重新连接后重试一次
+                self.close()
+                self.get_connection().send_messages([message])
+        except (smtplib.SMTPException, OSError):
+            # 丢弃可能已失效的连接，预警保留在队列中，下一个间隔重试
+            self.close()
+            raise
+
+        LowStockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(
+            sent_at=timezone.now())
+        logger.info(f"Low stock digest sent: {len(alerts)} products to {len(recipients)} recipients")
+        return len(alerts)
+
+    def run(self):
+        """每个间隔发送一次，直到 stop() 被调用"""
+        try:
+            while not self.stopped.is_set():
+                close_old_connections()
+                try:
+                    self.send_digest()
+                except (smtplib.SMTPException, OSError) as e:
+                    logger.error(f"Low stock digest failed: {e}")
+                self.stopped.wait(self.interval)
+        finally:
+            self.close()
+
+    def stop(self):
+        self.stopped.set()
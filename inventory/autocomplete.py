@@ -0,0 +1,299 @@
+import bisect
+import logging
+import threading
+from array import array
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from . import versions
+from .models import Product
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 未安装 pypinyin 时不索引拼音首字母
+    lazy_pinyin = None
+
+logger = logging.getLogger(__name__)
+
+# 共享缓存中的索引版本号，任何工作进程修改商品后递增
+VERSION_CACHE_KEY = 'inventory:autocomplete:version'
+
+# 每个键只保留前若干个字符，输入联想很少用到更长的前缀
+MAX_KEY_LENGTH = 16
+
+# 增量同步时向前多取的时间窗口，覆盖提交较晚但更新时间较早的事务
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# 失效条目超过该比例（且不少于 MIN_GARBAGE 条）时整体重建
+GARBAGE_RATIO = 0.2
+MIN_GARBAGE = 1000
+
+# 每个结果位预取的候选数量，用于抵消失效条目
+CANDIDATE_FACTOR = 3
+
+
+def pinyin_initials(name):
+    """商品名称的拼音首字母，如 “不锈钢螺丝” -> “bxgls”"""
+    if lazy_pinyin is None or not name:
+        return ''
+    return ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors='default')).lower()
+
+
+def index_keys(sku, name):
+    """一个商品在前缀索引中的全部键"""
+    keys = {sku.lower(), name.lower(), pinyin_initials(name)}
+    return {key[:MAX_KEY_LENGTH] for key in keys if key}
+
+
+def matches(prefix, sku, name):
+    """校验商品当前的编码/名称是否仍以 prefix 开头（prefix 已转小写）"""
+    return any(key.startswith(prefix[:MAX_KEY_LENGTH]) for key in index_keys(sku, name))
+
+
+class PrefixIndex:
+    """进程内的商品前缀索引
+
+    有序的键列表与平行的商品ID数组，前缀查找为一次二分查找加顺序扫描。
+    商品修改后只追加新键，旧键留作失效条目，查询时按数据库中的当前值校验过滤；
+    失效条目过多时整体重建。
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.ids = array('q')
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.version = None
+        self.watermark = None
+        self.max_id = 0
+        self.garbage = 0
+
+    def _insert(self, key, product_id):
+        position = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_right(self.keys, key, position)
+        if product_id in self.ids[position:end]:
+            return False
+        self.keys.insert(end, key)
+        self.ids.insert(end, product_id)
+        return True
+
+    def _merge(self, entries):
+        """把一批 (键, 商品ID) 一次归并进有序列表，返回实际新增的条目
+
+        逐条 insert 每次都要移动插入点之后的全部元素；这里先用二分查找定位每个新条目，
+        再按位置分段拼接出新的列表与数组，整批只复制一遍。
+        """
+        added = []
+        for key, product_id in sorted(set(entries)):
+            position = bisect.bisect_left(self.keys, key)
+            end = bisect.bisect_right(self.keys, key, position)
+            if product_id not in self.ids[position:end]:
+                added.append((end, key, product_id))
+        if not added:
+            return []
+
+        keys = []
+        ids = array('q')
+        start = 0
+        for end, key, product_id in added:
+            keys.extend(self.keys[start:end])
+            keys.append(key)
+            ids.extend(self.ids[start:end])
+            ids.append(product_id)
+            start = end
+        keys.extend(self.keys[start:])
+        ids.extend(self.ids[start:])
+        self.keys = keys
+        self.ids = ids
+        return [(key, product_id) for _, key, product_id in added]
+
+    def build(self):
+        """从数据库完整加载索引"""
+        version = get_version()
+        entries = []
+        watermark = None
+        max_id = 0
+        rows = Product.objects.order_by().values_list('id', 'sku', 'name', 'updated_at')
+        for product_id, sku, name, updated_at in rows.iterator(chunk_size=5000):
+            entries.extend((key, product_id) for key in index_keys(sku, name))
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+            max_id = max(max_id, product_id)
+        entries.sort()
+
+        with self.lock:
+            self.keys = [key for key, _ in entries]
+            self.ids = array('q', (product_id for _, product_id in entries))
+            self.watermark = watermark
+            self.max_id = max_id
+            self.version = version
+            self.garbage = 0
+            self.loaded = True
+        logger.info(f"Autocomplete index built: {len(self.keys)} keys")
+
+    def add_product(self, product_id, sku, name):
+        """索引一个新建或修改过的商品，已有商品的旧键留作失效条目"""
+        with self.lock:
+            added = sum(self._insert(key, product_id) for key in index_keys(sku, name))
+            if product_id <= self.max_id:
+                self.garbage += added
+            else:
+                self.max_id = product_id
+
+    def sync(self, version):
+        """其他进程修改过商品：按更新时间增量拉取变化，整批归并进索引
+
+        变化的已有商品通常各留下至少一个失效条目，按此估计加上后超过重建阈值时
+        直接重建，省得先归并再重建。
+        """
+        rows = Product.objects.order_by().values_list('id', 'sku', 'name', 'updated_at')
+        if self.watermark is not None:
+            rows = rows.filter(updated_at__gte=self.watermark - SYNC_OVERLAP)
+
+        entries = []
+        changed = 0
+        watermark = self.watermark
+        for product_id, sku, name, updated_at in rows:
+            entries.extend((key, product_id) for key in index_keys(sku, name))
+            if product_id <= self.max_id:
+                changed += 1
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+
+        if self.garbage + changed > self.garbage_limit():
+            logger.info(f"Autocomplete sync of {changed} changed products exceeds garbage limit, rebuilding")
+            self.build()
+            return
+
+        with self.lock:
+            max_id = self.max_id
+            for _, product_id in self._merge(entries):
+                if product_id <= max_id:
+                    self.garbage += 1
+                else:
+                    self.max_id = max(self.max_id, product_id)
+            self.watermark = watermark
+            self.version = version
+
+    def garbage_limit(self):
+        return max(MIN_GARBAGE, GARBAGE_RATIO * len(self.keys))
+
+    def needs_rebuild(self):
+        return self.garbage > self.garbage_limit()
+
+    def candidates(self, prefix, limit):
+        """按键顺序返回以 prefix 开头的商品ID（去重），最多 limit 个"""
+        prefix = prefix[:MAX_KEY_LENGTH]
+        result = []
+        seen = set()
+        with self.lock:
+            position = bisect.bisect_left(self.keys, prefix)
+            while position < len(self.keys) and len(result) < limit:
+                if not self.keys[position].startswith(prefix):
+                    break
+                product_id = self.ids[position]
+                if product_id not in seen:
+                    seen.add(product_id)
+                    result.append(product_id)
+                position += 1
+        return result
+
+
+_index = PrefixIndex()
+_build_lock = threading.Lock()
+
+
+def get_version():
+    return versions.get_version(VERSION_CACHE_KEY)
+
+
+def bump_version():
+    """通知所有工作进程商品数据已变化"""
+    versions.bump_version(VERSION_CACHE_KEY)
+
+
+def get_index():
+    """首次使用时加载索引；版本号变化时增量同步，失效条目过多时重建"""
+    index = _index
+    if not index.loaded or index.needs_rebuild():
+        with _build_lock:
+            # 并发的首次请求只需构建一次
+            if not index.loaded or index.needs_rebuild():
+                index.build()
+        return index
+
+    version = get_version()
+    if version != index.version:
+        index.sync(version)
+    return index
+
+
+async def aget_index():
+    """get_index 的异步版本：版本号未变时只读一次缓存，需要构建或同步时才在同步线程中查询数据库"""
+    index = _index
+    if index.loaded and not index.needs_rebuild():
+        version = await versions.aget_version(VERSION_CACHE_KEY)
+        if version == index.version:
+            return index
+    return await sync_to_async(get_index)()
+
+
+def product_saved(product):
+    """商品保存后（事务提交时）更新本进程索引并通知其他进程"""
+    def update():
+        if _index.loaded:
+            _index.add_product(product.pk, product.sku, product.name)
+        bump_version()
+    transaction.on_commit(update)
+
+
+def products_changed():
+    """批量修改或删除商品后通知所有进程（删除的商品在查询时被过滤掉）"""
+    transaction.on_commit(bump_version)
+
+
+def _pick(prefix, candidate_ids, by_id, limit):
+    """按候选顺序过滤掉失效条目，最多返回 limit 个"""
+    results = []
+    for product_id in candidate_ids:
+        row = by_id.get(product_id)
+        if row is not None and matches(prefix, row['sku'], row['name']):
+            results.append(row)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _candidate_rows(candidate_ids):
+    return Product.objects.filter(pk__in=candidate_ids).values('id', 'sku', 'name', 'quantity')
+
+
+def autocomplete(query, limit=10):
+    """按编码、名称或拼音首字母前缀返回最多 limit 个商品（id/sku/name/quantity）"""
+    prefix = query.strip().lower()
+    if not prefix:
+        return []
+
+    candidate_ids = get_index().candidates(prefix, limit * CANDIDATE_FACTOR)
+    if not candidate_ids:
+        return []
+
+    by_id = {row['id']: row for row in _candidate_rows(candidate_ids)}
+    return _pick(prefix, candidate_ids, by_id, limit)
+
+
+async def aautocomplete(query, limit=10):
+    """autocomplete 的异步版本：索引查找在内存中完成，候选商品用异步 ORM 读取"""
+    prefix = query.strip().lower()
+    if not prefix:
+        return []
+
+    index = await aget_index()
+    candidate_ids = index.candidates(prefix, limit * CANDIDATE_FACTOR)
+    if not candidate_ids:
+        return []
+
+    by_id = {row['id']: row async for row in _candidate_rows(candidate_ids)}
+    return _pick(prefix, candidate_ids, by_id, limit)
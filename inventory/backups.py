@@ -0,0 +1,252 @@
+import datetime
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BACKUP_FREQUENCIES = ('daily', 'weekly', 'monthly')
+
+# 每一步复制的页数；默认页大小 4KB 时每步约 4MB，步与步之间写操作可以继续
+DEFAULT_PAGES_PER_STEP = 1024
+DEFAULT_STEP_SLEEP = 0.05
+
+# 复制阶段的总时限（秒）：源数据库写入频繁时每次修改都会让复制从头开始，可能永远完成不了
+DEFAULT_BACKUP_TIMEOUT = 3600
+
+# 按天/周/月各保留的备份份数（祖父-父-子轮换）
+DEFAULT_KEEP = {'daily': 7, 'weekly': 4, 'monthly': 12}
+
+BACKUP_PREFIX = 'inventory_'
+BACKUP_NAME = re.compile(rf'^{BACKUP_PREFIX}(\d{{8}}_\d{{6}})\.sqlite3(\.gz)?$')
+
+# 校验与压缩时每次读写的字节数
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    """备份失败或备份文件校验不通过"""
+
+
+def _inventory_settings():
+    return getattr(settings, 'INVENTORY_SETTINGS', {})
+
+
+def get_backup_frequency():
+    frequency = _inventory_settings().get('BACKUP_FREQUENCY', 'daily')
+    return frequency if frequency in BACKUP_FREQUENCIES else 'daily'
+
+
+def get_backup_dir():
+    return _inventory_settings().get('BACKUP_DIR') or os.path.join(settings.BASE_DIR, 'backups')
+
+
+def get_keep():
+    return {**DEFAULT_KEEP, **(_inventory_settings().get('BACKUP_KEEP') or {})}
+
+
+class BackupResult:
+    """一次备份的结果"""
+
+    def __init__(self, path, size, sha256, pages, elapsed):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.pages = pages
+        self.elapsed = elapsed
+
+
+def list_backups(directory=None):
+    """备份目录中的备份文件，按时间从新到旧返回 [(本地时间, 路径)]"""
+    directory = directory or get_backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    backups = []
+    for name in os.listdir(directory):
+        match = BACKUP_NAME.match(name)
+        if match:
+            taken_at = timezone.make_aware(datetime.datetime.strptime(match.group(1), '%Y%m%d_%H%M%S'))
+            backups.append((taken_at, os.path.join(directory, name)))
+    return sorted(backups, reverse=True)
+
+
+def period_key(moment, frequency):
+    """备份时间所属的天/周/月"""
+    day = timezone.localtime(moment).date()
+    if frequency == 'weekly':
+        return day.isocalendar()[:2]
+    if frequency == 'monthly':
+        return day.year, day.month
+    return day
+
+
+def backup_due(frequency=None, directory=None, now=None):
+    """当前天/周/月还没有备份时返回 True"""
+    frequency = frequency or get_backup_frequency()
+    backups = list_backups(directory)
+    if not backups:
+        return True
+    return period_key(backups[0][0], frequency) != period_key(now or timezone.now(), frequency)
+
+
+def select_expired(backups, keep):
+    """按祖父-父-子规则找出可以删除的备份
+
+    每天、每周、每月各自保留最新的一份，分别保留最近 keep['daily'] 天、
+    keep['weekly'] 周、keep['monthly'] 月；任一规则保留的备份都不删除。
+    """
+    retained = set()
+    for frequency in BACKUP_FREQUENCIES:
+        periods = set()
+        for taken_at, path in backups:
+            key = period_key(taken_at, frequency)
+            if key in periods:
+                continue
+            if len(periods) >= keep.get(frequency, 0):
+                break
+            periods.add(key)
+            retained.add(path)
+    return [path for _, path in backups if path not in retained]
+
+
+def rotate_backups(directory=None, keep=None):
+    """删除轮换规则之外的旧备份，返回删除的路径"""
+    expired = select_expired(list_backups(directory), keep or get_keep())
+    for path in expired:
+        os.remove(path)
+        logger.info(f"Expired backup removed: {path}")
+    return expired
+
+
+def _source_connection(database=None, alias='default'):
+    """为备份单独打开一个到数据库文件的连接，不占用 Django 的连接"""
+    if database is None:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            raise BackupError(f'在线备份只支持 SQLite 数据库，当前为 {connection.vendor}')
+        database = connection.settings_dict['NAME']
+    database = str(database)
+    return sqlite3.connect(database, uri=database.startswith('file:'))
+
+
+def check_integrity(path):
+    """对 SQLite 文件运行 PRAGMA integrity_check，不通过时抛出 BackupError"""
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        rows = connection.execute('PRAGMA integrity_check').fetchall()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f'备份文件无法读取: {e}')
+    finally:
+        connection.close()
+    if rows != [('ok',)]:
+        problems = '; '.join(row[0] for row in rows[:5])
+        raise BackupError(f'备份文件完整性检查失败: {problems}')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def backup_database(directory=None, pages=None, sleep=None, compress=True, verify=True,
+                    database=None, alias='default', timeout=None):
+    """用 SQLite 在线备份 API 复制数据库
+
+    每一步只复制 pages 页，步与步之间休眠 sleep 秒，期间其他连接的写操作不受阻塞
+    （源数据库在复制过程中被修改时，SQLite 会自动从头继续复制）。
+    复制超过 timeout 秒仍未完成时中止并抛出 BackupError，错误信息中包含从头重新复制的次数。
+    副本先写入临时文件并做完整性检查，通过后再（可选）gzip 压缩并改名为最终文件，
+    目录中不会出现不完整的备份。database 为要备份的数据库文件，默认为 alias 对应的数据库。
+    """
+    inventory_settings = _inventory_settings()
+    directory = directory or get_backup_dir()
+    pages = pages or inventory_settings.get('BACKUP_PAGES_PER_STEP') or DEFAULT_PAGES_PER_STEP
+    if sleep is None:
+        sleep = inventory_settings.get('BACKUP_STEP_SLEEP', DEFAULT_STEP_SLEEP)
+    if timeout is None:
+        timeout = inventory_settings.get('BACKUP_TIMEOUT', DEFAULT_BACKUP_TIMEOUT)
+
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    name = timezone.localtime().strftime(f'{BACKUP_PREFIX}%Y%m%d_%H%M%S.sqlite3')
+    final_path = os.path.join(directory, name + ('.gz' if compress else ''))
+    fd, copy_path = tempfile.mkstemp(prefix='.backup_', suffix='.sqlite3', dir=directory)
+    os.close(fd)
+
+    progress = {'pages': 0, 'remaining': None, 'restarts': 0}
+    deadline = started + timeout
+
+    def report_progress(status, remaining, total):
+        # 剩余页数变多说明源数据库被修改，复制从头开始
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+        progress['pages'] = total
+        progress['remaining'] = remaining
+        # 回调中抛出的异常会中止复制并从 source.backup 抛出
+        if remaining and time.perf_counter() > deadline:
+            raise BackupError(f'备份超过 {timeout} 秒仍未完成（剩余 {remaining}/{total} 页，'
+                              f'因源数据库被修改从头重新复制 {progress["restarts"]} 次）')
+
+    source = _source_connection(database, alias)
+    try:
+        target = sqlite3.connect(copy_path)
+        try:
+            source.backup(target, pages=pages, progress=report_progress, sleep=sleep)
+        finally:
+            target.close()
+
+        if verify:
+            check_integrity(copy_path)
+
+        if compress:
+            partial = final_path + '.part'
+            with open(copy_path, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            os.replace(partial, final_path)
+        else:
+            os.replace(copy_path, final_path)
+    except sqlite3.Error as e:
+        raise BackupError(f'备份失败: {e}')
+    finally:
+        source.close()
+        for path in (copy_path, final_path + '.part'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    result = BackupResult(final_path, os.path.getsize(final_path), _sha256(final_path),
+                          progress['pages'], time.perf_counter() - started)
+    logger.info(f"Database backup written: {final_path} ({result.size / 1024 / 1024:.1f} MB, "
+                f"{result.pages} pages) in {result.elapsed:.1f}s")
+    return result
+
+
+def verify_backup(path):
+    """检查已有的备份文件（支持 .gz），不通过时抛出 BackupError"""
+    if not path.endswith('.gz'):
+        check_integrity(path)
+        return
+
+    fd, copy_path = tempfile.mkstemp(suffix='.sqlite3', dir=os.path.dirname(path) or None)
+    os.close(fd)
+    try:
+        try:
+            with gzip.open(path, 'rb') as src, open(copy_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+        except (OSError, EOFError) as e:
+            raise BackupError(f'备份文件解压失败: {e}')
+        check_integrity(copy_path)
+    finally:
+        os.remove(copy_path)
@@ -0,0 +1,359 @@
+"""同一台主机上多个 worker 进程共享的缓存后端（SQLite WAL 文件）
+
+LocMemCache 是进程内缓存：每个 gunicorn worker 各有一份，失效不会传播到其他进程，
+命中率按进程数摊薄，内存也重复占用。这里把缓存放在一个 WAL 模式的 SQLite 文件中，
+所有进程读写同一份数据，不需要额外运行 Redis::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'inventory.cache.SQLiteCache',
+            'LOCATION': '/var/cache/inventory/cache.sqlite3',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,          # 条目数上限
+                'MAX_SIZE': 256 * 1024 * 1024,  # 数据总字节数上限
+                'CULL_FREQUENCY': 3,            # 超出上限时淘汰 1/3（按最近访问时间，近似 LRU）
+            },
+        }
+    }
+
+整数值以 SQLite 整数保存，incr/decr 是一条原子的 UPDATE，适合做版本号计数器；
+其他值用 pickle 序列化。条目数与总字节数由触发器维护在统计行中，判断是否需要淘汰时不扫描全表。
+异步接口（aget/aset/aincr 等）在线程池中执行，不占用 ORM 使用的那个同步线程。
+"""
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# 最近访问时间的精度（秒）：同一条目在该时间内的重复读取不再更新访问时间，读操作基本不写库
+ACCESS_RESOLUTION = 30
+
+# 等待其他进程释放写锁的秒数
+BUSY_TIMEOUT = 5
+
+# 一条 SQL 中 IN (...) 的最大参数个数
+MAX_VARIABLES = 500
+
+# 按大小淘汰时每批删除的条目数
+CULL_BATCH = 100
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    pickled INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires) WHERE expires IS NOT NULL;
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (id, entries, size) VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry BEGIN
+    UPDATE cache_stats SET entries = entries + 1, size = size + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry BEGIN
+    UPDATE cache_stats SET entries = entries - 1, size = size - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_resize AFTER UPDATE OF size ON cache_entry BEGIN
+    UPDATE cache_stats SET size = size - old.size + new.size WHERE id = 0;
+END;
+'''
+
+UPSERT = '''
+INSERT INTO cache_entry (key, value, pickled, expires, accessed, size) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET value = excluded.value, pickled = excluded.pickled,
+    expires = excluded.expires, accessed = excluded.accessed, size = excluded.size
+'''
+
+NOT_EXPIRED = '(expires IS NULL OR expires > ?)'
+
+
+def _chunks(items, size=MAX_VARIABLES):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """以 SQLite 文件为存储的跨进程缓存，支持过期时间、按大小的近似 LRU 淘汰与原子 incr"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._location = str(location)
+        self._max_size = int(options.get('MAX_SIZE', DEFAULT_MAX_SIZE))
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_pid = None
+
+    # 连接 -----------------------------------------------------------------
+
+    def _connection(self):
+        """每个线程一个连接；fork 之后的子进程重新连接，不复用父进程的连接"""
+        pid = os.getpid()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != pid:
+            connection = self._connect()
+            self._local.connection = connection
+            self._local.pid = pid
+        return connection
+
+    def _connect(self):
+        directory = os.path.dirname(self._location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self._location, timeout=BUSY_TIMEOUT, isolation_level=None)
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        with self._schema_lock:
+            if self._schema_pid != os.getpid():
+                connection.executescript(SCHEMA)
+                self._schema_pid = os.getpid()
+        return connection
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def close(self, **kwargs):
+        # 连接在线程内复用，请求结束时不关闭
+        pass
+
+    # 编码 -----------------------------------------------------------------
+
+    @staticmethod
+    def _encode(key, value):
+        """返回 (value, pickled, size)：整数原样保存以便 incr 在数据库内完成"""
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value, 0, len(key) + 8
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return data, 1, len(key) + len(data)
+
+    @staticmethod
+    def _decode(value, pickled):
+        return pickle.loads(value) if pickled else value
+
+    def _build_row(self, key, value, timeout, now):
+        encoded, pickled, size = self._encode(key, value)
+        return key, encoded, pickled, self.get_backend_timeout(timeout), now, size
+
+    # 读取 -----------------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            f'SELECT value, pickled, accessed FROM cache_entry WHERE key = ? AND {NOT_EXPIRED}',
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return default
+        if now - row[2] > ACCESS_RESOLUTION:
+            connection.execute('UPDATE cache_entry SET accessed = ? WHERE key = ?', (now, key))
+        return self._decode(row[0], row[1])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        now = time.time()
+        connection = self._connection()
+        result, stale = {}, []
+        for chunk in _chunks(list(key_map)):
+            placeholders = ', '.join('?' * len(chunk))
+            rows = connection.execute(
+                f'SELECT key, value, pickled, accessed FROM cache_entry '
+                f'WHERE key IN ({placeholders}) AND {NOT_EXPIRED}',
+                (*chunk, now)
+            )
+            for key, value, pickled, accessed in rows:
+                result[key_map[key]] = self._decode(value, pickled)
+                if now - accessed > ACCESS_RESOLUTION:
+                    stale.append(key)
+        for chunk in _chunks(stale):
+            connection.execute(
+                f'UPDATE cache_entry SET accessed = ? WHERE key IN ({", ".join("?" * len(chunk))})',
+                (now, *chunk)
+            )
+        return result
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            f'SELECT 1 FROM cache_entry WHERE key = ? AND {NOT_EXPIRED}', (key, time.time())
+        ).fetchone() is not None
+
+    # 写入 -----------------------------------------------------------------
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        connection.execute(UPSERT, self._build_row(key, value, timeout, time.time()))
+        self._cull_if_needed(connection)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """键不存在（或已过期）时写入，返回是否写入"""
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        connection = self._connection()
+        cursor = connection.execute(
+            UPSERT + ' WHERE cache_entry.expires IS NOT NULL AND cache_entry.expires <= ?',
+            (*self._build_row(key, value, timeout, now), now)
+        )
+        if cursor.rowcount:
+            self._cull_if_needed(connection)
+        return bool(cursor.rowcount)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [self._build_row(self.make_and_validate_key(key, version=version), value, timeout, now)
+                for key, value in data.items()]
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, rows)
+        self._cull_if_needed(connection)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection().execute(
+            f'UPDATE cache_entry SET expires = ? WHERE key = ? AND {NOT_EXPIRED}',
+            (self.get_backend_timeout(timeout), key, now)
+        )
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        """原子递增：整数值在数据库内一条 UPDATE 完成，多个进程同时递增不会丢失"""
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                f'UPDATE cache_entry SET value = value + ?, accessed = ? '
+                f'WHERE key = ? AND pickled = 0 AND {NOT_EXPIRED} RETURNING value',
+                (delta, now, key, now)
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            # 非整数值（例如保存时为 bool 或超出 64 位的整数）：在同一事务内读出、相加、写回
+            row = connection.execute(
+                f'SELECT value, pickled FROM cache_entry WHERE key = ? AND {NOT_EXPIRED}', (key, now)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(*row) + delta
+            encoded, pickled, size = self._encode(key, value)
+            connection.execute(
+                'UPDATE cache_entry SET value = ?, pickled = ?, size = ?, accessed = ? WHERE key = ?',
+                (encoded, pickled, size, now, key)
+            )
+            return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+        return bool(cursor.rowcount)
+
+    def delete_many(self, keys, version=None):
+        keys = [(self.make_and_validate_key(key, version=version),) for key in keys]
+        with self._transaction() as connection:
+            connection.executemany('DELETE FROM cache_entry WHERE key = ?', keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entry')
+
+    # 异步接口 -------------------------------------------------------------
+
+    # BaseCache 的异步方法在 thread_sensitive 的同步线程中执行，与异步视图的 ORM 查询排队；
+    # 本后端每个线程有自己的连接，可以放到线程池中与查询并行。批量方法也只调用一次，
+    # 不像基类那样逐个键 aget/aset。
+
+    @staticmethod
+    def _in_thread(method):
+        return sync_to_async(method, thread_sensitive=False)
+
+    async def aget(self, key, default=None, version=None):
+        return await self._in_thread(self.get)(key, default, version)
+
+    async def aget_many(self, keys, version=None):
+        return await self._in_thread(self.get_many)(keys, version)
+
+    async def ahas_key(self, key, version=None):
+        return await self._in_thread(self.has_key)(key, version)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._in_thread(self.set)(key, value, timeout, version)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._in_thread(self.add)(key, value, timeout, version)
+
+    async def aset_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._in_thread(self.set_many)(data, timeout, version)
+
+    async def atouch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._in_thread(self.touch)(key, timeout, version)
+
+    async def aincr(self, key, delta=1, version=None):
+        return await self._in_thread(self.incr)(key, delta, version)
+
+    async def adelete(self, key, version=None):
+        return await self._in_thread(self.delete)(key, version)
+
+    async def adelete_many(self, keys, version=None):
+        return await self._in_thread(self.delete_many)(keys, version)
+
+    async def aclear(self):
+        return await self._in_thread(self.clear)()
+
+    # 淘汰 -----------------------------------------------------------------
+
+    def _stats(self, connection):
+        return connection.execute('SELECT entries, size FROM cache_stats WHERE id = 0').fetchone()
+
+    def _cull_if_needed(self, connection):
+        entries, size = self._stats(connection)
+        if entries > self._max_entries or size > self._max_size:
+            self._cull()
+
+    def _cull(self):
+        """先删除过期条目，仍超出上限时按最近访问时间删除最旧的条目
+
+        与 Django 其他后端一致：CULL_FREQUENCY 为 N 时淘汰到上限的 (N-1)/N，为 0 时清空。
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?', (now,))
+            entries, size = self._stats(connection)
+            if entries <= self._max_entries and size <= self._max_size:
+                return
+            if self._cull_frequency == 0:
+                connection.execute('DELETE FROM cache_entry')
+                return
+            target_entries = self._max_entries - self._max_entries // self._cull_frequency
+            target_size = self._max_size - self._max_size // self._cull_frequency
+            oldest = ('DELETE FROM cache_entry WHERE key IN '
+                      '(SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)')
+            if entries > target_entries:
+                connection.execute(oldest, (entries - target_entries,))
+                entries, size = self._stats(connection)
+            while size > target_size and entries:
+                connection.execute(oldest, (CULL_BATCH,))
+                entries, size = self._stats(connection)
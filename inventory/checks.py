@@ -0,0 +1,46 @@
+import importlib.util
+
+from django.core.checks import Error, Tags, Warning, register
+from django.db import DatabaseError, connections
+
+
+@register(Tags.database)
+def check_database_connection(app_configs, databases=None, **kwargs):
+    """启动检查：能否连接数据库（manage.py check --database default，migrate 时也会执行）"""
+    errors = []
+    for alias in databases or []:
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError as e:
+            errors.append(Error(
+                f'无法连接数据库 {alias}: {e}',
+                hint='检查 DATABASE_URL 以及数据库服务是否已启动。',
+                id='inventory.E001',
+            ))
+    return errors
+
+
+@register(Tags.compatibility)
+def check_connection_reuse(app_configs, **kwargs):
+    """PostgreSQL 应复用连接：使用连接池，或设置 CONN_MAX_AGE 使用持久连接"""
+    errors = []
+    for alias in connections:
+        settings_dict = connections[alias].settings_dict
+        if settings_dict['ENGINE'] != 'django.db.backends.postgresql':
+            continue
+        pool = settings_dict.get('OPTIONS', {}).get('pool')
+        if pool and importlib.util.find_spec('psycopg_pool') is None:
+            errors.append(Error(
+                f'数据库 {alias} 启用了连接池，但没有安装 psycopg_pool。',
+                hint='pip install "psycopg[pool]"，或设置 DB_POOL=false 改用持久连接。',
+                id='inventory.E002',
+            ))
+        elif not pool and not settings_dict.get('CONN_MAX_AGE'):
+            errors.append(Warning(
+                f'数据库 {alias} 既没有使用连接池，也没有开启持久连接，每个请求都会重新建立连接。',
+                hint='设置 DB_POOL=true，或设置 DB_CONN_MAX_AGE 为大于 0 的秒数。',
+                id='inventory.W001',
+            ))
+    return errors
@@ -0,0 +1,266 @@
+import csv
+import logging
+import os
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Abs
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .alerts import get_recipients
+from .filters import local_day_start
+from .models import Category, DailyReport, InventorySummary, Product, StockMovement
+from .summary import get_summary
+
+logger = logging.getLogger(__name__)
+
+# 报告中列出的变动最多的商品数
+TOP_MOVERS_LIMIT = 10
+
+# 报告中列出的新增库存不足商品数上限
+NEW_LOW_STOCK_LIMIT = 200
+
+
+def _inventory_settings():
+    return getattr(settings, 'INVENTORY_SETTINGS', {})
+
+
+def daily_reports_enabled():
+    return bool(_inventory_settings().get('SEND_DAILY_REPORTS', False))
+
+
+def get_report_dir():
+    return _inventory_settings().get('DAILY_REPORT_DIR') or os.path.join(settings.BASE_DIR, 'reports')
+
+
+class CategoryActivity:
+    """某个分类在统计期间的出入库与库存价值变化"""
+
+    def __init__(self, category_id, name):
+        self.category_id = category_id
+        self.name = name
+        self.movement_count = 0
+        self.inbound = 0
+        self.outbound = 0
+        self.stock_value = Decimal(0)
+        self.value_delta = Decimal(0)
+
+    @property
+    def net(self):
+        return self.inbound - self.outbound
+
+
+class DailyReportData:
+    """一次报告的内容：统计期间 (period_start, period_end] 的变化"""
+
+    def __init__(self, period_start, period_end):
+        self.period_start = period_start
+        self.period_end = period_end
+        self.categories = []
+        self.top_movers = []
+        self.new_low_stock = []
+        self.movement_count = 0
+        self.stock_value = Decimal(0)
+        self.value_delta = Decimal(0)
+        self.category_values = {}
+
+    @property
+    def inbound(self):
+        return sum(category.inbound for category in self.categories)
+
+    @property
+    def outbound(self):
+        return sum(category.outbound for category in self.categories)
+
+
+def movements_after(report):
+    """上一次报告之后的库存变动：按 (created_at, id) 高水位取，首次生成时从今天零点开始"""
+    movements = StockMovement.objects.all()
+    if report is None or report.last_movement_at is None:
+        return movements.filter(created_at__gte=local_day_start(timezone.localdate()))
+    return movements.filter(
+        Q(created_at__gt=report.last_movement_at) |
+        Q(created_at=report.last_movement_at, id__gt=report.last_movement_id)
+    )
+
+
+class DailyReportGenerator:
+    """增量生成每日库存报告
+
+    只读取上一次报告之后新增的库存变动和更新过的商品，
+    库存价值取自增量维护的汇总计数器，耗时只与当天的业务量有关。
+    """
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir or get_report_dir()
+
+    def generate(self, send_email=None):
+        started = time.perf_counter()
+        previous = DailyReport.objects.order_by('-generated_at').first()
+        now = timezone.now()
+        period_start = previous.generated_at if previous else local_day_start(timezone.localdate())
+        data = DailyReportData(period_start, now)
+
+        # 本次统计的上界：开始时最新的一条变动，之后写入的留给下一次
+        movements = movements_after(previous)
+        last = movements.order_by('-created_at', '-id').values_list('created_at', 'id').first()
+        if last is not None:
+            movements = movements.filter(
+                Q(created_at__lt=last[0]) | Q(created_at=last[0], id__lte=last[1])
+            )
+            self.collect_movements(data, movements)
+
+        products_since = previous.products_updated_until if previous else period_start
+        products_until = self.collect_new_low_stock(data, products_since, movements)
+        self.collect_valuation(data, previous)
+
+        report = DailyReport(
+            generated_at=now,
+            period_start=period_start,
+            last_movement_at=last[0] if last else getattr(previous, 'last_movement_at', None),
+            last_movement_id=last[1] if last else getattr(previous, 'last_movement_id', None),
+            products_updated_until=products_until or products_since,
+            movement_count=data.movement_count,
+            stock_value=data.stock_value,
+            category_values=data.category_values,
+        )
+        self.write_artifacts(report, data)
+
+        if send_email is None:
+            send_email = daily_reports_enabled()
+        if send_email:
+            report.emailed = self.send(report, data)
+
+        # 报告文件写成功后才保存高水位，失败时下一次仍从同一位置开始
+        report.save()
+
+        logger.info(f"Daily report generated: {data.movement_count} movements, "
+                    f"{len(data.new_low_stock)} new low stock products "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return report, data
+
+    def collect_movements(self, data, movements):
+        """按分类汇总出入库，并找出变动最多的商品（只扫描本期间的变动）"""
+        names = dict(Category.objects.values_list('pk', 'name'))
+        categories = {}
+        rows = movements.order_by().values('product__category_id').annotate(
+            movement_count=Count('id'),
+            inbound=Sum('quantity', filter=Q(quantity__gt=0)),
+            outbound=Sum('quantity', filter=Q(quantity__lt=0)),
+        )
+        for row in rows:
+            category_id = row['product__category_id']
+            activity = categories[category_id] = CategoryActivity(
+                category_id, names.get(category_id, '未分类'))
+            activity.movement_count = row['movement_count']
+            activity.inbound = row['inbound'] or 0
+            activity.outbound = -(row['outbound'] or 0)
+            data.movement_count += activity.movement_count
+        data.categories = sorted(categories.values(), key=lambda c: c.movement_count, reverse=True)
+
+        data.top_movers = list(
+            movements.order_by().values('product_id', 'product__sku', 'product__name').annotate(
+                moved=Sum(Abs('quantity')),
+                net=Sum('quantity'),
+                movement_count=Count('id'),
+            ).order_by('-moved')[:TOP_MOVERS_LIMIT]
+        )
+
+    def collect_new_low_stock(self, data, since, movements=None):
+        """本期间新变为库存不足的商品；返回已检查到的最大更新时间
+
+        只列出真正穿越预警值的商品：since 之后新建的商品，或上一次报告时的库存（movements 中
+        该商品第一条变动的变动前数量）高于预警值的商品。上一次报告时已经不足、之后只是又有变动
+        或被编辑的商品不重复列出。预警值按当前值比较，只修改了预警值而库存没有变动的商品不算穿越。
+        """
+        changed = Product.objects.filter(updated_at__gt=since) if since else Product.objects.all()
+        until = changed.order_by('-updated_at').values_list('updated_at', flat=True).first()
+        low = changed.filter(quantity__lte=F('low_stock_threshold'))
+        if since and movements is not None:
+            quantity_before = movements.filter(
+                product=OuterRef('pk')
+            ).order_by('created_at', 'id').values('old_quantity')[:1]
+            low = low.annotate(quantity_before=Subquery(quantity_before)).filter(
+                Q(created_at__gt=since) | Q(quantity_before__gt=F('low_stock_threshold'))
+            )
+        data.new_low_stock = list(
+            low.order_by('-updated_at').values(
+                'pk', 'sku', 'name', 'quantity', 'low_stock_threshold')[:NEW_LOW_STOCK_LIMIT]
+        )
+        return until
+
+    def collect_valuation(self, data, previous):
+        """当前库存价值取自汇总计数器，与上一次报告比较得到变化量"""
+        total = get_summary()
+        data.stock_value = Decimal(total.stock_value)
+        data.value_delta = data.stock_value - (Decimal(previous.stock_value) if previous else data.stock_value)
+
+        previous_values = previous.category_values if previous else {}
+        by_key = {InventorySummary.key_for_category(activity.category_id): activity
+                  for activity in data.categories}
+        names = dict(Category.objects.values_list('pk', 'name'))
+        for summary in InventorySummary.objects.exclude(key=InventorySummary.GLOBAL_KEY):
+            value = Decimal(summary.stock_value)
+            data.category_values[summary.key] = str(value)
+            activity = by_key.get(summary.key)
+            if activity is None:
+                previous_value = previous_values.get(summary.key)
+                if previous_value is None or Decimal(previous_value) == value:
+                    continue
+                activity = CategoryActivity(summary.category_id, names.get(summary.category_id, '未分类'))
+                data.categories.append(activity)
+            activity.stock_value = value
+            activity.value_delta = value - Decimal(previous_values.get(summary.key, value))
+
+    def write_artifacts(self, report, data):
+        """写出 HTML 与 CSV 报告文件"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        basename = timezone.localtime(data.period_end).strftime('daily_report_%Y%m%d_%H%M%S')
+
+        report.html_path = os.path.join(self.output_dir, basename + '.html')
+        with open(report.html_path, 'w', encoding='utf-8') as f:
+            f.write(render_daily_report(data))
+
+        report.csv_path = os.path.join(self.output_dir, basename + '.csv')
+        with open(report.csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+            write_daily_report_csv(f, data)
+
+    def send(self, report, data):
+        recipients = get_recipients('DAILY_REPORT_RECIPIENTS')
+        if not recipients:
+            logger.warning("Daily report generated but no recipients configured")
+            return False
+
+        day = timezone.localtime(data.period_end).strftime('%Y-%m-%d')
+        message = EmailMultiAlternatives(
+            subject=f'[每日库存报告] {day}',
+            body=(f'统计期间共 {data.movement_count} 条库存变动，入库 {data.inbound}，出库 {data.outbound}；'
+                  f'新增库存不足商品 {len(data.new_low_stock)} 个；'
+                  f'库存总值 ¥{data.stock_value:.2f}（变化 {data.value_delta:+.2f}）。详见附件。'),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=recipients,
+        )
+        with open(report.html_path, encoding='utf-8') as f:
+            message.attach_alternative(f.read(), 'text/html')
+        message.attach_file(report.csv_path, 'text/csv')
+        message.send()
+        return True
+
+
+def render_daily_report(data):
+    return render_to_string('inventory/daily_report.html', {'data': data})
+
+
+def write_daily_report_csv(f, data):
+    """CSV 报告：每个分类一行，最后一行为合计"""
+    writer = csv.writer(f)
+    writer.writerow(['分类', '变动次数', '入库数量', '出库数量', '净变动', '库存总值', '库存价值变化'])
+    for category in data.categories:
+        writer.writerow([category.name, category.movement_count, category.inbound, category.outbound,
+                         category.net, category.stock_value, category.value_delta])
+    writer.writerow(['合计', data.movement_count, data.inbound, data.outbound,
+                     data.inbound - data.outbound, data.stock_value, data.value_delta])
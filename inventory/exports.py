@@ -0,0 +1,258 @@
+import csv
+import io
+import itertools
+import zlib
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Product, StockMovement
+
+# 导出时每批从数据库读取的行数
+EXPORT_CHUNK_SIZE = 2000
+
+# 输出缓冲区达到该大小后才交给服务器发送，避免每行一次写操作
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# UTF-8 BOM，保证 Excel 正确识别中文
+CSV_BOM = '\ufeff'
+
+PRODUCT_EXPORT_COLUMNS = [
+    ('sku', '商品编码'),
+    ('name', '商品名称'),
+    ('category__name', '分类'),
+    ('quantity', '库存数量'),
+    ('price', '单价'),
+    ('cost_price', '成本价'),
+    ('low_stock_threshold', '库存预警值'),
+    ('is_active', '是否启用'),
+    ('created_by__username', '创建人'),
+    ('updated_at', '更新时间'),
+]
+
+
+MOVEMENT_EXPORT_COLUMNS = [
+    ('created_at', '变动时间'),
+    ('product__sku', '商品编码'),
+    ('product__name', '商品名称'),
+    ('product__category__name', '分类'),
+    ('movement_type', '变动类型'),
+    ('quantity', '变动数量'),
+    ('old_quantity', '变动前数量'),
+    ('new_quantity', '变动后数量'),
+    ('reason', '变动原因'),
+    ('reference_no', '参考单号'),
+    ('created_by__username', '操作人'),
+]
+
+# 库存变动导出的最后一列，区分原始记录与已合并的日汇总
+RECORD_TYPE_LABEL = '记录类型'
+RECORD_TYPE_RAW = '明细'
+RECORD_TYPE_DAILY = '日汇总'
+
+DAILY_EXPORT_FIELDS = [
+    'product__sku', 'product__name', 'product__category__name', 'movement_type',
+    'quantity', 'movement_count', 'inbound', 'outbound',
+]
+
+
+def get_export_limit():
+    """读取导出行数上限，None 或 0 表示不限制"""
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('MAX_EXPORT_RECORDS') or None
+
+
+def format_datetime(value):
+    """将时间转换为本地时区字符串"""
+    if value is None:
+        return ''
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def iter_csv(header, rows):
+    """将行迭代器编码为CSV文本块
+
+    每个文本块约 EXPORT_BUFFER_SIZE 大小，内存占用与导出总行数无关。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write(CSV_BOM)
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def product_export_queryset(queryset=None):
+    """构造商品导出查询
+
+    只读取导出需要的列，分类和创建人通过 JOIN 在同一条查询中取回；
+    按主键排序，避免对默认的 -updated_at 排序做全表排序。
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    fields = [field for field, _ in PRODUCT_EXPORT_COLUMNS]
+    queryset = queryset.order_by('pk').values_list(*fields)
+
+    limit = get_export_limit()
+    if limit:
+        queryset = queryset[:limit]
+    return queryset
+
+
+def iter_product_rows(queryset):
+    """逐行产出商品导出数据"""
+    for (sku, name, category_name, quantity, price, cost_price,
+         threshold, is_active, creator, updated_at) in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (
+            sku,
+            name,
+            category_name or '',
+            quantity,
+            price,
+            '' if cost_price is None else cost_price,
+            threshold,
+            '是' if is_active else '否',
+            creator or '',
+            format_datetime(updated_at),
+        )
+
+
+def stream_products_csv(queryset=None):
+    """以CSV文本块的形式流式输出商品数据"""
+    queryset = product_export_queryset(queryset)
+    header = [label for _, label in PRODUCT_EXPORT_COLUMNS]
+    return iter_csv(header, iter_product_rows(queryset))
+
+
+def iter_gzip(chunks):
+    """将文本块流式压缩为gzip字节块"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def keyset_after(queryset, created_at, pk):
+    """(created_at, id) 在给定键之后的行
+
+    OR 条件本身不能用于索引范围查找，SQLite 会从头扫描 (created_at, id) 索引；
+    额外的 created_at >= 上界让查询计划变为从该位置开始的范围查找（SEARCH ... created_at>?）。
+    """
+    return queryset.filter(created_at__gte=created_at).filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+    )
+
+
+def iter_keyset(queryset, fields, batch_size=EXPORT_CHUNK_SIZE):
+    """按 (created_at, id) 键集分页遍历查询集
+
+    每批都从上一批最后一行之后开始取，不使用 OFFSET，
+    因此无论遍历到多深，每批查询的代价都相同。
+    产出的每行前两列固定为 created_at 和 id。
+    """
+    queryset = queryset.order_by('created_at', 'id').values_list(
+        'created_at', 'id', *fields
+    )
+    batch = list(queryset[:batch_size])
+    while batch:
+        yield from batch
+        if len(batch) < batch_size:
+            break
+        last_created_at, last_id = batch[-1][0], batch[-1][1]
+        batch = list(keyset_after(queryset, last_created_at, last_id)[:batch_size])
+
+
+def iter_movement_rows(queryset, limit=None):
+    """逐行产出库存变动导出数据，limit 为最多产出的行数"""
+    type_labels = dict(StockMovement.MOVEMENT_TYPES)
+    fields = [field for field, _ in MOVEMENT_EXPORT_COLUMNS[1:]]
+
+    for count, row in enumerate(iter_keyset(queryset, fields), start=1):
+        if limit and count > limit:
+            break
+        (created_at, _pk, sku, name, category_name, movement_type, quantity,
+         old_quantity, new_quantity, reason, reference_no, operator) = row
+        yield (
+            format_datetime(created_at),
+            sku,
+            name,
+            category_name or '',
+            type_labels.get(movement_type, movement_type),
+            quantity,
+            old_quantity,
+            new_quantity,
+            reason,
+            reference_no,
+            operator or '',
+        )
+
+
+def iter_daily_keyset(queryset, fields, batch_size=EXPORT_CHUNK_SIZE):
+    """按 (day, id) 键集分页遍历日汇总，产出的每行前两列固定为 day 和 id"""
+    queryset = queryset.order_by('day', 'id').values_list('day', 'id', *fields)
+    batch = list(queryset[:batch_size])
+    while batch:
+        yield from batch
+        if len(batch) < batch_size:
+            break
+        last_day, last_id = batch[-1][0], batch[-1][1]
+        batch = list(queryset.filter(day__gte=last_day).filter(
+            Q(day__gt=last_day) | Q(day=last_day, id__gt=last_id)
+        )[:batch_size])
+
+
+def iter_daily_movement_rows(queryset):
+    """逐行产出日汇总的导出数据，列与 MOVEMENT_EXPORT_COLUMNS 对齐
+
+    变动时间只有日期，变动数量为当日净变动，变动前后数量、参考单号与操作人已无法还原，留空。
+    """
+    type_labels = dict(StockMovement.MOVEMENT_TYPES)
+    for (day, _pk, sku, name, category_name, movement_type, quantity,
+         movement_count, inbound, outbound) in iter_daily_keyset(queryset, DAILY_EXPORT_FIELDS):
+        yield (
+            day.isoformat(),
+            sku,
+            name,
+            category_name or '',
+            type_labels.get(movement_type, movement_type),
+            quantity,
+            '',
+            '',
+            f'{movement_count} 次变动合并（增加 {inbound}，减少 {outbound}）',
+            '',
+            '',
+        )
+
+
+def stream_movements_csv(queryset=None, daily=None):
+    """以CSV文本块的形式流式输出库存变动数据
+
+    daily 为已合并的日汇总（StockMovementDaily 查询集），按日期顺序排在原始记录之前：
+    合并按整天进行，日汇总的日期都早于仍保留的原始记录。最后一列标明记录类型。
+    """
+    if queryset is None:
+        queryset = StockMovement.objects.all()
+    header = [label for _, label in MOVEMENT_EXPORT_COLUMNS] + [RECORD_TYPE_LABEL]
+    rows = (row + (RECORD_TYPE_RAW,) for row in iter_movement_rows(queryset))
+    if daily is not None:
+        rows = itertools.chain(
+            (row + (RECORD_TYPE_DAILY,) for row in iter_daily_movement_rows(daily)), rows)
+    limit = get_export_limit()
+    if limit:
+        rows = itertools.islice(rows, limit)
+    return iter_csv(header, rows)
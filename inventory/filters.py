@@ -0,0 +1,68 @@
+import datetime
+
+from django.db import models
+from django.utils import timezone
+
+from .search import search_products
+
+
+def filter_products(queryset, query='', stock_status=''):
+    """按搜索关键词和库存状态过滤商品
+
+    商品列表和CSV导出共用同一套过滤规则，保证导出内容与页面所见一致。
+    有关键词时结果按相关度排序（见 inventory.search）。
+    """
+    if query:
+        queryset = search_products(queryset, query)
+
+    # 库存状态过滤
+    if stock_status == 'in_stock':
+        queryset = queryset.filter(quantity__gt=models.F('low_stock_threshold'))
+    elif stock_status == 'low_stock':
+        queryset = queryset.filter(
+            quantity__lte=models.F('low_stock_threshold'),
+            quantity__gt=0
+        )
+    elif stock_status == 'out_of_stock':
+        queryset = queryset.filter(quantity=0)
+
+    return queryset
+
+
+def local_day_start(day):
+    """本地时区某一天的零点"""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def filter_movements(queryset, date_from=None, date_to=None, product=None,
+                     category=None, movement_type=''):
+    """按日期范围、商品、分类和变动类型过滤库存变动，日期范围含两端"""
+    if date_from:
+        queryset = queryset.filter(created_at__gte=local_day_start(date_from))
+    if date_to:
+        queryset = queryset.filter(
+            created_at__lt=local_day_start(date_to + datetime.timedelta(days=1))
+        )
+    if product:
+        queryset = queryset.filter(product=product)
+    if category:
+        queryset = queryset.filter(product__category=category)
+    if movement_type:
+        queryset = queryset.filter(movement_type=movement_type)
+    return queryset
+
+
+def filter_daily_movements(queryset, date_from=None, date_to=None, product=None,
+                           category=None, movement_type=''):
+    """与 filter_movements 相同的条件作用于库存变动日汇总"""
+    if date_from:
+        queryset = queryset.filter(day__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(day__lte=date_to)
+    if product:
+        queryset = queryset.filter(product=product)
+    if category:
+        queryset = queryset.filter(product__category=category)
+    if movement_type:
+        queryset = queryset.filter(movement_type=movement_type)
+    return queryset
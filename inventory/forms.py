@@ -20,6 +20,18 @@ class CustomAuthenticationForm(AuthenticationForm):
         })
 
 
+def normalize_sku(sku):
+    """规范化SKU（转大写、去空格）并校验格式"""
+    if sku:
+        # 转为大写并去除空格
+        sku = sku.upper().strip()
+
+        # SKU格式验证
+        if not re.match(r'^[A-Za-z0-9\-_]+$', sku):
+            raise ValidationError('商品编码只能包含字母、数字、连字符和下划线')
+    return sku
+
+
 class ProductForm(forms.ModelForm):
     """商品表单 - 修复版本"""
 
@@ -95,8 +107,9 @@ class ProductForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         # 设置字段为可选（除了必填字段）
-        self.fields['category'].required = False
-        self.fields['category'].empty_label = '请选择分类'
+        if 'category' in self.fields:
+            self.fields['category'].required = False
+            self.fields['category'].empty_label = '请选择分类'
         self.fields['description'].required = False
         self.fields['cost_price'].required = False
         self.fields['low_stock_threshold'].required = False
@@ -109,15 +122,8 @@ class ProductForm(forms.ModelForm):
 
     def clean_sku(self):
         """验证SKU格式和唯一性"""
-        sku = self.cleaned_data.get('sku')
+        sku = normalize_sku(self.cleaned_data.get('sku'))
         if sku:
-            # 转为大写并去除空格
-            sku = sku.upper().strip()
-
-            # SKU格式验证
-            if not re.match(r'^[A-Za-z0-9\-_]+$', sku):
-                raise ValidationError('商品编码只能包含字母、数字、连字符和下划线')
-
             # 检查唯一性（排除自己）
             existing_product = Product.objects.filter(sku=sku).exclude(
                 pk=self.instance.pk if self.instance.pk else None)
@@ -183,6 +189,77 @@ class ProductForm(forms.ModelForm):
         return instance
 
 
+class SharedFields(dict):
+    """深拷贝时只复制字典本身，字段对象在多个表单之间共用"""
+
+    def __deepcopy__(self, memo):
+        return dict(self)
+
+
+class ProductImportForm(ProductForm):
+    """批量导入用的商品表单
+
+    复用 ProductForm 的全部字段规则，但不做逐行的数据库查询：
+    SKU 唯一性由导入流程按批次统一处理（已存在则更新），
+    分类按名称在批次内统一解析。
+    """
+
+    class Meta(ProductForm.Meta):
+        fields = [
+            'name', 'sku', 'quantity', 'price',
+            'description', 'cost_price', 'low_stock_threshold', 'is_active'
+        ]
+
+    def clean_sku(self):
+        """只验证SKU格式"""
+        return normalize_sku(self.cleaned_data.get('sku'))
+
+    def __init__(self, *args, shared_fields=None, **kwargs):
+        """shared_fields 为之前某个导入表单的 fields
+
+        表单初始化时会深拷贝全部字段，逐行新建表单时这部分开销占了校验时间的一半左右。
+        字段对象在校验中不保存逐行状态，传入时各行的表单共用同一组字段，只复制字典本身；
+        数据、错误、cleaned_data 与 instance 仍然每行独立。
+        """
+        if shared_fields is not None:
+            self.base_fields = SharedFields(shared_fields)
+        super().__init__(*args, **kwargs)
+
+    def validate_unique(self):
+        """唯一性由导入流程按批次处理"""
+
+
+class ProductImportUploadForm(forms.Form):
+    """商品导入文件上传表单"""
+    file = forms.FileField(
+        label='导入文件',
+        help_text='支持 CSV、XLSX、NDJSON 格式',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx,.ndjson,.jsonl'
+        })
+    )
+    batch_size = forms.IntegerField(
+        label='批次大小',
+        required=False,
+        min_value=1,
+        max_value=5000,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': '默认 500'
+        })
+    )
+
+    def clean_file(self):
+        """验证文件格式"""
+        from .importers import detect_format
+
+        uploaded = self.cleaned_data.get('file')
+        if uploaded and detect_format(uploaded.name) is None:
+            raise ValidationError('不支持的文件格式，请上传 CSV、XLSX 或 NDJSON 文件')
+        return uploaded
+
+
 class CategoryForm(forms.ModelForm):
     """分类表单"""
 
@@ -431,4 +508,47 @@ class SupplierForm(forms.ModelForm):
             # 简单的电话号码验证
             if not re.match(r'^[0-9\-\+\(\)\s]+$', phone):
                 raise ValidationError('请输入有效的电话号码')
-        return phone
\ No newline at end of file
+        return phone
+
+class StockMovementExportForm(forms.Form):
+    """库存变动导出筛选表单"""
+    COMPRESS_CHOICES = [
+        ('', '不压缩'),
+        ('gzip', 'gzip压缩'),
+    ]
+
+    date_from = forms.DateField(label='开始日期', required=False)
+    date_to = forms.DateField(label='结束日期', required=False)
+    product = forms.ModelChoiceField(
+        label='商品',
+        queryset=Product.objects.all(),
+        required=False
+    )
+    category = forms.ModelChoiceField(
+        label='商品分类',
+        queryset=Category.objects.all(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    movement_type = forms.ChoiceField(
+        label='变动类型',
+        choices=[('', '全部类型')] + StockMovement.MOVEMENT_TYPES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    compress = forms.ChoiceField(
+        label='压缩方式',
+        choices=COMPRESS_CHOICES,
+        required=False
+    )
+
+    def clean(self):
+        """验证日期范围"""
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError('开始日期不能晚于结束日期')
+
+        return cleaned_data
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from . import performance, versions
+
+logger = logging.getLogger(__name__)
+
+# 缓存片段的默认有效期（秒）；版本号变化后旧片段不再被读取，到期后自然淘汰
+DEFAULT_FRAGMENT_CACHE_TIMEOUT = 3600
+
+# 单飞锁：同一片段同时只有一个请求重新渲染，锁在渲染超时后自动释放
+RENDER_LOCK_TIMEOUT = 10
+
+# 未拿到锁的请求等待其他请求渲染完成的最长时间与轮询间隔（秒）
+RENDER_WAIT = 2.0
+RENDER_POLL_INTERVAL = 0.02
+
+METRICS = ('hits', 'misses', 'waits')
+
+# 命中等计数先在进程内累计，每个进程最多每隔这么多秒写入共享缓存一次
+METRICS_FLUSH_INTERVAL = 10.0
+
+# 已创建的片段缓存，供 fragment_cache_stats 命令汇总
+FRAGMENT_CACHES = {}
+
+
+def get_fragment_cache_timeout():
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('FRAGMENT_CACHE_TIMEOUT', DEFAULT_FRAGMENT_CACHE_TIMEOUT)
+
+
+class FragmentCache:
+    """按商品版本号缓存渲染结果
+
+    缓存键包含商品的版本号，商品或其库存变化（事务提交）后版本号递增，
+    之后的请求读不到旧片段，不会显示过期的库存。缓存未命中时只有一个请求
+    （跨进程，以缓存中的锁为准）重新渲染，其他请求等待它的结果，避免热门商品
+    失效的瞬间多个请求同时查询和渲染。
+
+    命中、未命中与等待次数先在进程内累计，每隔 METRICS_FLUSH_INTERVAL 秒才合并到共享缓存：
+    每次命中都 incr 共享缓存的话，SQLiteCache 上每个页面访问都是一次写事务。
+    stats() 先写出本进程的计数，其他进程的计数最多滞后一个间隔，进程退出时未写出的部分丢失。
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.pending = dict.fromkeys(METRICS, 0)
+        self.pending_lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+        FRAGMENT_CACHES[name] = self
+
+    def key(self, pk, version):
+        return f'inventory:fragment:{self.name}:{pk}:{version}'
+
+    def metric_key(self, metric):
+        return f'inventory:fragment:{self.name}:metrics:{metric}'
+
+    def record(self, metric, count=1):
+        if not count:
+            return
+        # 同时计入当前请求的性能统计（等待到其他请求渲染结果的算作命中）
+        if metric == 'misses':
+            performance.record_cache(misses=count)
+        else:
+            performance.record_cache(hits=count)
+        with self.pending_lock:
+            self.pending[metric] += count
+            if time.monotonic() - self.flushed_at < METRICS_FLUSH_INTERVAL:
+                return
+        self.flush_stats()
+
+    def flush_stats(self):
+        """把本进程累计的计数合并到共享缓存"""
+        with self.pending_lock:
+            pending, self.pending = self.pending, dict.fromkeys(METRICS, 0)
+            self.flushed_at = time.monotonic()
+        for metric, count in pending.items():
+            if not count:
+                continue
+            try:
+                cache.incr(self.metric_key(metric), count)
+            except ValueError:
+                if not cache.add(self.metric_key(metric), count, None):
+                    cache.incr(self.metric_key(metric), count)
+
+    def stats(self):
+        """各项计数与命中率（等待到其他请求渲染结果的也算命中）"""
+        self.flush_stats()
+        values = cache.get_many([self.metric_key(metric) for metric in METRICS])
+        stats = {metric: values.get(self.metric_key(metric), 0) for metric in METRICS}
+        total = sum(stats.values())
+        stats['hit_ratio'] = (stats['hits'] + stats['waits']) / total if total else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self.pending_lock:
+            self.pending = dict.fromkeys(METRICS, 0)
+            self.flushed_at = time.monotonic()
+        cache.delete_many([self.metric_key(metric) for metric in METRICS])
+
+    def get_or_render(self, pk, render):
+        """返回 pk 对应商品当前版本的片段，没有时调用 render() 生成并缓存
+
+        render 抛出的异常（例如商品已删除时的 Http404）直接向上传递，不缓存。
+        """
+        key = self.key(pk, versions.get_product_version(pk))
+        value = cache.get(key)
+        if value is not None:
+            self.record('hits')
+            return value
+
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, RENDER_LOCK_TIMEOUT):
+            value = self.wait_for(key)
+            if value is not None:
+                self.record('waits')
+                return value
+            # 渲染中的请求超时或失败：自己渲染，但不抢锁也不写缓存
+            logger.warning(f"Fragment {key} still missing after waiting {RENDER_WAIT}s, rendering locally")
+            self.record('misses')
+            return render()
+
+        try:
+            value = render()
+            cache.set(key, value, self.timeout or get_fragment_cache_timeout())
+        finally:
+            cache.delete(lock_key)
+        self.record('misses')
+        return value
+
+    def get_many_or_render(self, objects, version, render):
+        """批量版本：一次 get_many 读取全部片段，只渲染未命中的并一次 set_many 写回
+
+        version(obj) 返回对象当前的版本，render(obj) 渲染单个片段。按 objects 的顺序返回片段。
+        渲染单个片段很便宜（例如表格的一行），不做单飞。
+        """
+        keys = [self.key(obj.pk, version(obj)) for obj in objects]
+        found = cache.get_many(keys)
+        rendered = {}
+        fragments = []
+        for obj, key in zip(objects, keys):
+            fragment = found.get(key)
+            if fragment is None:
+                fragment = rendered[key] = render(obj)
+            fragments.append(fragment)
+        if rendered:
+            cache.set_many(rendered, self.timeout or get_fragment_cache_timeout())
+        self.record('hits', len(keys) - len(rendered))
+        self.record('misses', len(rendered))
+        return fragments
+
+    def wait_for(self, key):
+        deadline = time.monotonic() + RENDER_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(RENDER_POLL_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        return None
+
+
+product_detail_cache = FragmentCache('product_detail')
+
+PRODUCT_ROW_TEMPLATE = 'inventory/product_list_row.html'
+
+# 修改商品列表行模板后递增，使旧模板渲染的行全部失效
+PRODUCT_ROW_TEMPLATE_VERSION = 1
+
+product_row_cache = FragmentCache('product_row')
+
+
+def product_row_version(product):
+    """行片段的版本取自 updated_at：商品的任何修改（包括库存变更）都会更新它，
+    而列表查询本来就读出了这一列，不需要额外读取版本号"""
+    return f'{PRODUCT_ROW_TEMPLATE_VERSION}.{round(product.updated_at.timestamp() * 1000000)}'
+
+
+def render_product_rows(products):
+    """商品列表当前页的 [(商品, 行HTML)]：一次 get_many 读取，只渲染未命中的行"""
+    products = list(products)
+    template = get_template(PRODUCT_ROW_TEMPLATE)
+    rows = product_row_cache.get_many_or_render(
+        products, product_row_version, lambda product: template.render({'product': product}))
+    return [(product, mark_safe(row)) for product, row in zip(products, rows)]
@@ -0,0 +1,354 @@
+import csv
+import io
+import json
+import logging
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import autocomplete, versions
+from .alerts import AlertDelta
+from .forms import ProductForm, ProductImportForm, normalize_sku
+from .models import Category, Product
+from .signals import SUMMARY_STATE_FIELDS, product_state
+from .summary import SummaryDelta
+
+logger = logging.getLogger(__name__)
+
+# 默认每批校验和写入的行数
+IMPORT_BATCH_SIZE = 500
+
+IMPORT_FORMATS = {
+    '.csv': 'csv',
+    '.xlsx': 'xlsx',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+# 表头别名：字段名、表单标签以及导出文件使用的列名都可识别，
+# 因此导出的CSV可以直接重新导入
+HEADER_ALIASES = {
+    'category': 'category',
+    '分类': 'category',
+    '商品分类': 'category',
+    '单价': 'price',
+    '成本价': 'cost_price',
+    '是否启用': 'is_active',
+}
+for _field in ProductImportForm.Meta.fields:
+    HEADER_ALIASES[_field] = _field
+for _field, _label in ProductForm.Meta.labels.items():
+    HEADER_ALIASES[_label] = _field
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on', '是'}
+
+
+def detect_format(filename):
+    """根据扩展名判断文件格式，不支持时返回 None"""
+    return IMPORT_FORMATS.get(os.path.splitext(filename or '')[1].lower())
+
+
+def _iter_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(text)
+
+
+def _iter_ndjson(fileobj):
+    for line in fileobj:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # 无法解析的行交给校验阶段记为错误，不中断整个导入
+                yield None
+
+
+def _iter_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('导入 XLSX 文件需要安装 openpyxl')
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, [])]
+        for values in rows:
+            if any(value is not None for value in values):
+                yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+READERS = {
+    'csv': _iter_csv,
+    'ndjson': _iter_ndjson,
+    'xlsx': _iter_xlsx,
+}
+
+
+def read_rows(fileobj, fmt):
+    """按格式逐行读取导入文件，产出原始字典"""
+    return READERS[fmt](fileobj)
+
+
+def normalize_row(raw):
+    """将原始行的表头映射为字段名，并把值统一为表单可接受的字符串"""
+    data = {}
+    for key, value in raw.items():
+        field = HEADER_ALIASES.get(str(key).strip()) if key is not None else None
+        if field is None:
+            continue
+        if value is None:
+            value = ''
+        elif isinstance(value, bool):
+            value = 'true' if value else ''
+        data[field] = str(value).strip()
+
+    # 复选框字段按常见的真值写法解析
+    if 'is_active' in data:
+        data['is_active'] = 'on' if data['is_active'].lower() in TRUE_VALUES else ''
+    return data
+
+
+def lookup_sku(data):
+    """按表单的规则规范化行中的SKU，用于查找已存在的商品；格式无效时返回 None"""
+    try:
+        return normalize_sku(data.get('sku')) or None
+    except ValidationError:
+        return None
+
+
+def existing_form_data(values):
+    """把已存在商品的当前值转换为表单数据"""
+    data = {}
+    for field in ProductImportForm.Meta.fields:
+        value = values[field]
+        if field == 'is_active':
+            data[field] = 'on' if value else ''
+        else:
+            data[field] = '' if value is None else str(value)
+    return data
+
+
+class ImportResult:
+    """导入结果汇总，errors 为逐行错误报告"""
+
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    @property
+    def rows_per_second(self):
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, row_number, sku, messages):
+        self.errors.append({
+            'row': row_number,
+            'sku': sku or '',
+            'errors': '; '.join(messages),
+        })
+
+    def write_error_report(self, fileobj):
+        """将逐行错误写为CSV"""
+        writer = csv.writer(fileobj)
+        writer.writerow(['行号', '商品编码', '错误信息'])
+        for error in self.errors:
+            writer.writerow([error['row'], error['sku'], error['errors']])
+
+
+class ProductImporter:
+    """批量商品导入
+
+    每批数据先用一条查询取出已存在SKU的当前值，再用 ProductImportForm 逐行校验
+    （不产生数据库查询），然后用一条查询解析整批的分类，
+    最后通过 bulk_create(update_conflicts=True) 按SKU插入或更新。
+    """
+
+    def __init__(self, user=None, batch_size=None, dry_run=False):
+        self.user = user
+        self.batch_size = batch_size or IMPORT_BATCH_SIZE
+        self.dry_run = dry_run
+        self.category_ids = dict(Category.objects.values_list('name', 'pk'))
+        self.seen_skus = set()
+        # 第一行表单初始化后的字段，之后各行的表单共用，见 ProductImportForm
+        self.fields = None
+
+    def run(self, rows):
+        """导入行迭代器，第一行数据的行号为 2（第 1 行为表头）"""
+        result = ImportResult()
+        started = time.perf_counter()
+
+        batch = []
+        for row_number, raw in enumerate(rows, start=2):
+            batch.append((row_number, raw))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch, result)
+                batch = []
+        if batch:
+            self.import_batch(batch, result)
+
+        result.elapsed = time.perf_counter() - started
+        logger.info(
+            f"Product import finished: {result.total} rows, {result.created} created, "
+            f"{result.updated} updated, {result.failed} failed in {result.elapsed:.2f}s"
+        )
+        return result
+
+    def validate_row(self, row_number, data, current, result):
+        """校验单行，成功时返回 (商品实例, 分类名称, 出现的字段)
+
+        current 为该SKU已存在时数据库中的当前值（见 fetch_existing），文件未提供的列按当前值校验，
+        因此只含部分列（例如只有编码与库存数量）的文件也能更新已有商品。
+        """
+        # 记录文件实际提供的列
+        provided_fields = set(data)
+        if current is not None:
+            data = {**existing_form_data(current), **data}
+        else:
+            # 新商品未提供的启用状态按启用处理
+            data.setdefault('is_active', 'on')
+
+        form = ProductImportForm(data, shared_fields=self.fields)
+        if self.fields is None:
+            self.fields = form.fields
+        if not form.is_valid():
+            messages = []
+            for field, errors in form.errors.items():
+                label = form.fields[field].label if field in form.fields else '表单验证错误'
+                messages.extend(f'{label}: {error}' for error in errors)
+            result.add_error(row_number, data.get('sku'), messages)
+            return None
+
+        product = form.save(commit=False)
+        if product.sku in self.seen_skus:
+            result.add_error(row_number, product.sku, [f'商品编码 "{product.sku}" 在文件中重复'])
+            return None
+        self.seen_skus.add(product.sku)
+
+        if self.user is not None and self.user.is_authenticated:
+            product.created_by = self.user
+        return product, data.get('category', ''), provided_fields
+
+    @staticmethod
+    def fetch_existing(skus):
+        """用一条查询取出整批中已存在商品的当前值，返回 {sku: 字段值字典}"""
+        skus = {sku for sku in skus if sku}
+        if not skus:
+            return {}
+        fields = set(ProductImportForm.Meta.fields) | set(SUMMARY_STATE_FIELDS)
+        return {values['sku']: values
+                for values in Product.objects.filter(sku__in=skus).values('pk', *fields)}
+
+    def resolve_categories(self, names):
+        """按名称解析分类，缺失的分类一次性批量创建"""
+        missing = {name for name in names if name and name not in self.category_ids}
+        if missing and not self.dry_run:
+            Category.objects.bulk_create(
+                [Category(name=name) for name in missing], ignore_conflicts=True
+            )
+            self.category_ids.update(
+                Category.objects.filter(name__in=missing).values_list('name', 'pk')
+            )
+
+    def import_batch(self, batch, result):
+        """校验并写入一批数据"""
+        result.total += len(batch)
+
+        rows = []
+        for row_number, raw in batch:
+            try:
+                data = normalize_row(raw)
+            except (AttributeError, TypeError):
+                result.add_error(row_number, '', ['无法解析该行数据'])
+                continue
+            rows.append((row_number, data, lookup_sku(data)))
+        current_values = self.fetch_existing(sku for _, _, sku in rows)
+
+        products = []
+        category_names = []
+        # 按行实际提供的列分组，每组分别决定冲突时要更新的列
+        groups = {}
+        for row_number, data, sku in rows:
+            validated = self.validate_row(row_number, data, current_values.get(sku), result)
+            if validated is None:
+                continue
+            product, category_name, fields = validated
+            products.append(product)
+            category_names.append(category_name)
+            groups.setdefault(frozenset(fields), []).append(product)
+
+        if not products:
+            return
+
+        self.resolve_categories(category_names)
+        for product, name in zip(products, category_names):
+            product.category_id = self.category_ids.get(name)
+
+        existing, existing_pks = {}, []
+        for product in products:
+            values = current_values.get(product.sku)
+            if values is not None:
+                existing[product.sku] = tuple(values[field] for field in SUMMARY_STATE_FIELDS)
+                existing_pks.append(values['pk'])
+        result.updated += len(existing)
+        result.created += len(products) - len(existing)
+
+        if self.dry_run:
+            return
+
+        # bulk_create 不触发模型信号，库存汇总在同一事务内按新旧状态增量更新
+        summary = SummaryDelta()
+        alerts = AlertDelta()
+        with transaction.atomic():
+            for fields, group in groups.items():
+                Product.objects.bulk_create(
+                    group,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=self.get_update_fields(fields),
+                )
+                for product in group:
+                    old_state = existing.get(product.sku)
+                    new_state = self.get_new_state(product, fields, old_state)
+                    summary.replace(old_state, new_state)
+                    if product.pk is not None:
+                        alerts.replace(product.pk, old_state, new_state)
+            summary.apply()
+            alerts.apply()
+            autocomplete.products_changed()
+            versions.data_changed()
+            versions.products_changed(existing_pks)
+
+    @staticmethod
+    def get_new_state(product, provided_fields, old_state):
+        """导入后的汇总状态：文件未提供的列沿用旧值"""
+        if old_state is None:
+            return product_state(product)
+        return tuple(
+            getattr(product, field) if field.replace('_id', '') in provided_fields else old
+            for field, old in zip(SUMMARY_STATE_FIELDS, old_state)
+        )
+
+    @staticmethod
+    def get_update_fields(provided_fields):
+        """已存在的商品只更新文件中出现的列，未提供的列保持原值"""
+        update_fields = [
+            field for field in ProductImportForm.Meta.fields
+            if field in provided_fields and field != 'sku'
+        ]
+        if 'category' in provided_fields:
+            update_fields.append('category')
+        update_fields.append('updated_at')
+        return update_fields
@@ -0,0 +1,87 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.backups import (BACKUP_FREQUENCIES, BackupError, backup_database, backup_due,
+                               get_backup_dir, get_backup_frequency, rotate_backups,
+                               verify_backup)
+
+# --loop 模式下检查是否需要备份的间隔（秒）
+SCHEDULE_CHECK_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = '用 SQLite 在线备份 API 分步备份数据库（不阻塞在线写入），可压缩、校验并按天/周/月轮换'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help=f'备份目录（默认 {get_backup_dir()}）')
+        parser.add_argument('--if-due', action='store_true',
+                            help='按 BACKUP_FREQUENCY 判断，本周期内已有备份时跳过')
+        parser.add_argument('--frequency', choices=BACKUP_FREQUENCIES,
+                            help=f'与 --if-due / --loop 一起使用的备份频率（默认 {get_backup_frequency()}）')
+        parser.add_argument('--loop', action='store_true',
+                            help='作为调度进程持续运行，每小时检查一次是否需要备份')
+        parser.add_argument('--pages', type=int, help='每一步复制的页数')
+        parser.add_argument('--sleep', type=float, help='每一步之间休眠的秒数')
+        parser.add_argument('--timeout', type=float, help='复制阶段的总时限（秒），超过时中止')
+        parser.add_argument('--no-compress', action='store_false', dest='compress',
+                            help='不做 gzip 压缩')
+        parser.add_argument('--no-verify', action='store_false', dest='verify',
+                            help='跳过副本的完整性检查')
+        parser.add_argument('--no-rotate', action='store_false', dest='rotate',
+                            help='不删除轮换规则之外的旧备份')
+        parser.add_argument('--verify-file', metavar='PATH',
+                            help='只检查已有的备份文件，不做备份')
+
+    def handle(self, *args, **options):
+        if options['verify_file']:
+            try:
+                verify_backup(options['verify_file'])
+            except BackupError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f'{options["verify_file"]} 完整性检查通过'))
+            return
+
+        if not options['loop']:
+            try:
+                self.run_once(options)
+            except BackupError as e:
+                raise CommandError(str(e))
+            return
+
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stopped.set())
+        self.stdout.write(f'备份调度已启动，频率 {options["frequency"] or get_backup_frequency()}')
+        options['if_due'] = True
+        try:
+            while not stopped.is_set():
+                try:
+                    self.run_once(options)
+                except BackupError as e:
+                    self.stderr.write(self.style.ERROR(str(e)))
+                stopped.wait(SCHEDULE_CHECK_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+    def run_once(self, options):
+        if options['if_due'] and not backup_due(options['frequency'], options['dir']):
+            if not options['loop']:
+                self.stdout.write('本周期内已有备份，跳过')
+            return
+
+        result = backup_database(
+            directory=options['dir'],
+            pages=options['pages'],
+            sleep=options['sleep'],
+            timeout=options['timeout'],
+            compress=options['compress'],
+            verify=options['verify'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'备份完成：{result.path}（{result.size / 1024 / 1024:.1f} MB，{result.pages} 页，'
+            f'耗时 {result.elapsed:.1f}s）sha256 {result.sha256}'
+        ))
+        if options['rotate']:
+            for path in rotate_backups(options['dir']):
+                self.stdout.write(f'已删除过期备份 {path}')
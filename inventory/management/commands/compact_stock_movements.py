@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.retention import (COMPACT_BATCH_SIZE, compact_movements, get_archive_dir,
+                                 get_retention_days)
+
+
+class Command(BaseCommand):
+    help = '把超过保留期限的库存变动记录合并为按 商品/日期/类型 的日汇总，并分批删除原始记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help=f'保留最近多少天的原始记录（默认 {get_retention_days()}）')
+        parser.add_argument('--batch-size', type=int, default=COMPACT_BATCH_SIZE,
+                            help=f'每个事务处理的原始记录数（默认 {COMPACT_BATCH_SIZE}）')
+        parser.add_argument('--archive-dir',
+                            help='删除前把原始记录写入该目录下的 gzip CSV 文件')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='每批之间停顿的秒数，降低对在线写入的影响')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待合并的记录数')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is not None and days < 0:
+            raise CommandError('--days 不能为负数')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size 必须大于0')
+
+        try:
+            result = compact_movements(
+                days=days,
+                batch_size=options['batch_size'],
+                archive_dir=options['archive_dir'] or get_archive_dir(),
+                pause=options['sleep'],
+                dry_run=options['dry_run'],
+            )
+        except OSError as e:
+            raise CommandError(f'归档失败: {e}')
+
+        if options['dry_run']:
+            self.stdout.write(f'{result.cutoff:%Y-%m-%d} 之前共有 {result.movements} 条原始记录待合并')
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已合并 {result.cutoff:%Y-%m-%d} 之前的 {result.movements} 条记录（{result.batches} 批）：'
+            f'新增日汇总 {result.summaries_created} 行，更新 {result.summaries_updated} 行；'
+            f'耗时 {result.elapsed:.2f}s'
+        ))
+        if result.archive_path:
+            self.stdout.write(f'原始记录已归档到 {result.archive_path}')
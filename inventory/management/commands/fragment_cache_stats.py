@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from inventory.fragments import FRAGMENT_CACHES
+
+
+class Command(BaseCommand):
+    help = '显示页面片段缓存的命中、未命中与等待次数（所有工作进程累计，各进程的计数最多滞后 10 秒）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='显示后清零计数')
+
+    def handle(self, *args, **options):
+        for name, fragment_cache in sorted(FRAGMENT_CACHES.items()):
+            stats = fragment_cache.stats()
+            self.stdout.write(
+                f'{name}: 命中 {stats["hits"]}，等待其他请求渲染 {stats["waits"]}，'
+                f'未命中 {stats["misses"]}，命中率 {stats["hit_ratio"]:.1%}'
+            )
+            if options['reset']:
+                fragment_cache.reset_stats()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.daily_reports import DailyReportGenerator, daily_reports_enabled, get_report_dir
+
+
+class Command(BaseCommand):
+    help = '增量生成每日库存报告（HTML/CSV），SEND_DAILY_REPORTS 开启时发送邮件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help=f'报告文件目录（默认 {get_report_dir()}）')
+        email = parser.add_mutually_exclusive_group()
+        email.add_argument('--email', action='store_true', dest='email', default=None,
+                           help='发送邮件（忽略 SEND_DAILY_REPORTS）')
+        email.add_argument('--no-email', action='store_false', dest='email',
+                           help='不发送邮件')
+
+    def handle(self, *args, **options):
+        generator = DailyReportGenerator(output_dir=options['output_dir'])
+        try:
+            report, data = generator.generate(send_email=options['email'])
+        except OSError as e:
+            raise CommandError(f'生成报告失败: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已生成 {timezone.localtime(data.period_start):%Y-%m-%d %H:%M} 以来的库存报告：'
+            f'{data.movement_count} 条变动，新增库存不足 {len(data.new_low_stock)} 个，'
+            f'库存价值变化 {data.value_delta:+.2f}'
+        ))
+        self.stdout.write(f'HTML: {report.html_path}')
+        self.stdout.write(f'CSV: {report.csv_path}')
+        if report.emailed:
+            self.stdout.write('报告邮件已发送')
+        elif options['email'] or (options['email'] is None and daily_reports_enabled()):
+            self.stdout.write(self.style.WARNING('没有配置收件人，报告邮件未发送'))
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import ProductImporter, detect_format, read_rows, IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = '从 CSV / XLSX / NDJSON 文件批量导入商品（按SKU插入或更新）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='导入文件路径')
+        parser.add_argument('--format', choices=['csv', 'xlsx', 'ndjson'],
+                            help='文件格式，默认根据扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help=f'每批校验和写入的行数（默认 {IMPORT_BATCH_SIZE}）')
+        parser.add_argument('--user', help='记录为创建人的用户名')
+        parser.add_argument('--report', help='逐行错误报告的CSV输出路径')
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入数据库')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        if fmt is None:
+            raise CommandError('无法识别文件格式，请使用 --format 指定')
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'用户 "{options["user"]}" 不存在')
+
+        importer = ProductImporter(
+            user=user,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        try:
+            with open(options['path'], 'rb') as f:
+                result = importer.run(read_rows(f, fmt))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'导入失败: {e}')
+
+        if options['report'] and result.errors:
+            with open(options['report'], 'w', encoding='utf-8-sig', newline='') as f:
+                result.write_error_report(f)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'共 {result.total} 行：新增 {result.created}，更新 {result.updated}，'
+            f'失败 {result.failed}；耗时 {result.elapsed:.2f}s（{result.rows_per_second:,.0f} 行/秒）'
+        ))
+        if result.errors and not options['report']:
+            for error in result.errors[:20]:
+                self.stderr.write(f"第 {error['row']} 行 {error['sku']}: {error['errors']}")
+            if result.failed > 20:
+                self.stderr.write(f'……其余 {result.failed - 20} 条错误请使用 --report 输出')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = '根据商品表重建商品全文搜索索引（仅 SQLite）'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING('当前数据库未启用全文索引，搜索使用 icontains 查询'))
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'全文索引已重建：{count} 个商品'))
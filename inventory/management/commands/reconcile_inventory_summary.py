@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from inventory.summary import find_drift, reconcile
+
+
+class Command(BaseCommand):
+    help = '根据商品数据重建库存汇总计数器'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='只检查汇总表与实际数据的偏差，不写入')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_drift()
+            for key, field, stored, actual in drift:
+                self.stdout.write(f'{key}.{field}: 汇总表 {stored}，实际 {actual}')
+            if drift:
+                self.stdout.write(self.style.WARNING(f'发现 {len(drift)} 处偏差，请去掉 --check 重新运行以修复'))
+            else:
+                self.stdout.write(self.style.SUCCESS('汇总表与实际数据一致'))
+            return
+
+        total = reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'汇总表已重建：商品 {total.total_products}，库存不足 {total.low_stock_products}，'
+            f'缺货 {total.out_of_stock_products}，库存总值 {total.stock_value}'
+        ))
@@ -0,0 +1,36 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.alerts import AlertWorker, alerts_enabled, get_alert_interval
+
+
+class Command(BaseCommand):
+    help = '把库存预警队列汇总成邮件发送；--loop 时作为后台进程按间隔持续发送'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='持续运行，每个间隔发送一次')
+        parser.add_argument('--interval', type=int,
+                            help=f'发送间隔秒数（默认 {get_alert_interval()}）')
+
+    def handle(self, *args, **options):
+        if not alerts_enabled():
+            self.stdout.write(self.style.WARNING('LOW_STOCK_ALERT_ENABLED 未开启，不会产生新的预警'))
+
+        worker = AlertWorker(interval=options['interval'])
+        if not options['loop']:
+            try:
+                sent = worker.send_digest()
+            except OSError as e:
+                raise CommandError(f'发送失败: {e}')
+            finally:
+                worker.close()
+            self.stdout.write(self.style.SUCCESS(f'已发送 {sent} 个商品的库存预警'))
+            return
+
+        signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        self.stdout.write(f'库存预警发送进程已启动，每 {worker.interval} 秒发送一次')
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            worker.stop()
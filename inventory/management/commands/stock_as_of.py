@@ -0,0 +1,53 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.models import Product
+from inventory.snapshots import StockAsOf, parse_as_of
+
+
+class Command(BaseCommand):
+    help = '查询某一时刻的库存（从最近的快照出发重放之后的变动），输出CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('at', help='日期（表示当日结束时）或日期时间，例如 2026-09-30')
+        parser.add_argument('--sku', action='append', default=[], help='只查询指定商品编码，可重复')
+        parser.add_argument('--output', help='CSV输出路径，默认输出到标准输出')
+
+    def handle(self, *args, **options):
+        at = parse_as_of(options['at'])
+        if at is None:
+            raise CommandError(f'无法解析时间: {options["at"]}')
+
+        started = time.perf_counter()
+        queryset = None
+        if options['sku']:
+            queryset = Product.objects.filter(sku__in=[sku.strip().upper() for sku in options['sku']])
+        result = StockAsOf(at, queryset)
+
+        output = open(options['output'], 'w', encoding='utf-8-sig', newline='') \
+            if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['商品编码', '商品名称', '库存数量'])
+            count = total = 0
+            for sku, name, quantity in result.rows():
+                writer.writerow([sku, name, quantity])
+                count += 1
+                total += quantity
+        finally:
+            if options['output']:
+                output.close()
+
+        source = (f'{timezone.localtime(result.snapshot.taken_at):%Y-%m-%d %H:%M:%S} 的快照'
+                  if result.snapshot else '当前库存（没有更早的快照）')
+        if result.aligned:
+            self.stderr.write(self.style.WARNING(
+                f'{timezone.localtime(at):%Y-%m-%d %H:%M:%S} 所在日期的变动已合并为日汇总，只能查询到当日结束'
+            ))
+        self.stderr.write(self.style.SUCCESS(
+            f'{timezone.localtime(result.at):%Y-%m-%d %H:%M:%S} 之前：{count} 个商品，库存合计 {total}；'
+            f'基于{source}，耗时 {time.perf_counter() - started:.2f}s'
+        ))
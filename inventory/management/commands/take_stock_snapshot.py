@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.snapshots import SNAPSHOT_PERIODS, get_snapshot_period, snapshot_due, take_snapshot
+
+
+class Command(BaseCommand):
+    help = '记录当前全部商品的库存快照，供按时间点查询库存使用（适合由定时任务每天运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-due', action='store_true',
+                            help='本周期内已有快照时跳过')
+        parser.add_argument('--period', choices=SNAPSHOT_PERIODS,
+                            help=f'与 --if-due 一起使用的快照周期（默认 {get_snapshot_period()}）')
+
+    def handle(self, *args, **options):
+        if options['if_due'] and not snapshot_due(options['period']):
+            self.stdout.write('本周期内已有库存快照，跳过')
+            return
+
+        snapshot = take_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'已记录 {timezone.localtime(snapshot.taken_at):%Y-%m-%d %H:%M:%S} 的库存快照：{snapshot.item_count} 个有库存商品'
+        ))
@@ -0,0 +1,101 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import performance
+
+# 默认每天最多续期一次会话
+DEFAULT_SESSION_REFRESH_INTERVAL = 24 * 3600
+
+SESSION_REFRESHED_KEY = '_refreshed_at'
+
+
+def get_session_refresh_interval():
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('SESSION_REFRESH_INTERVAL', DEFAULT_SESSION_REFRESH_INTERVAL)
+
+
+class SessionRefreshMiddleware:
+    """按需续期会话，代替 SESSION_SAVE_EVERY_REQUEST
+
+    SESSION_SAVE_EVERY_REQUEST 会让每个请求（包括只读页面）都写一次会话。
+    这里只在距上次续期超过 SESSION_REFRESH_INTERVAL 时才标记会话为已修改，
+    由 SessionMiddleware 保存并重新下发 Cookie。活跃用户的会话仍然在最后一次访问后
+    SESSION_COOKIE_AGE 左右过期（误差不超过续期间隔），其余请求不产生会话写入。
+    必须放在 SessionMiddleware 之后。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # 整条中间件链支持异步时，ASGI 下的异步视图不会被转到同步线程中执行
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        # 空会话（未登录的访客）不续期，也不会因此创建会话
+        if session is not None and not session.is_empty() and session.keys():
+            self.refresh(session)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is not None and not session.is_empty() and await session.akeys():
+            self.refresh(session)
+        return response
+
+    def refresh(self, session):
+        """会话已加载，这里只判断是否需要续期，不读写存储"""
+        now = int(time.time())
+        # 本次请求已经要保存会话（例如刚登录）时顺便记下续期时间，不额外写入
+        if session.modified or now - session.get(SESSION_REFRESHED_KEY, 0) >= get_session_refresh_interval():
+            session[SESSION_REFRESHED_KEY] = now
+
+
+class PerformanceMiddleware:
+    """按 PERFORMANCE_SAMPLE_RATE 抽样统计请求的 SQL、模板渲染、缓存命中与总耗时
+
+    被抽中的请求记录一条日志（LOG_FORMAT=json 时各项为独立字段），管理员的请求（DEBUG 模式下所有请求）
+    加上 Server-Timing 响应头，
+    并累计到按视图的滚动汇总中，由 /api/performance/ 查看，见 inventory/performance.py。
+    放在 MIDDLEWARE 的最前面，总耗时包含其他中间件。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = performance.start_request()
+        if metrics is None:
+            return self.get_response(request)
+        with performance.collecting(metrics):
+            response = self.get_response(request)
+        performance.finish_request(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = performance.start_request()
+        if metrics is None:
+            return await self.get_response(request)
+        with performance.collecting(metrics):
+            response = await self.get_response(request)
+        # 汇总写入共享缓存，在同步线程中执行
+        await sync_to_async(performance.finish_request)(request, response, metrics)
+        return response
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0002_category_supplier_alter_product_options_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventorySummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(max_length=30, unique=True, verbose_name="汇总键"),
+                ),
+                (
+                    "total_products",
+                    models.IntegerField(default=0, verbose_name="商品总数"),
+                ),
+                (
+                    "low_stock_products",
+                    models.IntegerField(default=0, verbose_name="库存不足商品数"),
+                ),
+                (
+                    "out_of_stock_products",
+                    models.IntegerField(default=0, verbose_name="缺货商品数"),
+                ),
+                (
+                    "stock_value",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=18,
+                        verbose_name="库存总值",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="inventory.category",
+                        verbose_name="分类",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "库存汇总",
+                "verbose_name_plural": "库存汇总",
+            },
+        ),
+    ]
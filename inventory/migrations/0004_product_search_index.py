@@ -0,0 +1,94 @@
+from django.db import migrations
+
+FTS_TABLE = "inventory_product_fts"
+
+CATEGORY_NAME = (
+    "COALESCE((SELECT name FROM inventory_category WHERE id = new.category_id), '')"
+)
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, sku, description, category_name, tokenize = 'trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, sku, description, category_name)
+        VALUES (new.id, new.name, new.sku, new.description, {CATEGORY_NAME});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON inventory_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au
+    AFTER UPDATE OF name, sku, description, category_id ON inventory_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, name, sku, description, category_name)
+        VALUES (new.id, new.name, new.sku, new.description, {CATEGORY_NAME});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_category_au
+    AFTER UPDATE OF name ON inventory_category BEGIN
+        UPDATE {FTS_TABLE} SET category_name = new.name
+        WHERE rowid IN (SELECT id FROM inventory_product WHERE category_id = new.id);
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, sku, description, category_name)
+    SELECT p.id, p.name, p.sku, p.description, COALESCE(c.name, '')
+    FROM inventory_product p LEFT JOIN inventory_category c ON c.id = p.category_id
+    """,
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_category_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def trigram_supported(connection):
+    """SQLite 需要 3.34+ 且编译了 FTS5 才支持 trigram 分词器"""
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize = 'trigram')"
+            )
+            cursor.execute("DROP TABLE temp.fts_probe")
+        except Exception:
+            return False
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    if not trigram_supported(schema_editor.connection):
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0003_inventorysummary"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
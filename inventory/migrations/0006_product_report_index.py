@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0005_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=[
+                    "category",
+                    "is_active",
+                    "quantity",
+                    "price",
+                    "cost_price",
+                    "low_stock_threshold",
+                ],
+                name="product_report_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_product_report_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovementDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('movement_type', models.CharField(choices=[('in', '入库'), ('out', '出库'), ('adjustment', '调整'), ('return', '退货')], max_length=20, verbose_name='变动类型')),
+                ('movement_count', models.PositiveIntegerField(default=0, verbose_name='变动次数')),
+                ('quantity', models.IntegerField(default=0, verbose_name='净变动数量')),
+                ('inbound', models.PositiveIntegerField(default=0, verbose_name='增加数量')),
+                ('outbound', models.PositiveIntegerField(default=0, verbose_name='减少数量')),
+                ('first_at', models.DateTimeField(verbose_name='首次变动时间')),
+                ('last_at', models.DateTimeField(verbose_name='最后变动时间')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_movements', to='inventory.product', verbose_name='商品')),
+            ],
+            options={
+                'verbose_name': '库存变动日汇总',
+                'verbose_name_plural': '库存变动日汇总',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='movement_daily_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day', 'movement_type'), name='movement_daily_unique')],
+            },
+        ),
+    ]
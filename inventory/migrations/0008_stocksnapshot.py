@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_stockmovementdaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(unique=True, verbose_name='快照时间')),
+                ('item_count', models.PositiveIntegerField(default=0, verbose_name='有库存商品数')),
+            ],
+            options={
+                'verbose_name': '库存快照',
+                'verbose_name_plural': '库存快照',
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshotItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='库存数量')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.product', verbose_name='商品')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='inventory.stocksnapshot', verbose_name='快照')),
+            ],
+            options={
+                'verbose_name': '库存快照明细',
+                'verbose_name_plural': '库存快照明细',
+                'constraints': [models.UniqueConstraint(fields=('snapshot', 'product'), name='snapshot_item_unique')],
+            },
+        ),
+    ]
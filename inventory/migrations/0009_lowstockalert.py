@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='触发时库存')),
+                ('low_stock_threshold', models.PositiveIntegerField(verbose_name='库存预警值')),
+                ('flagged_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='触发时间')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='发送时间')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alert', to='inventory.product', verbose_name='商品')),
+            ],
+            options={
+                'verbose_name': '库存预警',
+                'verbose_name_plural': '库存预警',
+                'ordering': ['flagged_at'],
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['flagged_at'], name='alert_pending_idx')],
+            },
+        ),
+    ]
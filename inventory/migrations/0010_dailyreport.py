@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_lowstockalert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='生成时间')),
+                ('period_start', models.DateTimeField(blank=True, null=True, verbose_name='统计起点')),
+                ('last_movement_at', models.DateTimeField(blank=True, null=True, verbose_name='最后统计的变动时间')),
+                ('last_movement_id', models.BigIntegerField(blank=True, null=True, verbose_name='最后统计的变动ID')),
+                ('products_updated_until', models.DateTimeField(blank=True, null=True, verbose_name='已检查的商品更新时间')),
+                ('movement_count', models.PositiveIntegerField(default=0, verbose_name='变动记录数')),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='库存总值')),
+                ('category_values', models.JSONField(default=dict, verbose_name='分类库存价值')),
+                ('html_path', models.CharField(blank=True, max_length=255, verbose_name='HTML报告路径')),
+                ('csv_path', models.CharField(blank=True, max_length=255, verbose_name='CSV报告路径')),
+                ('emailed', models.BooleanField(default=False, verbose_name='已发送邮件')),
+            ],
+            options={
+                'verbose_name': '每日库存报告',
+                'verbose_name_plural': '每日库存报告',
+                'ordering': ['-generated_at'],
+                'get_latest_by': 'generated_at',
+            },
+        ),
+    ]
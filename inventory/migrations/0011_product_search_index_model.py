@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_dailyreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchIndex',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='inventory.product', verbose_name='商品')),
+                ('document', models.TextField(db_column='inventory_product_fts', verbose_name='全文索引')),
+            ],
+            options={
+                'verbose_name': '商品全文索引',
+                'verbose_name_plural': '商品全文索引',
+                'db_table': 'inventory_product_fts',
+                'managed': False,
+            },
+        ),
+    ]
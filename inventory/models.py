@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.urls import reverse
+from django.utils import timezone
 
 
 class Category(models.Model):
@@ -44,6 +45,23 @@ class Product(models.Model):
         verbose_name = '商品'
         verbose_name_plural = '商品'
         ordering = ['-updated_at']
+        indexes = [
+            # 商品列表的默认排序与游标分页的排序键
+            models.Index(fields=['-updated_at', '-id'], name='product_updated_idx'),
+            # 缺货 / 库存不足过滤只占商品的一小部分，用部分索引按更新时间直接取页
+            models.Index(fields=['-updated_at', '-id'], name='product_out_of_stock_idx',
+                         condition=models.Q(quantity=0)),
+            models.Index(fields=['-updated_at', '-id'], name='product_low_stock_idx',
+                         condition=models.Q(quantity__gt=0,
+                                            quantity__lte=models.F('low_stock_threshold'))),
+            # 按分类浏览启用的商品；SQLite 上 is_active=True 生成的条件为裸列名，
+            # 不能作为复合索引的等值列使用，因此做成部分索引
+            models.Index(fields=['category', '-updated_at'], name='product_category_active_idx',
+                         condition=models.Q(is_active=True)),
+            # 库存报告的分组聚合只读这些列，覆盖索引让它按分类顺序扫描索引而不回表
+            models.Index(fields=['category', 'is_active', 'quantity', 'price', 'cost_price',
+                                 'low_stock_threshold'], name='product_report_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
@@ -96,11 +114,149 @@ class StockMovement(models.Model):
         verbose_name = '库存变动记录'
         verbose_name_plural = '库存变动记录'
         ordering = ['-created_at']
+        indexes = [
+            # 单个商品的变动历史
+            models.Index(fields=['product', 'created_at', 'id'], name='movement_product_created_idx'),
+            # 按日期范围导出（按 (created_at, id) 键集分批读取）
+            models.Index(fields=['created_at', 'id'], name='movement_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.get_movement_type_display()}: {self.quantity}"
 
 
+class StockMovementDaily(models.Model):
+    """库存变动日汇总
+
+    超过保留期限的 StockMovement 按 商品/日期/变动类型 合并到这里，原始记录随后删除或归档，
+    见 inventory.retention。日期为本地时区的日期。
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                verbose_name='商品', related_name='daily_movements')
+    day = models.DateField('日期')
+    movement_type = models.CharField('变动类型', max_length=20, choices=StockMovement.MOVEMENT_TYPES)
+    movement_count = models.PositiveIntegerField('变动次数', default=0)
+    quantity = models.IntegerField('净变动数量', default=0)
+    inbound = models.PositiveIntegerField('增加数量', default=0)
+    outbound = models.PositiveIntegerField('减少数量', default=0)
+    first_at = models.DateTimeField('首次变动时间')
+    last_at = models.DateTimeField('最后变动时间')
+
+    class Meta:
+        verbose_name = '库存变动日汇总'
+        verbose_name_plural = '库存变动日汇总'
+        ordering = ['-day']
+        constraints = [
+            # 同时用作单个商品按日期查询的索引
+            models.UniqueConstraint(fields=['product', 'day', 'movement_type'],
+                                    name='movement_daily_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='movement_daily_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.day} {self.movement_type}: {self.quantity}"
+
+    @property
+    def created_at(self):
+        """与 StockMovement 对齐，变动历史按该时间排序"""
+        return self.last_at
+
+
+class StockSnapshot(models.Model):
+    """库存快照：某一时刻全部商品的库存
+
+    逐商品的数量保存在 StockSnapshotItem 中，只保存库存大于 0 的商品，
+    创建时间不晚于快照时间而没有快照行的商品，其库存即为 0。见 inventory.snapshots。
+    """
+    taken_at = models.DateTimeField('快照时间', unique=True)
+    item_count = models.PositiveIntegerField('有库存商品数', default=0)
+
+    class Meta:
+        verbose_name = '库存快照'
+        verbose_name_plural = '库存快照'
+        ordering = ['-taken_at']
+
+    def __str__(self):
+        return f"{self.taken_at:%Y-%m-%d %H:%M}: {self.item_count}"
+
+
+class StockSnapshotItem(models.Model):
+    """库存快照中单个商品的数量"""
+    snapshot = models.ForeignKey(StockSnapshot, on_delete=models.CASCADE,
+                                 verbose_name='快照', related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                verbose_name='商品', related_name='+')
+    quantity = models.PositiveIntegerField('库存数量')
+
+    class Meta:
+        verbose_name = '库存快照明细'
+        verbose_name_plural = '库存快照明细'
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot', 'product'], name='snapshot_item_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.snapshot_id} {self.product_id}: {self.quantity}"
+
+
+class LowStockAlert(models.Model):
+    """库存不足预警队列
+
+    商品库存降到预警值及以下时写入一行，恢复到预警值以上时删除。
+    每个商品最多一行，已标记的商品再次变动不会重复预警；
+    后台任务按间隔把未发送的行汇总成一封邮件，见 inventory.alerts。
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE,
+                                   verbose_name='商品', related_name='low_stock_alert')
+    quantity = models.PositiveIntegerField('触发时库存')
+    low_stock_threshold = models.PositiveIntegerField('库存预警值')
+    flagged_at = models.DateTimeField('触发时间', default=timezone.now)
+    sent_at = models.DateTimeField('发送时间', null=True, blank=True)
+
+    class Meta:
+        verbose_name = '库存预警'
+        verbose_name_plural = '库存预警'
+        ordering = ['flagged_at']
+        indexes = [
+            # 待发送的预警只占一小部分
+            models.Index(fields=['flagged_at'], name='alert_pending_idx',
+                         condition=models.Q(sent_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity}/{self.low_stock_threshold}"
+
+
+class DailyReport(models.Model):
+    """每日库存报告的生成记录
+
+    同时保存下一次增量生成的起点：已统计的最后一条库存变动 (created_at, id)
+    与已检查的商品更新时间，见 inventory.daily_reports。
+    """
+    generated_at = models.DateTimeField('生成时间', default=timezone.now)
+    period_start = models.DateTimeField('统计起点', null=True, blank=True)
+    last_movement_at = models.DateTimeField('最后统计的变动时间', null=True, blank=True)
+    last_movement_id = models.BigIntegerField('最后统计的变动ID', null=True, blank=True)
+    products_updated_until = models.DateTimeField('已检查的商品更新时间', null=True, blank=True)
+    movement_count = models.PositiveIntegerField('变动记录数', default=0)
+    stock_value = models.DecimalField('库存总值', max_digits=18, decimal_places=2, default=0)
+    category_values = models.JSONField('分类库存价值', default=dict)
+    html_path = models.CharField('HTML报告路径', max_length=255, blank=True)
+    csv_path = models.CharField('CSV报告路径', max_length=255, blank=True)
+    emailed = models.BooleanField('已发送邮件', default=False)
+
+    class Meta:
+        verbose_name = '每日库存报告'
+        verbose_name_plural = '每日库存报告'
+        ordering = ['-generated_at']
+        get_latest_by = 'generated_at'
+
+    def __str__(self):
+        return f"{self.generated_at:%Y-%m-%d %H:%M}: {self.movement_count}"
+
+
 class Supplier(models.Model):
     """供应商模型"""
     name = models.CharField('供应商名称', max_length=100)
@@ -117,4 +273,53 @@ class Supplier(models.Model):
         ordering = ['name']
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class InventorySummary(models.Model):
+    """库存汇总计数器
+
+    key 为 'all' 的行保存全局汇总，其余行按分类汇总（未分类商品的 key 为 'none'）。
+    由商品保存/删除和库存变更路径增量维护，可用 reconcile_inventory_summary 命令重建。
+    """
+    GLOBAL_KEY = 'all'
+    UNCATEGORIZED_KEY = 'none'
+
+    key = models.CharField('汇总键', max_length=30, unique=True)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE,
+                                 null=True, blank=True, verbose_name='分类')
+    total_products = models.IntegerField('商品总数', default=0)
+    low_stock_products = models.IntegerField('库存不足商品数', default=0)
+    out_of_stock_products = models.IntegerField('缺货商品数', default=0)
+    stock_value = models.DecimalField('库存总值', max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '库存汇总'
+        verbose_name_plural = '库存汇总'
+
+    def __str__(self):
+        return f"{self.key}: {self.total_products}"
+
+    @classmethod
+    def key_for_category(cls, category_id):
+        return cls.UNCATEGORIZED_KEY if category_id is None else str(category_id)
+
+
+class ProductSearchIndex(models.Model):
+    """商品全文索引（SQLite FTS5 虚拟表）的只读映射，只用于在查询中联结
+
+    表由迁移 0004 创建并由触发器维护，Django 不管理它；rowid 与商品主键一致。
+    FTS5 表有一个与表同名的隐藏列，MATCH 与 bm25() 都以该列为参数，映射为 document 字段。
+    见 inventory.search。
+    """
+    product = models.OneToOneField(Product, on_delete=models.DO_NOTHING, primary_key=True,
+                                   db_column='rowid', db_constraint=False,
+                                   related_name='search_index', verbose_name='商品')
+    document = models.TextField('全文索引', db_column='inventory_product_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_product_fts'
+        verbose_name = '商品全文索引'
+        verbose_name_plural = '商品全文索引'
@@ -0,0 +1,166 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+# 商品列表的排序键，游标即排序键的取值
+CURSOR_ORDERING = ('-updated_at', '-id')
+
+# 自动模式下商品总数超过该值时改用游标分页
+CURSOR_PAGINATION_THRESHOLD = 10000
+
+# 搜索结果的近似计数最多数到这么多行，超过时显示为 “N+”
+APPROXIMATE_COUNT_LIMIT = 1000
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def get_pagination_mode():
+    """读取商品列表分页模式：auto / cursor / pages"""
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('PRODUCT_LIST_PAGINATION') or 'auto'
+
+
+def get_cursor_threshold():
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('CURSOR_PAGINATION_THRESHOLD', CURSOR_PAGINATION_THRESHOLD)
+
+
+def approximate_count_enabled():
+    """游标分页时是否显示近似总数"""
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('PRODUCT_LIST_APPROXIMATE_COUNT', True)
+
+
+def encode_cursor(updated_at, pk, direction):
+    """把排序键编码为不透明的游标字符串"""
+    payload = json.dumps([updated_at.isoformat(), pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """解析游标，返回 (updated_at, id, 方向)；格式无效时返回 None"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        updated_at, pk, direction = json.loads(base64.urlsafe_b64decode(padded))
+        updated_at = datetime.datetime.fromisoformat(updated_at)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(pk, int) or direction not in (NEXT, PREVIOUS):
+        return None
+    return updated_at, pk, direction
+
+
+class CursorPage:
+    """游标分页的一页，接口与 Django 的 Page 对象保持相近以便模板复用"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        # 由调用方按需填入，见 approximate_product_count
+        self.approximate_count = None
+        self.count_truncated = False
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if not self.has_next_page or not self.object_list:
+            return ''
+        last = self.object_list[-1]
+        return encode_cursor(last.updated_at, last.pk, NEXT)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous_page or not self.object_list:
+            return ''
+        first = self.object_list[0]
+        return encode_cursor(first.updated_at, first.pk, PREVIOUS)
+
+
+class CursorPaginator:
+    """按 (updated_at, id) 倒序的键集分页
+
+    每页只执行一条 WHERE (updated_at, id) < 游标 ... LIMIT per_page + 1 的查询，
+    不做 COUNT，也不使用 OFFSET，翻到多深都只读取一页的数据。
+    查询集原有的过滤条件保留，排序统一改为 CURSOR_ORDERING；
+    按相关度排序的全文搜索结果（见 inventory.search.is_ranked）不能使用。
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page_queryset(self, cursor=None):
+        """取一页（多取一行用于判断是否还有更多）的查询集，cursor 为 decode_cursor 的结果"""
+        if cursor is None:
+            return self.queryset.order_by(*CURSOR_ORDERING)[:self.per_page + 1]
+
+        # 额外的 updated_at 上/下界让 SQLite 从游标位置开始范围查找索引，
+        # 只有 OR 条件时会从索引一端扫描到游标处，翻得越深越慢
+        updated_at, pk, direction = cursor
+        if direction == NEXT:
+            queryset = self.queryset.filter(updated_at__lte=updated_at).filter(
+                Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk)
+            ).order_by(*CURSOR_ORDERING)
+        else:
+            # 向前翻页：按相反顺序取紧挨着游标的一页，再翻转回来
+            queryset = self.queryset.filter(updated_at__gte=updated_at).filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+            ).order_by('updated_at', 'id')
+        return queryset[:self.per_page + 1]
+
+    def get_page(self, token):
+        """按游标取一页，游标为空或无效时返回第一页"""
+        cursor = decode_cursor(token)
+        rows = list(self.page_queryset(cursor))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if cursor is None:
+            return CursorPage(rows, has_more, False)
+        if cursor[2] == NEXT:
+            return CursorPage(rows, has_more, True)
+        rows.reverse()
+        return CursorPage(rows, True, has_more)
+
+
+def approximate_product_count(queryset, summary, query='', stock_status=''):
+    """商品列表的近似总数
+
+    没有搜索关键词时直接由库存汇总计数器得出（不查询商品表）；
+    有关键词时最多数 APPROXIMATE_COUNT_LIMIT 行，返回 (数量, 是否截断)。
+    """
+    if not query:
+        counts = {
+            '': summary.total_products,
+            'low_stock': summary.low_stock_products,
+            'out_of_stock': summary.out_of_stock_products,
+            'in_stock': (summary.total_products - summary.low_stock_products
+                         - summary.out_of_stock_products),
+        }
+        if stock_status in counts:
+            return counts[stock_status], False
+
+    count = queryset.order_by()[:APPROXIMATE_COUNT_LIMIT + 1].count()
+    return min(count, APPROXIMATE_COUNT_LIMIT), count > APPROXIMATE_COUNT_LIMIT
@@ -0,0 +1,376 @@
+"""请求级性能统计：SQL 次数与耗时、模板渲染耗时、缓存命中与总耗时，按视图滚动汇总
+
+PerformanceMiddleware 按 PERFORMANCE_SAMPLE_RATE 抽样请求，被抽中的请求在上下文变量中
+携带一个 RequestMetrics，由以下位置累计：
+
+- SQL：每个数据库连接建立时安装的 execute_wrapper（record_query），未抽样的请求直接执行；
+- 模板：TEMPLATES 使用本模块的 DjangoTemplates 后端，统计顶层模板的渲染时间；
+- 缓存：片段缓存与报表快照的命中/未命中（record_cache）。
+
+上下文变量会被带入 sync_to_async 的线程，异步视图中的 ORM 查询同样计入。
+流式响应（CSV 导出等）的内容在响应头发出之后才生成：包装 streaming_content，生成内容期间的查询
+同样计入，内容全部发出后才记录样本（streamed=True；客户端中途断开时 partial=True），
+这类响应不带 Server-Timing 头。Server-Timing 只发给管理员或 DEBUG 模式，避免向普通用户暴露 SQL 统计。
+每个视图最近 PERFORMANCE_WINDOW 个样本保存在共享缓存中，所有工作进程写入同一份。
+样本先在进程内累计，每隔 STATS_FLUSH_INTERVAL 秒才合并到共享缓存（每个视图读写一次），
+避免 SQLiteCache 上每个被抽样的请求都产生一次写事务；滚动窗口只保存数值字段，
+SQL 文本只随当前最慢的一个样本保存。view_stats() 先写出本进程的样本，其他进程的样本最多滞后一个间隔。
+读出再写回不是原子操作，并发写出时偶尔丢失一批样本，对统计结果影响可以忽略。
+"""
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+# 默认抽样 10% 的请求
+DEFAULT_SAMPLE_RATE = 0.1
+
+# 每个视图保留的最近样本数
+DEFAULT_WINDOW = 100
+
+# 每个样本保留的最慢 SQL 条数与每条 SQL 的最大长度
+SLOW_QUERY_COUNT = 5
+SQL_MAX_LENGTH = 500
+
+STATS_VIEWS_KEY = 'inventory:performance:views'
+# 值为 {'samples': [数值样本], 'slowest': 带 SQL 的最慢样本}
+STATS_KEY = 'inventory:performance:v2:view:{view}'
+STATS_TIMEOUT = 7 * 24 * 3600
+
+# 样本先在进程内累计，每个进程最多每隔这么多秒写入共享缓存一次
+STATS_FLUSH_INTERVAL = 10.0
+
+_current = contextvars.ContextVar('inventory_request_metrics', default=None)
+
+# 流式内容结束的标记
+_END = object()
+
+
+def get_sample_rate():
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('PERFORMANCE_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+
+
+def get_window():
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('PERFORMANCE_WINDOW', DEFAULT_WINDOW)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestMetrics:
+    """一个请求的各项计数与耗时（秒）"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total_time = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        # SQL（参数为占位符）-> [执行次数, 累计耗时]，同一语句多次执行合并，便于发现 N+1 查询
+        self.queries = {}
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_query(self, sql, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        entry = self.queries.setdefault(sql, [0, 0.0])
+        entry[0] += 1
+        entry[1] += duration
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.start
+
+    def slow_queries(self, limit=SLOW_QUERY_COUNT):
+        """按累计耗时从高到低的 SQL"""
+        ranked = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [{'sql': sql[:SQL_MAX_LENGTH], 'count': count, 'ms': _ms(seconds)}
+                for sql, (count, seconds) in ranked]
+
+    def as_dict(self):
+        return {
+            'total_ms': _ms(self.total_time),
+            'sql_count': self.sql_count,
+            'sql_ms': _ms(self.sql_time),
+            'template_ms': _ms(self.template_time),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+    def server_timing(self):
+        """Server-Timing 响应头，浏览器开发者工具的网络面板中可直接查看"""
+        return ', '.join([
+            f'sql;dur={_ms(self.sql_time)};desc="{self.sql_count} queries"',
+            f'template;dur={_ms(self.template_time)}',
+            f'cache;desc="hits={self.cache_hits} misses={self.cache_misses}"',
+            f'total;dur={_ms(self.total_time)}',
+        ])
+
+
+def start_request():
+    """按抽样率决定是否统计本次请求，不统计时返回 None"""
+    rate = get_sample_rate()
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    return RequestMetrics()
+
+
+@contextlib.contextmanager
+def collecting(metrics):
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """每个连接（包括 sync_to_async 线程中的连接）常驻一个 execute_wrapper"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def record_cache(hits=0, misses=0):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class Template(django_backend.Template):
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """统计渲染耗时的 Django 模板后端
+
+    只包装顶层模板，include/extends 的渲染计入所在的模板，不会重复累计。
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def stats_key(view_name):
+    return STATS_KEY.format(view=view_name)
+
+
+def server_timing_allowed(request):
+    """Server-Timing 暴露 SQL 次数与各阶段耗时，只发给管理员，DEBUG 模式下发给所有人"""
+    if settings.DEBUG:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff)
+
+
+def finish_request(request, response, metrics):
+    """加上 Server-Timing 头，记录一条日志，并把样本加入该视图的滚动汇总
+
+    流式响应改为在内容全部发出后记录，见 _stream / _astream。
+    """
+    if response.streaming:
+        stream = _astream if response.is_async else _stream
+        response.streaming_content = stream(response.streaming_content, request, response, metrics)
+        return
+    metrics.finish()
+    if server_timing_allowed(request):
+        response['Server-Timing'] = metrics.server_timing()
+    record_sample(request, response, metrics)
+
+
+def _stream(content, request, response, metrics):
+    complete = False
+    try:
+        iterator = iter(content)
+        while True:
+            with collecting(metrics):
+                chunk = next(iterator, _END)
+            if chunk is _END:
+                break
+            yield chunk
+        complete = True
+    finally:
+        metrics.finish()
+        record_sample(request, response, metrics, streamed=True, partial=not complete)
+
+
+async def _astream(content, request, response, metrics):
+    complete = False
+    try:
+        iterator = aiter(content)
+        while True:
+            with collecting(metrics):
+                chunk = await anext(iterator, _END)
+            if chunk is _END:
+                break
+            yield chunk
+        complete = True
+    finally:
+        metrics.finish()
+        await sync_to_async(record_sample)(request, response, metrics, streamed=True, partial=not complete)
+
+
+def record_sample(request, response, metrics, streamed=False, partial=False):
+    """记录一条日志，并把样本加入该视图的滚动汇总"""
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.view_name if match else None
+    values = metrics.as_dict()
+    logger.info(
+        f"{request.method} {request.path} {response.status_code} {values['total_ms']}ms "
+        f"sql={values['sql_count']}/{values['sql_ms']}ms template={values['template_ms']}ms "
+        f"cache={values['cache_hits']}/{values['cache_misses']}"
+        f"{' streamed' if streamed else ''}{' partial' if partial else ''}",
+        extra={'view': view_name, 'status_code': response.status_code,
+               'streamed': streamed, 'partial': partial, **values},
+    )
+    if view_name is None:
+        return
+
+    sample = {
+        **values,
+        'streamed': streamed,
+        'partial': partial,
+        'at': time.time(),
+        'status': response.status_code,
+    }
+    _samples.add(view_name, sample, lambda: {
+        'method': request.method,
+        'path': request.get_full_path()[:SQL_MAX_LENGTH],
+        'queries': metrics.slow_queries(),
+    })
+
+
+class ViewSamples:
+    """进程内累计的样本：视图名 -> [数值样本列表, 带 SQL 等详情的最慢样本]"""
+
+    def __init__(self):
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def add(self, view_name, sample, details):
+        """加入一个样本；details() 返回路径与最慢的 SQL，只在它是本进程目前最慢的样本时才调用"""
+        with self.pending_lock:
+            entry = self.pending.setdefault(view_name, [[], None])
+            entry[0].append(sample)
+            del entry[0][:-get_window()]
+            if entry[1] is None or sample['total_ms'] > entry[1]['total_ms']:
+                entry[1] = {**sample, **details()}
+            if time.monotonic() - self.flushed_at < STATS_FLUSH_INTERVAL:
+                return
+        self.flush()
+
+    def flush(self):
+        """把本进程累计的样本合并到共享缓存"""
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+
+        window = get_window()
+        stored = cache.get_many([stats_key(name) for name in pending])
+        for name, (samples, slowest) in pending.items():
+            current = stored.get(stats_key(name)) or {}
+            samples = (current.get('samples', []) + samples)[-window:]
+            previous = current.get('slowest')
+            # 共享缓存中的最慢样本仍在窗口内且更慢时保留，否则换成本进程的最慢样本
+            oldest = min(sample['at'] for sample in samples)
+            if previous is not None and previous['at'] >= oldest and previous['total_ms'] >= slowest['total_ms']:
+                slowest = previous
+            cache.set(stats_key(name), {'samples': samples, 'slowest': slowest}, STATS_TIMEOUT)
+
+        views = cache.get(STATS_VIEWS_KEY) or set()
+        if not views.issuperset(pending):
+            cache.set(STATS_VIEWS_KEY, views | set(pending), STATS_TIMEOUT)
+
+    def reset(self):
+        with self.pending_lock:
+            self.pending = {}
+            self.flushed_at = time.monotonic()
+
+
+_samples = ViewSamples()
+
+
+def reset_stats():
+    """清空本进程未写出的样本与共享缓存中的汇总"""
+    _samples.reset()
+    names = cache.get(STATS_VIEWS_KEY) or set()
+    cache.delete_many([STATS_VIEWS_KEY, *(stats_key(name) for name in names)])
+
+
+def _average(samples, field, digits=2):
+    return round(sum(sample[field] for sample in samples) / len(samples), digits)
+
+
+def view_stats(limit=None):
+    """各视图最近样本的汇总，按 p95 耗时从慢到快排序，附带最慢一次请求及其 SQL"""
+    _samples.flush()
+    names = cache.get(STATS_VIEWS_KEY) or set()
+    stored = cache.get_many([stats_key(name) for name in names])
+    result = []
+    for name in names:
+        entry = stored.get(stats_key(name))
+        if not entry:
+            continue
+        samples = entry['samples']
+        totals = sorted(sample['total_ms'] for sample in samples)
+        hits = sum(sample['cache_hits'] for sample in samples)
+        lookups = hits + sum(sample['cache_misses'] for sample in samples)
+        result.append({
+            'view': name,
+            'samples': len(samples),
+            'avg_ms': _average(samples, 'total_ms'),
+            'p95_ms': totals[min(len(totals) - 1, int(len(totals) * 0.95))],
+            'max_ms': totals[-1],
+            'avg_sql_count': _average(samples, 'sql_count', 1),
+            'avg_sql_ms': _average(samples, 'sql_ms'),
+            'avg_template_ms': _average(samples, 'template_ms'),
+            'cache_hit_ratio': round(hits / lookups, 3) if lookups else None,
+            'slowest': entry['slowest'],
+        })
+    result.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return result[:limit] if limit else result
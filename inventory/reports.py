@@ -0,0 +1,156 @@
+import logging
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import performance, versions
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+# 报表快照的缓存键前缀，完整键中带有数据版本号，数据变化后旧快照自然失效
+REPORT_CACHE_PREFIX = 'inventory:stock_report'
+REPORT_CACHE_TIMEOUT = 24 * 3600
+
+# 分类明细中列出的高价值商品数量
+TOP_PRODUCTS_LIMIT = 20
+
+REPORT_FIELDS = (
+    'total_products', 'active_products', 'total_quantity',
+    'stock_value', 'cost_value', 'costed_value',
+    'low_stock_products', 'out_of_stock_products', 'missing_cost_products',
+)
+
+
+class ReportRow:
+    """报表中的一行（某个分类或合计）"""
+
+    def __init__(self, category_id=None, name='', **values):
+        self.category_id = category_id
+        self.name = name
+        for field in REPORT_FIELDS:
+            setattr(self, field, values.get(field) or 0)
+
+    def add(self, other):
+        for field in REPORT_FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    @property
+    def margin(self):
+        """按售价与成本价计算的毛利（只统计填写了成本价的商品）"""
+        return Decimal(self.costed_value) - Decimal(self.cost_value)
+
+    @property
+    def margin_rate(self):
+        """毛利率（%），没有可计算成本的商品时为 None"""
+        if not self.costed_value:
+            return None
+        return self.margin / Decimal(self.costed_value) * 100
+
+    @property
+    def in_stock_products(self):
+        return self.total_products - self.low_stock_products - self.out_of_stock_products
+
+
+class StockReport:
+    """某个数据版本下的库存报表快照：按分类的明细行与合计"""
+
+    def __init__(self, rows, version):
+        self.rows = sorted(rows, key=lambda row: Decimal(row.stock_value), reverse=True)
+        self.version = version
+        self.generated_at = timezone.now()
+        self.elapsed = 0.0
+        self.total = ReportRow(name='合计')
+        for row in self.rows:
+            self.total.add(row)
+
+    def get_row(self, category_id):
+        for row in self.rows:
+            if row.category_id == category_id:
+                return row
+        return None
+
+
+def stock_report_queryset():
+    """按分类分组的聚合查询，每个分类一行，由 product_report_idx 覆盖"""
+    has_cost = Q(cost_price__isnull=False)
+    return Product.objects.order_by().values('category_id').annotate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(is_active=True)),
+        total_quantity=Sum('quantity'),
+        stock_value=Sum(F('quantity') * F('price')),
+        cost_value=Sum(F('quantity') * F('cost_price'), filter=has_cost),
+        costed_value=Sum(F('quantity') * F('price'), filter=has_cost),
+        low_stock_products=Count('id', filter=Q(quantity__lte=F('low_stock_threshold'),
+                                                quantity__gt=0)),
+        out_of_stock_products=Count('id', filter=Q(quantity=0)),
+        missing_cost_products=Count('id', filter=~has_cost),
+    )
+
+
+def compute_stock_report():
+    """用一条分组聚合查询计算报表（不逐个商品读取）"""
+    version = versions.get_version()
+    started = time.perf_counter()
+
+    aggregates = stock_report_queryset()
+    names = dict(Category.objects.values_list('pk', 'name'))
+    rows = [
+        ReportRow(
+            category_id=values['category_id'],
+            name=names.get(values['category_id'], '未分类'),
+            **{field: values[field] for field in REPORT_FIELDS}
+        )
+        for values in aggregates
+    ]
+
+    report = StockReport(rows, version)
+    report.elapsed = time.perf_counter() - started
+    logger.info(f"Stock report computed: {len(rows)} categories in {report.elapsed * 1000:.0f}ms "
+                f"(data version {version})")
+    return report
+
+
+def report_cache_key(version, *parts):
+    return ':'.join(str(part) for part in (REPORT_CACHE_PREFIX, version) + parts)
+
+
+def get_stock_report():
+    """读取当前数据版本的报表快照，缓存中没有时计算并写入"""
+    version = versions.get_version()
+    key = report_cache_key(version)
+    report = cache.get(key)
+    performance.record_cache(hits=report is not None, misses=report is None)
+    if report is None:
+        report = compute_stock_report()
+        # 计算开始时读取的版本号：计算期间数据又发生变化时，快照只归属于旧版本
+        cache.set(report_cache_key(report.version), report, REPORT_CACHE_TIMEOUT)
+    return report
+
+
+def get_category_report(category_id):
+    """分类明细：合计数据直接取自整体报表快照，只额外查询该分类价值最高的商品
+
+    返回 (报表快照, 分类行, 商品列表)，分类不在报表中（没有商品）时分类行为 None。
+    """
+    report = get_stock_report()
+    row = report.get_row(category_id)
+    if row is None:
+        return report, None, []
+
+    key = report_cache_key(report.version, 'category',
+                           'none' if category_id is None else category_id)
+    products = cache.get(key)
+    performance.record_cache(hits=products is not None, misses=products is None)
+    if products is None:
+        products = list(
+            Product.objects.filter(category_id=category_id)
+            .annotate(value=F('quantity') * F('price'))
+            .order_by('-value')
+            .values('pk', 'name', 'sku', 'quantity', 'price', 'cost_price', 'value')[:TOP_PRODUCTS_LIMIT]
+        )
+        cache.set(key, products, REPORT_CACHE_TIMEOUT)
+    return report, row, products
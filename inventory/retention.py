@@ -0,0 +1,217 @@
+import csv
+import datetime
+import gzip
+import heapq
+import itertools
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .exports import CSV_BOM, MOVEMENT_EXPORT_COLUMNS, iter_movement_rows
+from .filters import filter_daily_movements, filter_movements, local_day_start
+from .models import StockMovement, StockMovementDaily
+
+logger = logging.getLogger(__name__)
+
+# 默认保留最近一年的原始变动记录
+DEFAULT_RETENTION_DAYS = 365
+
+# 每批合并并删除的原始记录数；每批一个短事务，写锁的持有时间与待处理总量无关
+COMPACT_BATCH_SIZE = 5000
+
+# 变动历史页最多显示的条目数
+HISTORY_LIMIT = 200
+
+DAILY_COUNTER_FIELDS = ('movement_count', 'quantity', 'inbound', 'outbound')
+
+
+def get_retention_days():
+    """读取原始变动记录的保留天数"""
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('MOVEMENT_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def get_archive_dir():
+    """读取归档目录，None 表示合并后直接删除原始记录"""
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    return inventory_settings.get('MOVEMENT_ARCHIVE_DIR') or None
+
+
+def get_cutoff(days=None):
+    """合并边界：早于该时间（本地某天零点）的原始记录会被合并，保证每天要么全部合并要么都不合并"""
+    if days is None:
+        days = get_retention_days()
+    return local_day_start(timezone.localdate() - datetime.timedelta(days=days))
+
+
+class CompactionResult:
+    """一次合并的统计结果"""
+
+    def __init__(self, cutoff):
+        self.cutoff = cutoff
+        self.movements = 0
+        self.batches = 0
+        self.summaries_created = 0
+        self.summaries_updated = 0
+        self.archive_path = None
+        self.elapsed = 0.0
+
+
+class MovementArchive:
+    """把即将删除的原始记录追加写入 gzip 压缩的 CSV 文件，列与变动导出相同"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        filename = timezone.localtime().strftime('stock_movements_archive_%Y%m%d_%H%M%S.csv.gz')
+        self.path = os.path.join(directory, filename)
+        self.file = None
+        self.writer = None
+
+    def write(self, queryset):
+        if self.file is None:
+            self.file = gzip.open(self.path, 'wt', encoding='utf-8', newline='')
+            self.writer = csv.writer(self.file)
+            self.file.write(CSV_BOM)
+            self.writer.writerow([label for _, label in MOVEMENT_EXPORT_COLUMNS])
+        self.writer.writerows(iter_movement_rows(queryset))
+        # 删除原始记录之前确保本批数据已写入文件
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def summarize_movements(queryset):
+    """按 商品/本地日期/变动类型 分组聚合原始记录"""
+    return queryset.annotate(day=TruncDate('created_at')).order_by().values(
+        'product_id', 'day', 'movement_type'
+    ).annotate(
+        movement_count=Count('id'),
+        net=Sum('quantity'),
+        inbound=Sum('quantity', filter=Q(quantity__gt=0)),
+        outbound=Sum('quantity', filter=Q(quantity__lt=0)),
+        first_at=Min('created_at'),
+        last_at=Max('created_at'),
+    )
+
+
+def merge_daily(rows, result):
+    """把一批分组结果累加到日汇总表：已有的行更新计数，没有的行新建"""
+    groups = {(row['product_id'], row['day'], row['movement_type']): row for row in rows}
+    if not groups:
+        return
+
+    existing = StockMovementDaily.objects.select_for_update().filter(
+        product_id__in={key[0] for key in groups},
+        day__in={key[1] for key in groups},
+    )
+    existing = {(daily.product_id, daily.day, daily.movement_type): daily for daily in existing}
+
+    to_create, to_update = [], []
+    for key, row in groups.items():
+        counters = (row['movement_count'], row['net'], row['inbound'] or 0, -(row['outbound'] or 0))
+        daily = existing.get(key)
+        if daily is None:
+            to_create.append(StockMovementDaily(
+                product_id=key[0], day=key[1], movement_type=key[2],
+                first_at=row['first_at'], last_at=row['last_at'],
+                **dict(zip(DAILY_COUNTER_FIELDS, counters))
+            ))
+            continue
+        for field, value in zip(DAILY_COUNTER_FIELDS, counters):
+            setattr(daily, field, getattr(daily, field) + value)
+        daily.first_at = min(daily.first_at, row['first_at'])
+        daily.last_at = max(daily.last_at, row['last_at'])
+        to_update.append(daily)
+
+    StockMovementDaily.objects.bulk_create(to_create, batch_size=500)
+    StockMovementDaily.objects.bulk_update(
+        to_update, DAILY_COUNTER_FIELDS + ('first_at', 'last_at'), batch_size=500
+    )
+    result.summaries_created += len(to_create)
+    result.summaries_updated += len(to_update)
+
+
+def compact_movements(days=None, batch_size=COMPACT_BATCH_SIZE, archive_dir=None,
+                      pause=0.0, dry_run=False):
+    """把超过保留期限的原始变动记录合并到日汇总表，然后删除（或归档后删除）
+
+    按 (created_at, id) 从最早的记录开始分批处理：每批在一个事务中完成
+    聚合、累加到日汇总、删除，已处理的行不会再被读取；中途中断后重新运行即可继续。
+    pause 为每批之间的停顿秒数，给其他写操作让出数据库。
+    """
+    started = time.perf_counter()
+    cutoff = get_cutoff(days)
+    result = CompactionResult(cutoff)
+    pending = StockMovement.objects.filter(created_at__lt=cutoff)
+
+    if dry_run:
+        result.movements = pending.count()
+        return result
+
+    archive = MovementArchive(archive_dir) if archive_dir else None
+    keys = pending.order_by('created_at', 'id').values_list('created_at', 'id')
+    try:
+        while True:
+            # 本批最后一行的键：前面的行都已删除，偏移量始终只有 batch_size
+            boundary = keys[batch_size - 1:batch_size].first() or keys.last()
+            if boundary is None:
+                break
+            last_created_at, last_id = boundary
+            batch = pending.filter(
+                Q(created_at__lt=last_created_at) |
+                Q(created_at=last_created_at, id__lte=last_id)
+            )
+            with transaction.atomic():
+                if archive is not None:
+                    archive.write(batch)
+                merge_daily(summarize_movements(batch), result)
+                deleted, _ = batch.delete()
+            result.movements += deleted
+            result.batches += 1
+            if pause:
+                time.sleep(pause)
+    finally:
+        if archive is not None:
+            archive.close()
+            if result.movements:
+                result.archive_path = archive.path
+
+    result.elapsed = time.perf_counter() - started
+    logger.info(f"Stock movements compacted: {result.movements} rows before {cutoff:%Y-%m-%d} "
+                f"in {result.batches} batches, {result.summaries_created} daily rows created, "
+                f"{result.summaries_updated} updated ({result.elapsed:.2f}s)")
+    return result
+
+
+def get_movement_history(date_from=None, date_to=None, product=None, category=None,
+                         movement_type='', limit=HISTORY_LIMIT):
+    """按时间倒序返回最近的变动历史：原始记录与已合并的日汇总混合在一起
+
+    两部分互不重叠（每条原始记录要么仍在变动表中，要么已计入日汇总），
+    各自按索引取最近的 limit 条后归并。日汇总条目可用 movement_count 区分。
+    """
+    filters = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'product': product,
+        'category': category,
+        'movement_type': movement_type,
+    }
+    movements = filter_movements(
+        StockMovement.objects.select_related('product', 'created_by'), **filters
+    ).order_by('-created_at', '-id')[:limit]
+    daily = filter_daily_movements(
+        StockMovementDaily.objects.select_related('product'), **filters
+    ).order_by('-day')[:limit]
+    daily = sorted(daily, key=lambda entry: entry.last_at, reverse=True)
+
+    entries = heapq.merge(movements, daily, key=lambda entry: entry.created_at, reverse=True)
+    return list(itertools.islice(entries, limit))
@@ -0,0 +1,118 @@
+"""商品关键词搜索：SQLite 上使用 FTS5 trigram 全文索引，其他数据库或短关键词退回子串匹配
+
+短关键词：trigram 分词器只能匹配不少于 3 个字符的子串，常见的两字中文词（例如“螺丝”）
+无法使用全文索引，退回对商品名称、编码、描述与分类名称的 LIKE 子串匹配（icontains_filter）。
+这条路径读取商品表（并联结分类表）逐行比较，耗时随商品数线性增长：匹配的商品很多时按 updated_at
+索引顺序读取、取满一页即可停止，几乎没有代价；匹配很少时要扫描整张表，20 万商品约 150 ms。
+输入联想API不走这条路径，短关键词只查进程内的前缀索引（见 inventory.autocomplete）。
+"""
+import logging
+
+from django.db import connections, models
+
+from .models import ProductSearchIndex
+
+logger = logging.getLogger(__name__)
+
+# SQLite FTS5 全文索引表，rowid 与商品主键一致，由触发器与商品表、分类表保持同步
+FTS_TABLE = ProductSearchIndex._meta.db_table
+
+# trigram 分词器只能匹配不少于3个字符的子串，更短的关键词退回 icontains 查询
+MIN_TERM_LENGTH = 3
+
+# bm25 各列权重：商品名称、商品编码、商品描述、分类名称
+RANK_WEIGHTS = (10.0, 5.0, 1.0, 2.0)
+
+_fts_available = {}
+
+
+class Match(models.Lookup):
+    """FTS5 全文匹配：search_index__document__match=表达式"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', (*lhs_params, *rhs_params)
+
+
+# 只注册在全文索引的隐藏列上，不影响其他文本字段
+ProductSearchIndex._meta.get_field('document').register_lookup(Match)
+
+
+def fts_available(using='default'):
+    """当前数据库是否可以使用全文索引（SQLite 且索引表已由迁移创建）"""
+    if using not in _fts_available:
+        connection = connections[using]
+        _fts_available[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[using]
+
+
+def build_match_expression(query):
+    """把用户输入转换为 FTS5 MATCH 表达式
+
+    按空白拆分为多个词，每个词作为短语加引号（转义其中的双引号），词之间为 AND。
+    任何一个词短于 MIN_TERM_LENGTH 时返回 None，由调用方退回 icontains。
+    """
+    terms = query.split()
+    if not terms or any(len(term) < MIN_TERM_LENGTH for term in terms):
+        return None
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def icontains_filter(query):
+    """不使用全文索引时的等价过滤条件（短关键词时逐行比较，见模块说明）"""
+    return (
+        models.Q(name__icontains=query) |
+        models.Q(sku__icontains=query) |
+        models.Q(description__icontains=query) |
+        models.Q(category__name__icontains=query)
+    )
+
+
+def search_products(queryset, query):
+    """在商品查询集上应用关键词搜索
+
+    可用全文索引时与 FTS 表联结，按 bm25 相关度（search_rank，越小越相关）排序；
+    否则（其他数据库，或关键词短于 MIN_TERM_LENGTH）退回 icontains 子串匹配，保持原有排序。
+    """
+    match = build_match_expression(query) if fts_available(queryset.db) else None
+    if match is None:
+        return queryset.filter(icontains_filter(query))
+
+    rank = models.Func(
+        models.F('search_index__document'),
+        *(models.Value(weight) for weight in RANK_WEIGHTS),
+        function='bm25',
+        output_field=models.FloatField(),
+    )
+    return queryset.filter(search_index__document__match=match).annotate(
+        search_rank=rank
+    ).order_by('search_rank', '-updated_at')
+
+
+def is_ranked(queryset):
+    """查询集是否按全文索引相关度（search_rank）排序
+
+    这样的结果不能改用按 (updated_at, id) 的游标分页，否则相关度顺序会丢失。
+    """
+    return 'search_rank' in queryset.query.annotations
+
+
+def rebuild_index(using='default'):
+    """清空并根据商品表重建全文索引"""
+    if not fts_available(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, sku, description, category_name) '
+            'SELECT p.id, p.name, p.sku, p.description, COALESCE(c.name, \'\') '
+            'FROM inventory_product p LEFT JOIN inventory_category c ON c.id = p.category_id'
+        )
+        count = cursor.rowcount
+    logger.info(f"Product search index rebuilt: {count} products")
+    return count
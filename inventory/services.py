@@ -0,0 +1,261 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Product, StockMovement
+from .signals import StockChange, stock_changed
+
+logger = logging.getLogger(__name__)
+
+# 设置库存（set）时比较并交换的最大重试次数
+SET_STOCK_MAX_RETRIES = 5
+
+# 批量库存更新单次请求允许的最大条目数
+STOCK_BATCH_MAX_ITEMS = 2000
+
+MOVEMENT_TYPE_CODES = {code for code, _ in StockMovement.MOVEMENT_TYPES}
+
+# 变更库存时一并读取的字段，供 stock_changed 的接收者使用
+STOCK_STATE_FIELDS = ('quantity', 'category_id', 'low_stock_threshold', 'price')
+
+ADJUSTMENT_MOVEMENT_TYPES = {
+    'add': 'in',
+    'reduce': 'out',
+    'set': 'adjustment',
+}
+
+
+class StockError(Exception):
+    """库存变更失败"""
+
+
+class InsufficientStockError(StockError):
+    """库存不足，拒绝超卖"""
+
+
+def _product_id(product):
+    return product.pk if isinstance(product, Product) else product
+
+
+def _record_movement(product_id, movement_type, delta, new_quantity,
+                     reason='', reference_no='', user=None):
+    return StockMovement.objects.create(
+        product_id=product_id,
+        movement_type=movement_type,
+        quantity=delta,
+        old_quantity=new_quantity - delta,
+        new_quantity=new_quantity,
+        reason=reason,
+        reference_no=reference_no,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def adjust_stock(product, delta, movement_type='adjustment', reason='',
+                 reference_no='', user=None):
+    """按增量调整库存，并在同一个事务中写入库存变动记录
+
+    使用一条带条件的 UPDATE ... SET quantity = quantity + delta 完成变更，
+    不做先读后写；减少库存时 WHERE quantity >= -delta 在数据库层面拒绝超卖。
+    返回新建的 StockMovement。
+    """
+    product_id = _product_id(product)
+    if not delta:
+        raise StockError('调整数量不能为0')
+
+    with transaction.atomic():
+        products = Product.objects.filter(pk=product_id)
+        if delta < 0:
+            products = products.filter(quantity__gte=-delta)
+        updated = products.update(
+            quantity=F('quantity') + delta,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            if not Product.objects.filter(pk=product_id).exists():
+                raise StockError('商品不存在')
+            raise InsufficientStockError(f'库存不足，无法减少 {-delta} 件')
+
+        # 本事务已持有该行的写锁，回读的数量就是本次更新后的值
+        new_quantity, category_id, threshold, price = Product.objects.filter(
+            pk=product_id).values_list(*STOCK_STATE_FIELDS).get()
+        movement = _record_movement(product_id, movement_type, delta, new_quantity,
+                                    reason, reference_no, user)
+        stock_changed.send(sender=Product, changes=[StockChange(
+            product_id, category_id, threshold, price, new_quantity - delta, new_quantity
+        )])
+
+    if isinstance(product, Product):
+        product.quantity = new_quantity
+    logger.info(f"Stock adjusted: product={product_id} delta={delta:+d} -> {new_quantity}")
+    return movement
+
+
+def set_stock(product, quantity, movement_type='adjustment', reason='',
+              reference_no='', user=None):
+    """将库存设置为指定数量
+
+    先读取当前数量，再以 WHERE quantity = 读到的值 做比较并交换，
+    期间被其他请求修改时重试，避免长时间持锁。库存未变化时返回 None。
+    """
+    product_id = _product_id(product)
+    if quantity < 0:
+        raise StockError('库存数量不能为负数')
+
+    for _ in range(SET_STOCK_MAX_RETRIES):
+        try:
+            old_quantity, category_id, threshold, price = Product.objects.filter(
+                pk=product_id).values_list(*STOCK_STATE_FIELDS).get()
+        except Product.DoesNotExist:
+            raise StockError('商品不存在')
+
+        if old_quantity == quantity:
+            return None
+
+        with transaction.atomic():
+            updated = Product.objects.filter(pk=product_id, quantity=old_quantity).update(
+                quantity=quantity,
+                updated_at=timezone.now()
+            )
+            if updated:
+                movement = _record_movement(product_id, movement_type,
+                                            quantity - old_quantity, quantity,
+                                            reason, reference_no, user)
+                stock_changed.send(sender=Product, changes=[StockChange(
+                    product_id, category_id, threshold, price, old_quantity, quantity
+                )])
+                break
+    else:
+        raise StockError('库存正在被频繁修改，请稍后重试')
+
+    if isinstance(product, Product):
+        product.quantity = quantity
+    logger.info(f"Stock set: product={product_id} {old_quantity} -> {quantity}")
+    return movement
+
+
+def apply_adjustment(product, adjustment_type, quantity, reason='',
+                     reference_no='', user=None):
+    """按 StockAdjustmentForm 的调整类型（add/reduce/set）变更库存"""
+    movement_type = ADJUSTMENT_MOVEMENT_TYPES[adjustment_type]
+    if adjustment_type == 'set':
+        return set_stock(product, quantity, movement_type, reason, reference_no, user)
+    delta = quantity if adjustment_type == 'add' else -quantity
+    return adjust_stock(product, delta, movement_type, reason, reference_no, user)
+
+
+def _parse_delta_item(item):
+    """校验批量更新中的单个条目，返回 (sku, delta, movement_type, reference_no, reason)"""
+    if not isinstance(item, dict):
+        raise StockError('条目格式错误，应为对象')
+
+    sku = item.get('sku')
+    if not isinstance(sku, str) or not sku.strip():
+        raise StockError('缺少商品编码')
+
+    delta = item.get('delta')
+    if isinstance(delta, bool) or not isinstance(delta, int):
+        raise StockError('变动数量必须为整数')
+    if not delta:
+        raise StockError('调整数量不能为0')
+
+    movement_type = item.get('movement_type') or ('in' if delta > 0 else 'out')
+    if movement_type not in MOVEMENT_TYPE_CODES:
+        raise StockError(f'无效的变动类型: {movement_type}')
+
+    reference_no = str(item.get('reference_no') or '')[:50]
+    reason = str(item.get('reason') or '')[:200]
+    return sku.strip().upper(), delta, movement_type, reference_no, reason
+
+
+def apply_stock_deltas(items, user=None):
+    """在一个事务中批量应用库存增量
+
+    items 为 {sku, delta, movement_type, reference_no} 字典的列表，按顺序逐条生效。
+    整批只用一条查询解析全部SKU，用 bulk_update 写回数量，用 bulk_create 写入变动记录。
+    单条失败（SKU不存在、库存不足等）不影响其他条目；返回与 items 一一对应的结果列表。
+    """
+    results = [None] * len(items)
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append((index,) + _parse_delta_item(item))
+        except StockError as e:
+            sku = item.get('sku') if isinstance(item, dict) else None
+            results[index] = {'index': index, 'sku': sku, 'ok': False, 'error': str(e)}
+
+    if not parsed:
+        return results
+
+    skus = {entry[1] for entry in parsed}
+    operator = user if user is not None and user.is_authenticated else None
+    now = timezone.now()
+
+    with transaction.atomic():
+        # 先写后读：先对涉及的商品做一次不改变任何值的更新以取得写锁，
+        # 之后读到的库存在本事务结束前不会被其他请求修改；
+        # updated_at 只在最后写回实际应用了条目的商品，失败条目的商品保持不变
+        Product.objects.filter(sku__in=skus).update(quantity=F('quantity'))
+        current = {
+            sku: [pk, quantity, quantity, category_id, threshold, price]
+            for pk, sku, quantity, category_id, threshold, price in Product.objects.filter(
+                sku__in=skus).values_list('pk', 'sku', *STOCK_STATE_FIELDS)
+        }
+
+        movements = []
+        applied = []
+        touched = {}
+        for index, sku, delta, movement_type, reference_no, reason in parsed:
+            state = current.get(sku)
+            if state is None:
+                results[index] = {'index': index, 'sku': sku, 'ok': False, 'error': '商品不存在'}
+                continue
+
+            old_quantity = state[2]
+            new_quantity = old_quantity + delta
+            if new_quantity < 0:
+                results[index] = {
+                    'index': index, 'sku': sku, 'ok': False,
+                    'error': f'库存不足，当前库存 {old_quantity}，无法减少 {-delta} 件'
+                }
+                continue
+
+            state[2] = new_quantity
+            touched[state[0]] = state
+            movements.append(StockMovement(
+                product_id=state[0],
+                movement_type=movement_type,
+                quantity=delta,
+                old_quantity=old_quantity,
+                new_quantity=new_quantity,
+                reason=reason,
+                reference_no=reference_no,
+                created_by=operator,
+            ))
+            applied.append(index)
+            results[index] = {
+                'index': index, 'sku': sku, 'ok': True,
+                'old_quantity': old_quantity, 'new_quantity': new_quantity,
+            }
+
+        if touched:
+            Product.objects.bulk_update(
+                [Product(pk=pk, quantity=state[2], updated_at=now) for pk, state in touched.items()],
+                ['quantity', 'updated_at']
+            )
+        changed = [state for state in touched.values() if state[2] != state[1]]
+        StockMovement.objects.bulk_create(movements)
+        if changed:
+            stock_changed.send(sender=Product, changes=[
+                StockChange(pk, category_id, threshold, price, original, quantity)
+                for pk, original, quantity, category_id, threshold, price in changed
+            ])
+
+    for index, movement in zip(applied, movements):
+        results[index]['movement_id'] = movement.pk
+
+    logger.info(f"Stock batch applied: {len(movements)} of {len(items)} items, "
+                f"{len(changed)} products changed")
+    return results
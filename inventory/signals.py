@@ -0,0 +1,121 @@
+from collections import namedtuple
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import autocomplete, versions
+from .alerts import AlertDelta
+from .models import Category, Product, StockMovement
+from .summary import SummaryDelta, move_category_to_uncategorized
+
+# 库存变更路径（inventory.services）使用 QuerySet.update / bulk_update 写库存，
+# 不会触发模型信号，因此单独发送 stock_changed，参数 changes 为 StockChange 列表。
+# 该信号在写库存的同一事务内发送。
+stock_changed = Signal()
+
+StockChange = namedtuple('StockChange', [
+    'product_id', 'category_id', 'low_stock_threshold', 'price',
+    'old_quantity', 'new_quantity',
+])
+
+SUMMARY_STATE_FIELDS = ('category_id', 'quantity', 'low_stock_threshold', 'price')
+
+
+def product_state(product):
+    return tuple(getattr(product, field) for field in SUMMARY_STATE_FIELDS)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_state(sender, instance, raw=False, **kwargs):
+    """保存前记录数据库中的旧状态，用于增量更新汇总"""
+    if raw or instance.pk is None:
+        instance._summary_old_state = None
+        return
+    instance._summary_old_state = Product.objects.filter(pk=instance.pk).values_list(
+        *SUMMARY_STATE_FIELDS).first()
+
+
+@receiver(post_save, sender=Product)
+def update_summary_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    delta = SummaryDelta()
+    delta.replace(getattr(instance, '_summary_old_state', None), product_state(instance))
+    delta.apply()
+
+
+@receiver(post_save, sender=Product)
+def queue_low_stock_alert_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    alerts = AlertDelta()
+    alerts.replace(instance.pk, getattr(instance, '_summary_old_state', None), product_state(instance))
+    alerts.apply()
+
+
+@receiver(post_save, sender=Product)
+def update_autocomplete_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.product_saved(instance)
+
+
+@receiver(post_delete, sender=Product)
+def update_summary_on_delete(sender, instance, **kwargs):
+    delta = SummaryDelta()
+    delta.remove(*product_state(instance))
+    delta.apply()
+
+
+@receiver(post_delete, sender=Product)
+def update_autocomplete_on_delete(sender, instance, **kwargs):
+    autocomplete.products_changed()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_data_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.data_changed()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        versions.products_changed([instance.pk])
+
+
+# 只监听变动记录的保存：删除变动记录（例如 compact_stock_movements 合并旧记录）不改变商品的
+# 任何显示内容，而且有 post_delete 接收者时 QuerySet.delete() 会逐行加载被删除的记录
+@receiver(post_save, sender=StockMovement)
+def bump_product_version_on_movement(sender, instance, raw=False, **kwargs):
+    if not raw:
+        versions.products_changed([instance.product_id])
+
+
+@receiver(pre_delete, sender=Category)
+def move_summary_on_category_delete(sender, instance, **kwargs):
+    move_category_to_uncategorized(instance.pk)
+
+
+@receiver(stock_changed)
+def update_summary_on_stock_change(sender, changes, **kwargs):
+    delta = SummaryDelta()
+    for change in changes:
+        state = (change.category_id, change.old_quantity, change.low_stock_threshold, change.price)
+        delta.remove(*state)
+        delta.add(change.category_id, change.new_quantity, change.low_stock_threshold, change.price)
+    delta.apply()
+    versions.data_changed()
+    versions.products_changed(change.product_id for change in changes)
+
+
+@receiver(stock_changed)
+def queue_low_stock_alerts_on_stock_change(sender, changes, **kwargs):
+    alerts = AlertDelta()
+    for change in changes:
+        alerts.observe(change.product_id, change.old_quantity, change.low_stock_threshold,
+                       change.new_quantity, change.low_stock_threshold)
+    alerts.apply()
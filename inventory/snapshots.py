@@ -0,0 +1,186 @@
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .filters import local_day_start
+from .models import Product, StockMovement, StockMovementDaily, StockSnapshot, StockSnapshotItem
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PERIODS = ('daily', 'weekly', 'monthly')
+DEFAULT_SNAPSHOT_PERIOD = 'monthly'
+
+# 按时间点查询库存的API单次允许指定的最大商品编码数
+STOCK_AS_OF_MAX_SKUS = 500
+
+
+def get_snapshot_period():
+    """读取库存快照周期"""
+    inventory_settings = getattr(settings, 'INVENTORY_SETTINGS', {})
+    period = inventory_settings.get('STOCK_SNAPSHOT_PERIOD', DEFAULT_SNAPSHOT_PERIOD)
+    return period if period in SNAPSHOT_PERIODS else DEFAULT_SNAPSHOT_PERIOD
+
+
+def period_start(period=None, now=None):
+    """当前快照周期的起点（本地时区零点）"""
+    period = period or get_snapshot_period()
+    today = timezone.localdate(now)
+    if period == 'weekly':
+        today -= datetime.timedelta(days=today.weekday())
+    elif period == 'monthly':
+        today = today.replace(day=1)
+    return local_day_start(today)
+
+
+def snapshot_due(period=None, now=None):
+    """本周期内还没有快照时返回 True"""
+    return not StockSnapshot.objects.filter(taken_at__gte=period_start(period, now)).exists()
+
+
+def take_snapshot():
+    """记录当前全部商品的库存
+
+    用一条 INSERT ... SELECT 在数据库内完成复制，只写入库存大于 0 的商品。
+    """
+    started = time.perf_counter()
+    item_table = connection.ops.quote_name(StockSnapshotItem._meta.db_table)
+    product_table = connection.ops.quote_name(Product._meta.db_table)
+
+    with transaction.atomic():
+        snapshot = StockSnapshot.objects.create(taken_at=timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {item_table} (snapshot_id, product_id, quantity) '
+                f'SELECT %s, id, quantity FROM {product_table} WHERE quantity > 0',
+                [snapshot.pk]
+            )
+            snapshot.item_count = cursor.rowcount
+        snapshot.save(update_fields=['item_count'])
+
+    logger.info(f"Stock snapshot taken at {timezone.localtime(snapshot.taken_at):%Y-%m-%d %H:%M:%S}: "
+                f"{snapshot.item_count} products in {time.perf_counter() - started:.2f}s")
+    return snapshot
+
+
+def parse_as_of(value):
+    """解析查询时间：日期表示该日结束时（次日本地零点），也接受日期时间
+
+    无法解析时返回 None。
+    """
+    value = (value or '').strip()
+    day = parse_date(value)
+    if day is not None:
+        return local_day_start(day + datetime.timedelta(days=1))
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def compacted_until():
+    """已合并为日汇总的范围终点：最后一个汇总日的次日本地零点，没有合并过时返回 None
+
+    合并按本地零点整天进行，该时刻之前只剩日汇总，只能按整天计算。
+    """
+    last_day = StockMovementDaily.objects.aggregate(last_day=Max('day'))['last_day']
+    return local_day_start(last_day + datetime.timedelta(days=1)) if last_day else None
+
+
+def align_as_of(at, horizon):
+    """已合并的日期内无法拆分到某一时刻，查询时间对齐到当日结束（次日本地零点）"""
+    if horizon is None or at >= horizon:
+        return at
+    day = timezone.localdate(at)
+    if at == local_day_start(day):
+        return at
+    return local_day_start(day + datetime.timedelta(days=1))
+
+
+def nearest_snapshot(at, not_before=None):
+    """不晚于 at 的最近一次快照，没有时返回 None
+
+    not_before 之前的快照不使用：快照所在的日期已合并时，当天快照前后的变动无法区分。
+    """
+    snapshots = StockSnapshot.objects.filter(taken_at__lte=at)
+    if not_before is not None:
+        snapshots = snapshots.filter(taken_at__gte=not_before)
+    return snapshots.order_by('-taken_at').first()
+
+
+def _movement_total(start=None, end=None):
+    """每个商品在 [start, end) 内的变动数量合计（原始记录与日汇总），作为相关子查询
+
+    日汇总按日期整天计入，start/end 落在已合并的日期内时必须是本地零点（见 align_as_of）。
+    """
+    movements = StockMovement.objects.filter(product=OuterRef('pk'))
+    daily = StockMovementDaily.objects.filter(product=OuterRef('pk'))
+    if start is not None:
+        movements = movements.filter(created_at__gte=start)
+        daily = daily.filter(day__gte=timezone.localdate(start))
+    if end is not None:
+        movements = movements.filter(created_at__lt=end)
+        daily = daily.filter(day__lt=timezone.localdate(end))
+
+    def total(queryset):
+        return Coalesce(Subquery(
+            queryset.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+        ), Value(0))
+
+    return total(movements) + total(daily)
+
+
+def stock_as_of_queryset(at, queryset=None, snapshot=None):
+    """为商品查询集标注 quantity_as_of：at 时刻（不含）的库存
+
+    从不晚于 at 的最近一次快照出发，只重放快照之后、at 之前的变动；
+    快照之后才创建的商品（以及没有快照时的全部商品）从当前库存倒推 at 之后的变动。
+    全部在一条查询内完成，每个商品只做几次索引查找。
+    未通过库存变动记录修改的数量（例如直接编辑商品）在两次快照之间无法追溯。
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    queryset = queryset.filter(Q(created_at__lt=at) | Q(created_at__isnull=True))
+    backward = F('quantity') - _movement_total(start=at)
+
+    if snapshot is None:
+        return queryset.annotate(quantity_as_of=backward)
+
+    base = Coalesce(Subquery(
+        StockSnapshotItem.objects.filter(snapshot=snapshot, product=OuterRef('pk')).values('quantity')
+    ), Value(0))
+    forward = base + _movement_total(start=snapshot.taken_at, end=at)
+    return queryset.annotate(quantity_as_of=Case(
+        When(created_at__gt=snapshot.taken_at, then=backward),
+        default=forward,
+        output_field=IntegerField(),
+    ))
+
+
+class StockAsOf:
+    """某一时刻的库存查询：使用的快照与标注了 quantity_as_of 的商品查询集
+
+    查询时间落在已合并的日期内时对齐到当日结束，此时 aligned 为 True，at 为实际使用的时间；
+    已合并日期内的快照不使用。
+    """
+
+    def __init__(self, at, queryset=None):
+        horizon = compacted_until()
+        self.at = align_as_of(at, horizon)
+        self.aligned = self.at != at
+        self.snapshot = nearest_snapshot(self.at, not_before=horizon)
+        self.products = stock_as_of_queryset(self.at, queryset, self.snapshot)
+
+    def rows(self, chunk_size=2000):
+        """按主键顺序逐行产出 (sku, name, quantity_as_of)"""
+        return self.products.order_by('pk').values_list(
+            'sku', 'name', 'quantity_as_of').iterator(chunk_size=chunk_size)
@@ -0,0 +1,77 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# 每个新连接上执行的 PRAGMA（按顺序）
+# journal_mode=WAL: 读不阻塞写、写不阻塞读，多个 worker 进程可以同时读
+# synchronous=NORMAL: WAL 模式下只在检查点时 fsync，断电最多丢失最近的事务，不会损坏数据库
+# busy_timeout: 遇到锁时等待（毫秒）而不是立即报 “database is locked”
+# mmap_size: 用内存映射读取数据库文件，减少读操作的系统调用和复制
+# cache_size: 负数表示 KB，每个连接约 64MB 页缓存
+# temp_store=MEMORY: 排序、分组用的临时表放在内存中
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# 只允许设置这些 PRAGMA，值只能是整数或关键字，配置不会被拼接成任意 SQL
+ALLOWED_PRAGMAS = frozenset(DEFAULT_SQLITE_PRAGMAS) | {'wal_autocheckpoint', 'journal_size_limit'}
+PRAGMA_KEYWORD = re.compile(r'^[A-Za-z_]+$')
+
+
+def get_sqlite_pragmas():
+    """读取 PRAGMA 配置
+
+    INVENTORY_SETTINGS['SQLITE_PRAGMAS'] 中的项覆盖默认值，值为 None 表示不设置该项；
+    整个配置为 None 或 False 时不设置任何 PRAGMA（使用 SQLite 默认行为）。
+    """
+    configured = getattr(settings, 'INVENTORY_SETTINGS', {}).get('SQLITE_PRAGMAS', {})
+    if configured is None or configured is False:
+        return {}
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **configured}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def pragma_statements(pragmas):
+    """把 PRAGMA 配置转为语句，不合法的名称或值抛出 ImproperlyConfigured"""
+    statements = []
+    for name, value in pragmas.items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ImproperlyConfigured(f'不支持的 SQLite PRAGMA: {name}')
+        if isinstance(value, bool) or not (isinstance(value, int) or PRAGMA_KEYWORD.match(str(value))):
+            raise ImproperlyConfigured(f'SQLite PRAGMA {name} 的值不合法: {value!r}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(connection, pragmas=None):
+    """在一个 SQLite 连接上执行 PRAGMA 配置"""
+    if pragmas is None:
+        pragmas = get_sqlite_pragmas()
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+def current_pragmas(connection, names=None):
+    """读取连接上各 PRAGMA 的当前值，用于检查配置是否生效"""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names or DEFAULT_SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection)
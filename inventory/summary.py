@@ -0,0 +1,161 @@
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import InventorySummary, Product
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('total_products', 'low_stock_products', 'out_of_stock_products', 'stock_value')
+
+
+def state_counters(quantity, low_stock_threshold, price):
+    """单个商品对各计数器的贡献：(商品数, 库存不足, 缺货, 库存价值)
+
+    库存不足与商品列表的过滤条件一致：0 < quantity <= 预警值。
+    """
+    return (
+        1,
+        1 if 0 < quantity <= low_stock_threshold else 0,
+        1 if quantity == 0 else 0,
+        quantity * Decimal(price),
+    )
+
+
+class SummaryDelta:
+    """累积一批商品状态变化对汇总计数器的影响，最后一次性写回"""
+
+    def __init__(self):
+        self.changes = {}
+
+    def add(self, category_id, quantity, low_stock_threshold, price, sign=1):
+        """计入一个商品状态；sign=-1 表示移除该状态"""
+        counters = state_counters(quantity, low_stock_threshold, price)
+        for key in (InventorySummary.GLOBAL_KEY, InventorySummary.key_for_category(category_id)):
+            current = self.changes.setdefault(key, [category_id, 0, 0, 0, Decimal(0)])
+            for i, value in enumerate(counters, start=1):
+                current[i] += sign * value
+
+    def remove(self, category_id, quantity, low_stock_threshold, price):
+        self.add(category_id, quantity, low_stock_threshold, price, sign=-1)
+
+    def replace(self, old_state, new_state):
+        """old_state / new_state 为 (category_id, quantity, low_stock_threshold, price)，None 表示不存在"""
+        if old_state is not None:
+            self.remove(*old_state)
+        if new_state is not None:
+            self.add(*new_state)
+
+    def apply(self):
+        """用 F() 表达式把累积的变化写回汇总表
+
+        汇总表尚未初始化（没有全局行）时不做任何事，首次读取时会完整重建。
+
+        在调用方的事务内执行，因此每个库存事务都会更新全局行，直到提交才释放该行的锁，
+        并发的库存事务在这一行上排队。SQLite 本来就只允许一个写事务，没有额外代价；
+        PostgreSQL 上这是为了汇总与库存始终一致而接受的串行点。若成为瓶颈，可改为
+        transaction.on_commit 后再写，代价是进程在提交与写汇总之间退出时会产生偏差，
+        需要 reconcile_inventory_summary 修正。
+        """
+        changes = {key: values for key, values in self.changes.items() if any(values[1:])}
+        self.changes = {}
+        if not changes or not InventorySummary.objects.filter(key=InventorySummary.GLOBAL_KEY).exists():
+            return
+
+        for key, (category_id, *deltas) in changes.items():
+            updates = {field: F(field) + delta for field, delta in zip(COUNTER_FIELDS, deltas)}
+            if InventorySummary.objects.filter(key=key).update(**updates):
+                continue
+            # 新分类的第一个商品：从零开始建立该分类的汇总行
+            try:
+                with transaction.atomic():
+                    InventorySummary.objects.create(
+                        key=key,
+                        category_id=None if key == InventorySummary.UNCATEGORIZED_KEY else category_id,
+                        **dict(zip(COUNTER_FIELDS, deltas))
+                    )
+            except IntegrityError:
+                InventorySummary.objects.filter(key=key).update(**updates)
+
+
+def compute_summaries():
+    """用一条分组聚合查询计算全部汇总行（不写库），返回 {key: InventorySummary}"""
+    low_stock = Q(quantity__lte=F('low_stock_threshold'), quantity__gt=0)
+    rows = Product.objects.order_by().values('category_id').annotate(
+        total_products=Count('id'),
+        low_stock_products=Count('id', filter=low_stock),
+        out_of_stock_products=Count('id', filter=Q(quantity=0)),
+        stock_value=Sum(F('quantity') * F('price')),
+    )
+
+    summaries = {}
+    total = InventorySummary(key=InventorySummary.GLOBAL_KEY)
+    for row in rows:
+        key = InventorySummary.key_for_category(row['category_id'])
+        summary = InventorySummary(key=key, category_id=row['category_id'])
+        for field in COUNTER_FIELDS:
+            value = row[field] or 0
+            setattr(summary, field, value)
+            setattr(total, field, getattr(total, field) + value)
+        summaries[key] = summary
+    summaries[total.key] = total
+    return summaries
+
+
+def reconcile():
+    """完整重建汇总表，返回全局汇总行"""
+    summaries = compute_summaries()
+    with transaction.atomic():
+        InventorySummary.objects.all().delete()
+        InventorySummary.objects.bulk_create(summaries.values())
+
+    total = summaries[InventorySummary.GLOBAL_KEY]
+    logger.info(f"Inventory summary reconciled: {total.total_products} products, "
+                f"{len(summaries) - 1} category buckets")
+    return total
+
+
+def find_drift():
+    """比较汇总表与实际数据，返回 [(key, 字段, 汇总表中的值, 实际值)]"""
+    expected = compute_summaries()
+    stored = {summary.key: summary for summary in InventorySummary.objects.all()}
+    drift = []
+    for key in sorted(set(expected) | set(stored)):
+        actual = expected.get(key) or InventorySummary(key=key)
+        current = stored.get(key) or InventorySummary(key=key)
+        for field in COUNTER_FIELDS:
+            if Decimal(getattr(current, field)) != Decimal(getattr(actual, field)):
+                drift.append((key, field, getattr(current, field), getattr(actual, field)))
+    return drift
+
+
+def get_summary(category=None):
+    """读取汇总计数器（按主键级的单行查询），汇总表为空时先重建"""
+    key = InventorySummary.GLOBAL_KEY if category is None else InventorySummary.key_for_category(
+        getattr(category, 'pk', category))
+    summary = InventorySummary.objects.filter(key=key).first()
+    if summary is None:
+        if InventorySummary.objects.filter(key=InventorySummary.GLOBAL_KEY).exists():
+            # 已初始化但该分类没有商品
+            return InventorySummary(key=key)
+        summary = reconcile()
+        if key != InventorySummary.GLOBAL_KEY:
+            summary = InventorySummary.objects.filter(key=key).first() or InventorySummary(key=key)
+    return summary
+
+
+def move_category_to_uncategorized(category_id):
+    """分类删除时，其商品会被置为未分类（SET_NULL 不触发商品信号），同步转移汇总"""
+    summary = InventorySummary.objects.filter(
+        key=InventorySummary.key_for_category(category_id)).first()
+    if summary is None:
+        return
+    deltas = [getattr(summary, field) for field in COUNTER_FIELDS]
+    updates = {field: F(field) + delta for field, delta in zip(COUNTER_FIELDS, deltas)}
+    if not InventorySummary.objects.filter(key=InventorySummary.UNCATEGORIZED_KEY).update(**updates):
+        InventorySummary.objects.create(
+            key=InventorySummary.UNCATEGORIZED_KEY, **dict(zip(COUNTER_FIELDS, deltas))
+        )
+    summary.delete()
@@ -9,6 +9,7 @@ urlpatterns = [
     path('', views.product_list, name='dashboard'),
     path('products/', views.product_list, name='product_list'),
     path('products/create/', views.product_create, name='product_create'),
+    path('products/import/', views.product_import, name='product_import'),
     path('products/<int:pk>/', views.product_detail, name='product_detail'),
     path('products/<int:pk>/edit/', views.product_edit, name='product_edit'),
     path('products/<int:pk>/delete/', views.product_delete, name='product_delete'),
@@ -26,4 +27,6 @@ urlpatterns = [
     path('export/movements/', views.export_stock_movements_csv, name='export_movements'),
     path('api/products/search/', views.api_product_search, name='api_product_search'),
     path('api/stock/quick-update/', views.api_quick_stock_update, name='api_quick_stock_update'),
+    path('api/stock/as-of/', views.api_stock_as_of, name='api_stock_as_of'),
+    path('api/performance/', views.api_performance, name='api_performance'),
 ]
\ No newline at end of file
@@ -0,0 +1,68 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# 商品/分类/库存任何变化都会递增的数据版本号，派生数据（报表快照等）以它为缓存键的一部分
+DATA_VERSION_KEY = 'inventory:data:version'
+
+# 单个商品的版本号：该商品或其库存变化时递增，按商品缓存的页面片段以它为缓存键的一部分
+PRODUCT_VERSION_KEY = 'inventory:product:{pk}:version'
+
+
+def initial_version():
+    """版本号的初始值取当前时间（微秒）
+
+    版本号被淘汰或缓存重启后重新初始化时不会回到用过的小数字，
+    不会与仍留在缓存中的旧版本数据撞键。
+    """
+    return time.time_ns() // 1000
+
+
+def get_version(key=DATA_VERSION_KEY):
+    """读取共享缓存中的版本号，不存在时初始化"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial_version())
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key=DATA_VERSION_KEY):
+    """get_version 的异步版本，供异步视图使用"""
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, initial_version())
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key=DATA_VERSION_KEY):
+    """递增版本号，使依赖旧版本的缓存全部失效"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, initial_version())
+
+
+def data_changed():
+    """商品数据发生变化：事务提交后递增数据版本号"""
+    transaction.on_commit(bump_version)
+
+
+def product_version_key(pk):
+    return PRODUCT_VERSION_KEY.format(pk=pk)
+
+
+def get_product_version(pk):
+    return get_version(product_version_key(pk))
+
+
+def products_changed(pks):
+    """商品或其库存发生变化：事务提交后递增这些商品的版本号"""
+    pks = set(pks)
+
+    def bump():
+        for pk in pks:
+            bump_version(product_version_key(pk))
+    transaction.on_commit(bump)
@@ -1,11 +1,37 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction, IntegrityError
+from django.db.models import Count, Sum
 from django.core.exceptions import ValidationError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.urls import reverse
-from .models import Product, Category
-from .forms import ProductForm
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from .models import Product, Category, StockMovement, StockMovementDaily
+from .forms import (ProductForm, ProductImportUploadForm, StockAdjustmentForm,
+                    StockMovementExportForm)
+from .filters import filter_products, filter_movements, filter_daily_movements
+from .fragments import product_detail_cache, render_product_rows
+from .search import is_ranked, search_products, MIN_TERM_LENGTH
+from .autocomplete import aautocomplete
+from .exports import stream_products_csv, stream_movements_csv, iter_csv, iter_gzip
+from .importers import ProductImporter, detect_format, read_rows
+from .summary import get_summary
+from .reports import get_category_report, get_stock_report
+from .retention import HISTORY_LIMIT, get_movement_history
+from .snapshots import STOCK_AS_OF_MAX_SKUS, StockAsOf, parse_as_of
+from .performance import view_stats
+from .pagination import (CursorPaginator, approximate_count_enabled,
+                         approximate_product_count, get_cursor_threshold,
+                         get_pagination_mode)
+from .services import (StockError, apply_adjustment, apply_stock_deltas,
+                       STOCK_BATCH_MAX_ITEMS)
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -77,6 +103,43 @@ def product_create(request):
     return render(request, 'inventory/product_form.html', context)
 
 
+@login_required
+def product_import(request):
+    """批量导入商品视图"""
+    result = None
+
+    if request.method == 'POST':
+        form = ProductImportUploadForm(request.POST, request.FILES)
+
+        if form.is_valid():
+            uploaded = form.cleaned_data['file']
+            importer = ProductImporter(
+                user=request.user,
+                batch_size=form.cleaned_data['batch_size']
+            )
+            try:
+                result = importer.run(read_rows(uploaded, detect_format(uploaded.name)))
+            except ValueError as e:
+                logger.error(f"Product import failed: {e}")
+                form.add_error('file', f'文件解析失败: {e}')
+            else:
+                messages.success(
+                    request,
+                    f'导入完成：新增 {result.created} 个，更新 {result.updated} 个，失败 {result.failed} 行'
+                )
+        else:
+            logger.warning(f"Product import form validation failed: {form.errors}")
+    else:
+        form = ProductImportUploadForm()
+
+    context = {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:200] if result else [],
+    }
+    return render(request, 'inventory/product_import.html', context)
+
+
 @login_required
 def product_edit(request, pk):
     """编辑商品视图 - 修复重定向问题"""
@@ -145,68 +208,89 @@ def product_edit(request, pk):
 
 @login_required
 def product_detail(request, pk):
-    """商品详情视图"""
-    product = get_object_or_404(Product, pk=pk)
+    """商品详情视图
+
+    商品信息片段按商品版本号缓存（见 inventory.fragments），命中时不查询数据库；
+    商品或库存变化后版本号递增，不会显示旧的库存。
+    缓存值只含 HTML 与外层模板用到的 pk、name，不缓存模型实例：
+    共享缓存中序列化的模型实例在模型变更后的部署中无法还原。
+    """
+    def render_detail():
+        product = get_object_or_404(Product, pk=pk)
+        return {
+            'pk': product.pk,
+            'name': product.name,
+            'html': render_to_string('inventory/product_detail_info.html', {'product': product}),
+        }
 
+    detail = product_detail_cache.get_or_render(pk, render_detail)
     context = {
-        'product': product,
+        'product': {'pk': detail['pk'], 'name': detail['name']},
+        'product_info': mark_safe(detail['html']),
     }
     return render(request, 'inventory/product_detail.html', context)
 
 
 @login_required
 def product_list(request):
-    """商品列表视图"""
-    from django.db import models
+    """商品列表视图
+
+    商品较少时使用页码分页；商品较多（或已在游标模式中翻页）时改用游标分页，
+    避免每次请求的 COUNT 与深翻页时的 OFFSET 扫描，见 inventory.pagination。
+    """
     from django.core.paginator import Paginator
 
     products = Product.objects.all().order_by('-updated_at')
 
-    # 搜索功能
+    # 搜索和库存状态过滤
     query = request.GET.get('q', '')
     stock_status = request.GET.get('stock_status', '')
+    products = filter_products(products, query, stock_status)
 
-    if query:
-        products = products.filter(
-            models.Q(name__icontains=query) |
-            models.Q(sku__icontains=query)
-        )
-
-    # 库存状态过滤
-    if stock_status == 'in_stock':
-        products = products.filter(quantity__gt=models.F('low_stock_threshold'))
-    elif stock_status == 'low_stock':
-        products = products.filter(
-            quantity__lte=models.F('low_stock_threshold'),
-            quantity__gt=0
-        )
-    elif stock_status == 'out_of_stock':
-        products = products.filter(quantity=0)
+    # 统计信息（读取增量维护的汇总计数器，不扫描商品表）
+    summary = get_summary()
+    stats = {
+        'total_products': summary.total_products,
+        'low_stock_products': summary.low_stock_products,
+        'out_of_stock_products': summary.out_of_stock_products,
+        'stock_value': summary.stock_value,
+    }
 
     # 分页
-    paginator = Paginator(products, 20)  # 每页显示20个商品
-    page_number = request.GET.get('page')
-    products_page = paginator.get_page(page_number)
+    cursor = request.GET.get('cursor', '')
+    mode = get_pagination_mode()
+    if is_ranked(products):
+        # 全文搜索结果按相关度排序，游标分页会改成按更新时间排序，始终使用页码分页；
+        # 匹配集合由全文索引给出，COUNT 只计算匹配的行
+        use_cursor = False
+    elif mode == 'auto':
+        use_cursor = bool(cursor) or summary.total_products > get_cursor_threshold()
+    else:
+        use_cursor = mode == 'cursor'
 
-    # 统计信息
-    all_products = Product.objects.all()
-    stats = {
-        'total_products': all_products.count(),
-        'low_stock_products': all_products.filter(
-            quantity__lte=models.F('low_stock_threshold'),
-            quantity__gt=0
-        ).count(),
-        'out_of_stock_products': all_products.filter(quantity=0).count(),
-    }
+    if use_cursor:
+        products_page = CursorPaginator(products, 20).get_page(cursor)
+        if approximate_count_enabled():
+            products_page.approximate_count, products_page.count_truncated = \
+                approximate_product_count(products, summary, query, stock_status)
+    else:
+        paginator = Paginator(products, 20)  # 每页显示20个商品
+        page_number = request.GET.get('page')
+        products_page = paginator.get_page(page_number)
 
+    current_filters = {
+        'q': query,
+        'stock_status': stock_status
+    }
     context = {
         'products': products_page,
+        # 表格行按 (pk, updated_at) 缓存，见 inventory.fragments.render_product_rows
+        'product_rows': render_product_rows(products_page),
         'query': query,
         'stats': stats,
-        'current_filters': {
-            'q': query,
-            'stock_status': stock_status
-        }
+        'current_filters': current_filters,
+        # 翻页链接需要带上的过滤参数
+        'filter_query': urlencode({key: value for key, value in current_filters.items() if value}),
     }
     return render(request, 'inventory/product_list.html', context)
 
@@ -241,10 +325,44 @@ def product_delete(request, pk):
 # 其他可能需要的占位符视图函数（根据你的urls.py）
 @login_required
 def stock_adjustment(request, pk):
-    """库存调整视图 - 占位符"""
+    """库存调整视图"""
     product = get_object_or_404(Product, pk=pk)
-    messages.info(request, '库存调整功能正在开发中')
-    return redirect('inventory:product_detail', pk=pk)
+
+    if request.method == 'POST':
+        form = StockAdjustmentForm(request.POST)
+
+        if form.is_valid():
+            try:
+                movement = apply_adjustment(
+                    product,
+                    form.cleaned_data['adjustment_type'],
+                    form.cleaned_data['quantity'],
+                    reason=form.cleaned_data['reason'],
+                    reference_no=form.cleaned_data['reference_no'],
+                    user=request.user
+                )
+            except StockError as e:
+                logger.warning(f"Stock adjustment rejected for product {pk}: {e}")
+                form.add_error(None, str(e))
+            else:
+                if movement is None:
+                    messages.info(request, '库存数量未变化')
+                else:
+                    messages.success(
+                        request,
+                        f'库存已调整：{movement.old_quantity} → {movement.new_quantity}'
+                    )
+                return redirect('inventory:product_detail', pk=pk)
+        else:
+            logger.warning(f"Stock adjustment form validation failed: {form.errors}")
+    else:
+        form = StockAdjustmentForm()
+
+    context = {
+        'form': form,
+        'product': product,
+    }
+    return render(request, 'inventory/stock_adjustment.html', context)
 
 
 @login_required
@@ -271,16 +389,65 @@ def category_edit(request, pk):
 
 @login_required
 def stock_report(request):
-    """库存报告视图 - 占位符"""
-    messages.info(request, '库存报告功能正在开发中')
-    return redirect('inventory:product_list')
+    """库存报告视图
+
+    按分类汇总数量、按售价/成本价计算的库存价值、毛利与库存预警数量。
+    报表由一条分组聚合查询生成，并按数据版本缓存为快照；
+    ?category=<id>（未分类为 none）查看某个分类的明细，复用同一份快照。
+    """
+    category = request.GET.get('category', '')
+    if not category:
+        context = {'report': get_stock_report()}
+        return render(request, 'inventory/stock_report.html', context)
+
+    if category == 'none':
+        category_id = None
+    elif category.isdigit():
+        category_id = int(category)
+    else:
+        return redirect('inventory:stock_report')
+
+    report, row, products = get_category_report(category_id)
+    if row is None:
+        messages.info(request, '该分类下没有商品')
+        return redirect('inventory:stock_report')
+
+    context = {
+        'report': report,
+        'row': row,
+        'products': products,
+    }
+    return render(request, 'inventory/stock_report.html', context)
 
 
 @login_required
 def movement_history(request):
-    """库存变动历史视图 - 占位符"""
-    messages.info(request, '库存变动历史功能正在开发中')
-    return redirect('inventory:product_list')
+    """库存变动历史视图
+
+    显示最近的变动：近期为逐条的原始记录，超过保留期限的部分为合并后的日汇总，
+    见 inventory.retention。过滤条件与库存变动导出相同。
+    """
+    form = StockMovementExportForm(request.GET)
+    if form.is_valid():
+        filters = form.cleaned_data
+        entries = get_movement_history(
+            date_from=filters['date_from'],
+            date_to=filters['date_to'],
+            product=filters['product'],
+            category=filters['category'],
+            movement_type=filters['movement_type'],
+        )
+    else:
+        logger.warning(f"Stock movement history filter invalid: {form.errors}")
+        entries = []
+
+    context = {
+        'form': form,
+        'entries': entries,
+        'limit': HISTORY_LIMIT,
+        'filter_query': request.GET.urlencode(),
+    }
+    return render(request, 'inventory/movement_history.html', context)
 
 
 @login_required
@@ -299,28 +466,179 @@ def supplier_create(request):
 
 @login_required
 def export_products_csv(request):
-    """导出商品CSV - 占位符"""
-    messages.info(request, 'CSV导出功能正在开发中')
-    return redirect('inventory:product_list')
+    """导出商品CSV - 流式输出，支持与商品列表相同的过滤条件"""
+    query = request.GET.get('q', '')
+    stock_status = request.GET.get('stock_status', '')
+    products = filter_products(Product.objects.all(), query, stock_status)
+
+    filename = timezone.localtime().strftime('products_%Y%m%d_%H%M%S.csv')
+    response = StreamingHttpResponse(
+        stream_products_csv(products),
+        content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 @login_required
 def export_stock_movements_csv(request):
-    """导出库存变动CSV - 占位符"""
-    messages.info(request, '库存变动导出功能正在开发中')
-    return redirect('inventory:product_list')
-
-
-def api_product_search(request):
-    """商品搜索API - 占位符"""
-    from django.http import JsonResponse
-    return JsonResponse({'message': 'API功能正在开发中'})
-
+    """导出库存变动CSV - 键集分页流式输出，可选gzip压缩"""
+    form = StockMovementExportForm(request.GET)
+    if not form.is_valid():
+        logger.warning(f"Stock movement export filter invalid: {form.errors}")
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, f'导出条件有误: {error}')
+        return redirect('inventory:product_list')
+
+    filters = form.cleaned_data
+    conditions = {
+        'date_from': filters['date_from'],
+        'date_to': filters['date_to'],
+        'product': filters['product'],
+        'category': filters['category'],
+        'movement_type': filters['movement_type'],
+    }
+    movements = filter_movements(StockMovement.objects.all(), **conditions)
+    # 超过保留期限的记录已合并为日汇总（见 inventory.retention），与原始记录一起导出
+    daily = filter_daily_movements(StockMovementDaily.objects.all(), **conditions)
+
+    filename = timezone.localtime().strftime('stock_movements_%Y%m%d_%H%M%S.csv')
+    content = stream_movements_csv(movements, daily)
+    if filters['compress'] == 'gzip':
+        response = StreamingHttpResponse(iter_gzip(content), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+async def api_product_search(request):
+    """商品搜索API - 输入联想
+
+    先按编码、名称、拼音首字母前缀在进程内索引中查找；结果不足且关键词
+    足够长时，再用全文索引补充包含关键词的商品。每项只返回 id/sku/name/quantity。
+    异步视图：在 ASGI 下等待缓存与数据库时不占用工作线程。
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    if not query:
+        return JsonResponse({'query': query, 'results': []})
+
+    results = await aautocomplete(query, limit)
+    if len(results) < limit and len(query) >= MIN_TERM_LENGTH:
+        found = {result['id'] for result in results}
+        # search_products 首次调用时检查全文索引表是否存在（同步查询），其余只构造查询集
+        matched = await sync_to_async(search_products)(Product.objects.exclude(pk__in=found), query)
+        more = matched.values('id', 'sku', 'name', 'quantity')[:limit - len(results)]
+        results.extend([row async for row in more])
+    return JsonResponse({'query': query, 'results': results})
+
+
+@require_POST
+async def api_quick_stock_update(request):
+    """快速库存更新API - 批量应用库存增量
+
+    请求体为JSON数组（或 {"items": [...]}），每项为
+    {"sku", "delta", "movement_type", "reference_no"}，返回逐项结果。
+    异步 ORM 不支持事务，库存变动仍由 apply_stock_deltas 在同步线程中按事务执行。
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': '请求体不是有效的JSON'}, status=400)
+
+    items = payload.get('items') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'error': '请提供库存变动条目列表'}, status=400)
+    if len(items) > STOCK_BATCH_MAX_ITEMS:
+        return JsonResponse(
+            {'error': f'单次最多提交 {STOCK_BATCH_MAX_ITEMS} 条库存变动'}, status=400
+        )
 
-def api_quick_stock_update(request):
-    """快速库存更新API - 占位符"""
-    from django.http import JsonResponse
-    return JsonResponse({'message': 'API功能正在开发中'})
+    results = await sync_to_async(apply_stock_deltas)(items, user=user)
+    applied = sum(1 for result in results if result['ok'])
+    return JsonResponse({
+        'applied': applied,
+        'failed': len(results) - applied,
+        'results': results,
+    })
+
+
+def api_stock_as_of(request):
+    """某一时刻的库存API
+
+    ?at= 为日期（表示当日结束时）或日期时间。?sku=A,B 返回指定商品的库存；
+    不指定商品时返回全部商品的合计，format=csv 时流式导出全部商品。
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+
+    at = parse_as_of(request.GET.get('at'))
+    if at is None:
+        return JsonResponse({'error': '请提供有效的查询时间 at，例如 2026-09-30'}, status=400)
+
+    skus = [sku.strip().upper() for sku in request.GET.get('sku', '').split(',') if sku.strip()]
+    if len(skus) > STOCK_AS_OF_MAX_SKUS:
+        return JsonResponse({'error': f'单次最多查询 {STOCK_AS_OF_MAX_SKUS} 个商品编码'}, status=400)
+
+    result = StockAsOf(at, Product.objects.filter(sku__in=skus) if skus else None)
+    if request.GET.get('format') == 'csv':
+        filename = timezone.localtime(result.at).strftime('stock_as_of_%Y%m%d_%H%M%S.csv')
+        response = StreamingHttpResponse(
+            iter_csv(['商品编码', '商品名称', '库存数量'], result.rows()),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    data = {
+        'at': result.at.isoformat(),
+        # 查询时间落在已合并为日汇总的日期内时只能精确到天，at 为对齐后的当日结束
+        'aligned': result.aligned,
+        'snapshot': result.snapshot.taken_at.isoformat() if result.snapshot else None,
+    }
+    if skus:
+        data['results'] = [
+            {'sku': sku, 'name': name, 'quantity': quantity}
+            for sku, name, quantity in result.rows()
+        ]
+    else:
+        data.update(result.products.aggregate(
+            product_count=Count('pk'), total_quantity=Sum('quantity_as_of')
+        ))
+    return JsonResponse(data)
+
+
+def api_performance(request):
+    """各视图的性能汇总API（仅管理员）
+
+    按最近样本的 p95 耗时从慢到快排序，每个视图附带最慢一次请求的各项耗时与累计耗时最高的SQL。
+    ?limit= 限制返回的视图个数。
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({'error': '仅管理员可以查看'}, status=403)
+
+    try:
+        limit = max(int(request.GET.get('limit', 20)), 1)
+    except ValueError:
+        limit = 20
+    return JsonResponse({'views': view_stats(limit)})
 
 
 # 登录登出视图
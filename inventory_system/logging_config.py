@@ -0,0 +1,208 @@
+"""从环境变量生成 LOGGING 配置：日志经队列由后台线程写出，日志文件按大小或时间轮转
+
+请求线程只把日志记录放入队列，由 QueueListener 后台线程格式化并写入文件与控制台，
+磁盘变慢时不会拖慢请求。相关环境变量::
+
+    LOG_FORMAT=text           日志文件格式：text（默认）或 json（每行一个 JSON 对象）
+    LOG_ROTATION=size         size：按大小轮转（默认）；midnight、h、d 等：按时间轮转（TimedRotatingFileHandler 的 when）
+    LOG_MAX_BYTES=10485760    按大小轮转时单个文件的最大字节数
+    LOG_BACKUP_COUNT=10       保留的历史文件个数
+    LOG_QUEUE_SIZE=10000      队列长度上限，写入跟不上时丢弃 WARNING 以下的记录
+
+多个 worker 进程写同一个文件时各自轮转可能互相覆盖，多进程部署建议按时间轮转或输出到控制台由进程管理器收集。
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from django.utils.module_loading import import_string
+
+from .database import env_int
+
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 10
+DEFAULT_LOG_QUEUE_SIZE = 10000
+
+# 日志记录的标准属性，JsonFormatter 不把它们当作 extra 字段输出
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """把日志记录放入队列，由后台线程交给 target 处理器写出
+
+    target 为处理器配置（'class' 加构造参数），在 LOGGING 中以 '()' 工厂方式使用::
+
+        'file': {
+            '()': 'inventory_system.logging_config.QueueHandler',
+            'target': {'class': 'logging.handlers.RotatingFileHandler', 'filename': ..., 'maxBytes': ...},
+            'formatter': 'verbose',
+        }
+
+    formatter 设置在 target 上，格式化在后台线程中进行。关闭处理器（logging.shutdown 在进程退出时调用）
+    会等待队列中的记录全部写出。fork 出的子进程中后台线程不存在，首次写日志时重新启动。
+    """
+
+    def __init__(self, target, queue_size=DEFAULT_LOG_QUEUE_SIZE):
+        super().__init__(None)
+        target = dict(target)
+        self.target = import_string(target.pop('class'))(**target)
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue_size)
+            self.listener = logging.handlers.QueueListener(self.queue, self.target)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """在请求线程中合并消息参数、把异常转成文本，其余格式化留给后台线程"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            # WARNING 及以上的记录宁可等待也不丢弃
+            self.queue.put(record, block=record.levelno >= logging.WARNING)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        self.target.flush()
+
+    def close(self):
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        if self.dropped:
+            self.target.handle(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'Log queue was full, dropped {self.dropped} records',
+            }))
+            self.dropped = 0
+        self.target.close()
+        super().close()
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON，便于日志收集系统解析"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        request = getattr(record, 'request', None)
+        if request is not None:
+            data['method'] = getattr(request, 'method', None)
+            data['path'] = getattr(request, 'path', None)
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and key not in data and key != 'request':
+                data[key] = value
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def file_handler_config(filename):
+    """按 LOG_ROTATION 选择按大小或按时间轮转的文件处理器"""
+    rotation = os.environ.get('LOG_ROTATION', 'size').lower()
+    backup_count = env_int('LOG_BACKUP_COUNT', DEFAULT_LOG_BACKUP_COUNT)
+    if rotation == 'size':
+        return {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': filename,
+            'maxBytes': env_int('LOG_MAX_BYTES', DEFAULT_LOG_MAX_BYTES),
+            'backupCount': backup_count,
+            'encoding': 'utf-8',
+        }
+    return {
+        'class': 'logging.handlers.TimedRotatingFileHandler',
+        'filename': filename,
+        'when': rotation,
+        'backupCount': backup_count,
+        'encoding': 'utf-8',
+    }
+
+
+def logging_from_env(log_dir):
+    """返回 LOGGING 配置：文件（INFO 及以上）与控制台都经队列写出"""
+    os.makedirs(log_dir, exist_ok=True)
+    queue_size = env_int('LOG_QUEUE_SIZE', DEFAULT_LOG_QUEUE_SIZE)
+    file_format = 'json' if os.environ.get('LOG_FORMAT', 'text').lower() == 'json' else 'verbose'
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'verbose': {
+                'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
+                'style': '{',
+            },
+            'simple': {
+                'format': '{levelname} {message}',
+                'style': '{',
+            },
+            'json': {
+                '()': 'inventory_system.logging_config.JsonFormatter',
+            },
+        },
+        'handlers': {
+            'file': {
+                '()': 'inventory_system.logging_config.QueueHandler',
+                'target': file_handler_config(os.path.join(log_dir, 'django.log')),
+                'queue_size': queue_size,
+                'level': 'INFO',
+                'formatter': file_format,
+            },
+            'console': {
+                '()': 'inventory_system.logging_config.QueueHandler',
+                'target': {'class': 'logging.StreamHandler'},
+                'queue_size': queue_size,
+                'level': 'DEBUG',
+                'formatter': 'simple',
+            },
+        },
+        'root': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+        },
+        'loggers': {
+            'django': {
+                'handlers': ['console', 'file'],
+                'level': 'INFO',
+                'propagate': False,
+            },
+            # 不单独挂处理器，交给根日志器输出，避免每条记录写两遍
+            'inventory': {
+                'level': 'DEBUG',
+            },
+        },
+    }
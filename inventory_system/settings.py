@@ -13,6 +13,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from django.contrib.messages import constants as messages
+from django.core.exceptions import ImproperlyConfigured
+
+from .database import database_from_env
+from .logging_config import logging_from_env
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -54,8 +58,11 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    # 抽样统计请求耗时（Server-Timing 响应头与按视图汇总），放在最前面使总耗时包含其他中间件
+    "inventory.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "inventory.middleware.SessionRefreshMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -67,7 +74,8 @@ ROOT_URLCONF = "inventory_system.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django 模板后端，额外统计被抽样请求的模板渲染耗时
+        "BACKEND": "inventory.performance.DjangoTemplates",
         "DIRS": [BASE_DIR / 'inventory/templates'],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -88,24 +96,14 @@ WSGI_APPLICATION = "inventory_system.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# 由环境变量 DATABASE_URL 配置，未设置时使用项目目录下的 SQLite；
+# PostgreSQL 的连接池与持久连接见 inventory_system/database.py
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_from_env(BASE_DIR),
 }
 
-# 生产环境可以使用PostgreSQL
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': os.environ.get('DB_NAME', 'inventory_db'),
-#         'USER': os.environ.get('DB_USER', 'postgres'),
-#         'PASSWORD': os.environ.get('DB_PASSWORD', ''),
-#         'HOST': os.environ.get('DB_HOST', 'localhost'),
-#         'PORT': os.environ.get('DB_PORT', '5432'),
-#     }
-# }
+# SQLite 的 PRAGMA（WAL、busy_timeout、mmap 等）在每个新连接上由 inventory.sqlite 设置，
+# 见 INVENTORY_SETTINGS['SQLITE_PRAGMAS']
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -170,66 +168,60 @@ MESSAGE_TAGS = {
 # 分页设置
 PAGINATE_BY = 20
 
-# 日志配置
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
-    },
-    'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
-        },
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
-        },
-    },
-    'root': {
-        'handlers': ['console', 'file'],
-        'level': 'INFO',
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'inventory': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
-            'propagate': True,
-        },
-    },
-}
-
-# 确保日志目录存在
-os.makedirs(BASE_DIR / 'logs', exist_ok=True)
+# 日志配置：经队列由后台线程写出，logs/django.log 按大小（或 LOG_ROTATION 指定的时间）轮转，
+# LOG_FORMAT=json 时输出结构化日志，见 inventory_system/logging_config.py
+LOGGING = logging_from_env(BASE_DIR / 'logs')
 
 # 缓存设置
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# CACHE_BACKEND=sqlite（默认）：同一主机上所有 worker 进程共享的 SQLite 文件缓存，见 inventory/cache.py；
+# redis：使用 REDIS_URL；locmem：进程内缓存（仅适合单进程开发）
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        }
     }
-}
+elif CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'inventory.cache.SQLiteCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache' / 'cache.sqlite3'),
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'MAX_SIZE': 256 * 1024 * 1024,  # 缓存数据总字节数上限，超出时按最近访问时间淘汰
+            },
+        }
+    }
+
+# 测试：缓存文件放到临时目录、默认不抽样性能统计，见 inventory_system/test_runner.py
+TEST_RUNNER = 'inventory_system.test_runner.TestRunner'
 
 # 会话设置
+# 会话存储：cached_db（读走缓存，写同时落库）、signed_cookies（不占用数据库）或 db
+SESSION_STORE = os.environ.get('SESSION_STORE', 'cached_db')
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+if SESSION_STORE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f'不支持的 SESSION_STORE: {SESSION_STORE!r}，可选值：{", ".join(SESSION_ENGINES)}')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STORE]
 SESSION_COOKIE_AGE = 3600 * 24 * 7  # 7天
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
-SESSION_SAVE_EVERY_REQUEST = True
+# 不在每个请求都保存会话；由 inventory.middleware.SessionRefreshMiddleware 在
+# 距上次续期超过 SESSION_REFRESH_INTERVAL 时续期，保持“最后一次访问后 7 天过期”
+SESSION_SAVE_EVERY_REQUEST = False
 
 # 安全设置（生产环境）
 if not DEBUG:
@@ -243,9 +235,6 @@ if not DEBUG:
     CSRF_COOKIE_SECURE = True
     X_FRAME_OPTIONS = 'DENY'
 
-# 数据库连接池（可选）
-# DATABASES['default']['CONN_MAX_AGE'] = 60
-
 # 邮件设置（用于发送库存预警等）
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
@@ -258,9 +247,29 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@inventory.com
 # 库存预警设置
 INVENTORY_SETTINGS = {
     'LOW_STOCK_ALERT_ENABLED': True,
-    'SEND_DAILY_REPORTS': False,
+    'LOW_STOCK_ALERT_INTERVAL': 300,  # 库存预警汇总邮件的发送间隔（秒）
+    'LOW_STOCK_ALERT_RECIPIENTS': [],  # 预警收件人，为空时发给填写了邮箱的管理员
+    'SEND_DAILY_REPORTS': False,  # generate_daily_report 生成报告后是否发送邮件
+    'DAILY_REPORT_DIR': BASE_DIR / 'reports',  # 每日报告 HTML/CSV 的输出目录
+    'DAILY_REPORT_RECIPIENTS': [],  # 每日报告收件人，为空时发给填写了邮箱的管理员
     'BACKUP_FREQUENCY': 'daily',  # daily, weekly, monthly
-    'MAX_EXPORT_RECORDS': 10000,
+    'BACKUP_DIR': BASE_DIR / 'backups',  # backup_database 的输出目录
+    'BACKUP_PAGES_PER_STEP': 1024,  # 在线备份每一步复制的页数
+    'BACKUP_STEP_SLEEP': 0.05,  # 在线备份每一步之间休眠的秒数，期间写操作可以继续
+    'BACKUP_TIMEOUT': 3600,  # 在线备份复制阶段的总时限（秒），超过时中止并报错
+    'BACKUP_KEEP': {'daily': 7, 'weekly': 4, 'monthly': 12},  # 按天/周/月各保留的备份份数
+    'MAX_EXPORT_RECORDS': None,  # 导出行数上限，None 表示不限制（导出为流式输出）
+    'PRODUCT_LIST_PAGINATION': 'auto',  # auto, cursor, pages
+    'CURSOR_PAGINATION_THRESHOLD': 10000,  # auto 模式下商品数超过该值时使用游标分页
+    'PRODUCT_LIST_APPROXIMATE_COUNT': True,  # 游标分页时显示近似总数
+    'MOVEMENT_RETENTION_DAYS': 365,  # 库存变动原始记录保留天数，更早的记录合并为日汇总
+    'MOVEMENT_ARCHIVE_DIR': None,  # 合并后原始记录归档（gzip CSV）的目录，None 表示直接删除
+    'STOCK_SNAPSHOT_PERIOD': 'monthly',  # 库存快照周期：daily, weekly, monthly
+    'FRAGMENT_CACHE_TIMEOUT': 3600,  # 按商品版本号缓存的页面片段有效期（秒）
+    'SESSION_REFRESH_INTERVAL': 3600 * 24,  # 会话最多每隔多少秒续期一次（写一次会话）
+    'PERFORMANCE_SAMPLE_RATE': 0.1,  # 统计性能的请求比例（0~1）
+    'PERFORMANCE_WINDOW': 100,  # 每个视图保留最近多少个性能样本
+    'SQLITE_PRAGMAS': {},  # 覆盖 inventory.sqlite 中的默认 PRAGMA，值为 None 表示不设置该项；None 表示全部不设置
 }
 
 # 文件上传设置
@@ -0,0 +1,37 @@
+"""测试运行器：测试使用配置的缓存后端，但不读写开发/生产环境的缓存文件
+
+默认的 SQLiteCache 在测试期间改用临时目录中的新文件，每次运行从空缓存开始，结束后删除；
+其他后端（CACHE_BACKEND=locmem / redis）按配置使用。请求性能统计默认不抽样，
+需要的测试用 override_settings 单独开启 PERFORMANCE_SAMPLE_RATE。
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+SQLITE_CACHE_BACKEND = 'inventory.cache.SQLiteCache'
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='inventory-test-cache-')
+        caches = {
+            alias: {**config, 'LOCATION': os.path.join(self.cache_dir, f'{alias}.sqlite3')}
+            if config['BACKEND'] == SQLITE_CACHE_BACKEND else config
+            for alias, config in settings.CACHES.items()
+        }
+        self.test_settings = override_settings(
+            CACHES=caches,
+            INVENTORY_SETTINGS={**settings.INVENTORY_SETTINGS, 'PERFORMANCE_SAMPLE_RATE': 0.0},
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)